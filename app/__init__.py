@@ -0,0 +1,5 @@
+"""
+Instagram Graph API 수집 / 분석 패키지
+- 라이브러리로 import 해도 .env 로드, 폴더 생성, 로그 파일 연결이 일어나지 않음
+- CLI: python -m app <command> (목록: python -m app --help)
+"""
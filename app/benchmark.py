@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+from . import graph_client
+from . import rate_limiter
+from .mock_graph import SCRIPTS_DIR, MockGraphAPI, load_fixtures
+
+SCENARIOS = ("media", "insights", "insights_batch", "insights_expand", "export")
+
+# mock 에 보낼 기본 설정 (환경변수가 있으면 그대로 사용)
+BENCH_ENV = {
+    "ACCESS_TOKEN": "mock-token",
+    "IG_USER_ID": "ig0",
+    "FIELD_PARAMS": "id,caption,media_type,media_product_type,timestamp,permalink,username",
+    "INSIGHT_METRICS": "reach,saved,likes,comments,shares,total_interactions",
+    "INSIGHT_METRICS_VIDEO": "reach,saved,likes,comments,shares,total_interactions,views",
+    "INSIGHT_METRICS_REELS": "reach,saved,likes,comments,shares,total_interactions,views",
+    "INSIGHT_METRICS_STORY": "reach,replies,navigation",
+}
+
+# 기본 limiter 설정: 시작 속도(5 req/s)에 묶여 limiter 를 재지 않도록 높게 고정 (0 이면 env 설정 그대로)
+BENCH_MAX_RPS = 1000.0
+# mock 사용량 헤더 기본 전송 (60초당 한도가 커서 사용률은 낮게 유지 → 헤더 처리 경로까지 포함해서 측정)
+BENCH_USAGE_QUOTA = 100000
+
+# 기준 결과 대비 회귀 판정: (지표, 클수록 좋은지)
+REGRESSION_METRICS = (("media_per_s", True), ("p99_ms", False), ("peak_mb", False))
+
+
+class RequestRecorder:
+    """graph_client request hook 으로 요청별 지연 / 상태 / 재시도 기록"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[int] = []
+        self.statuses: Dict[str, int] = {}
+        self.retries = 0
+
+    def __call__(self, method, url, status, elapsed_ms, attempt, error) -> None:
+        with self._lock:
+            self.latencies.append(elapsed_ms)
+            key = str(status) if status is not None else type(error).__name__
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            if attempt:
+                self.retries += 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    """nearest-rank 백분위수 (값이 없으면 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.5)))
+    return float(ordered[min(rank, len(ordered)) - 1])
+
+
+def run_scenario(name: str, fn: Callable[[], int]) -> Dict[str, Any]:
+    """
+    fn() 한 번 실행 → 처리량 / 지연 / 메모리 측정 (fn 은 처리한 미디어 수 반환)
+    peak_mb 는 tracemalloc 기준 (파이썬 객체 할당 최대치)
+    limiter 에는 시작 시점 설정과 끝난 뒤 속도를 기록 (결과를 비교할 때 같은 조건인지 확인용)
+    """
+    limiter = rate_limiter.get_limiter()
+    limits = {"start_rps": limiter.rate, "min_rps": limiter.min_rate, "max_rps": limiter.max_rate}
+    recorder = RequestRecorder()
+    graph_client.add_request_hook(recorder)
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        items = fn()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        graph_client.remove_request_hook(recorder)
+
+    requests_sent = len(recorder.latencies)
+    return {
+        "scenario": name,
+        "items": items,
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests_sent,
+        "rps": round(requests_sent / elapsed, 2) if elapsed else 0.0,
+        "media_per_s": round(items / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": percentile(recorder.latencies, 50),
+        "p99_ms": percentile(recorder.latencies, 99),
+        "retries": recorder.retries,
+        "statuses": recorder.statuses,
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "limiter": {**limits, "end_rps": limiter.stats()["rate"]},
+    }
+
+
+def run_benchmarks(
+    mock: MockGraphAPI,
+    scenarios: List[str] = list(SCENARIOS),
+    workers: int = 4,
+    limit: int = 100,
+    max_rps: Optional[float] = BENCH_MAX_RPS,
+    work_dir: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    mock 을 대상으로 수집 / 내보내기 시나리오를 차례로 실행
+    - 시나리오마다 rate limiter 를 초기화해서 같은 조건으로 시작
+      (max_rps 지정 시 시작 / 최대 속도를 그 값으로 고정, None / 0 이면 env RATE_LIMIT_* 그대로)
+    - insights / export 시나리오는 media 시나리오 결과를 사용 (media 를 빼면 고정 데이터 사용)
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="ig_bench_")
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["OUTPUT_DIR"] = work_dir
+    graph_client.GRAPH_API_BASE = mock.base_url
+    if workers > graph_client.HTTP_POOL_SIZE:
+        graph_client.configure(pool_size=workers)
+
+    # 수집 / 내보내기 모듈은 시나리오 실행 때만 필요하므로 여기서 import
+    from . import my_insight
+    from .js_to_csv import build_frame, flatten_insights, save_frame
+    from .jsonl_writer import JsonlWriter
+    from .media_reader import iter_media
+
+    state: Dict[str, Any] = {"posts": [], "dataset": os.path.join(work_dir, "bench_media.jsonl")}
+
+    def fresh_posts() -> List[Dict[str, Any]]:
+        source = state["posts"] or mock.fixtures
+        return [{k: v for k, v in post.items() if k != "insights"} for post in source]
+
+    def media() -> int:
+        state["posts"] = my_insight.fetch_user_media_all(limit)
+        return len(state["posts"])
+
+    def insights() -> int:
+        posts = my_insight.collect_insights(fresh_posts(), workers=workers, delay=0)
+        with JsonlWriter(state["dataset"]) as writer:
+            writer.write_many(posts)
+        return len(posts)
+
+    def insights_batch() -> int:
+        return len(my_insight.collect_insights_batch(fresh_posts()))
+
+    def insights_expand() -> int:
+        return len(my_insight.collect_insights_expanded(fresh_posts()))
+
+    def export() -> int:
+        if not os.path.exists(state["dataset"]):
+            with JsonlWriter(state["dataset"]) as writer:
+                writer.write_many(mock.fixtures)
+        columns = flatten_insights(iter_media(state["dataset"]))
+        save_frame(build_frame(columns), os.path.join(work_dir, "bench_export"), ["csv", "parquet"])
+        return len(columns["id"])
+
+    runners = {
+        "media": media,
+        "insights": insights,
+        "insights_batch": insights_batch,
+        "insights_expand": insights_expand,
+        "export": export,
+    }
+    results = []
+    for name in scenarios:
+        if max_rps:
+            rate_limiter.reset_limiters(rate=max_rps, max_rate=max_rps)
+        else:
+            rate_limiter.reset_limiters()
+        result = run_scenario(name, runners[name])
+        result["limiter"].update(usage_quota=mock.usage_quota, throttle=mock.throttle_rate)
+        results.append(result)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """기준 결과 대비 tolerance(비율) 이상 나빠진 지표 목록"""
+    previous = {item["scenario"]: item for item in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{result['scenario']}.{metric}: {old} → {new} ({change:+.0%})")
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f"{'scenario':<16}{'media':>7}{'time(s)':>9}{'req':>7}{'req/s':>9}{'media/s':>10}" \
+             f"{'p50(ms)':>9}{'p99(ms)':>9}{'retry':>7}{'peak(MB)':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['scenario']:<16}{r['items']:>7}{r['elapsed_s']:>9.2f}{r['requests']:>7}{r['rps']:>9.1f}"
+              f"{r['media_per_s']:>10.1f}{r['p50_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['retries']:>7}{r['peak_mb']:>10.1f}")
+    print()
+    for r in results:
+        limits = r["limiter"]
+        print(f"limiter {r['scenario']:<16}start={limits['start_rps']:g} max={limits['max_rps']:g} "
+              f"end={limits['end_rps']:g} req/s, usage_quota={limits['usage_quota']}, throttle={limits['throttle']:g}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark crawler and export throughput against a local mock Graph API")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+        help="실행할 시나리오 (기본: 전부)"
+    )
+    parser.add_argument("--scripts-dir", default=SCRIPTS_DIR, help="고정 데이터(JSON 덤프) 폴더")
+    parser.add_argument("--scale", type=int, default=1, help="고정 데이터를 N 배로 복제")
+    parser.add_argument("--latency", type=float, default=20, help="mock 응답 지연(ms, 기본: 20)")
+    parser.add_argument("--jitter", type=float, default=10, help="mock 추가 지연 최대값(ms, 기본: 10)")
+    parser.add_argument("--throttle", type=float, default=0, help="mock 429 응답 비율 (0~1)")
+    parser.add_argument(
+        "--usage-quota", type=int, default=BENCH_USAGE_QUOTA,
+        help=f"mock 60초당 호출 한도 (사용량 헤더 전송, 0 이면 헤더 없음, 기본: {BENCH_USAGE_QUOTA})"
+    )
+    parser.add_argument("--workers", "-w", type=int, default=4, help="insights 동시 요청 수")
+    parser.add_argument("--limit", "-n", type=int, default=100, help="미디어 목록 페이지 크기")
+    parser.add_argument(
+        "--max-rps", type=float, default=BENCH_MAX_RPS,
+        help=f"rate limiter 시작 / 최대 초당 요청 수 (0 이면 env RATE_LIMIT_* 설정, 기본: {BENCH_MAX_RPS:g})"
+    )
+    parser.add_argument("--output", "-o", help="결과를 JSON 으로 저장할 경로 (다음 실행의 --baseline 으로 사용)")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="회귀로 판정할 악화 비율 (기본: 0.2)")
+    args = parser.parse_args(argv)
+
+    mock = MockGraphAPI(
+        load_fixtures(args.scripts_dir, args.scale),
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        throttle_rate=args.throttle,
+        usage_quota=args.usage_quota,
+    )
+    with mock:
+        results = run_benchmarks(mock, args.scenarios, workers=args.workers, limit=args.limit, max_rps=args.max_rps)
+
+    print()
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ 성능 회귀:", *regressions, sep="\n  ")
+            sys.exit(1)
+        print(f"✅ 기준 대비 회귀 없음 (허용 {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import os
+import re
+import csv
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .media_reader import iter_media
+
+# 한 번의 정규식 탐색으로 해시태그 / 멘션 / 한국어 단어를 함께 추출
+TOKEN_RE = re.compile(r"(?P<hashtag>#[\w가-힣]+)|(?P<mention>@[\w.]+)|(?P<word>[가-힣]{2,})")
+# extract_words() 와 같은 기준의 한국어 단어 (2글자 이상)
+KOREAN_WORD_RE = re.compile(r"[가-힣]{2,}")
+
+KINDS = ("word", "hashtag", "mention", "ngram")
+
+# 프로세스 하나에 넘기는 캡션 수
+CHUNK_SIZE = 2000
+
+# (caption, timestamp, media_type)
+CaptionRow = Tuple[str, str, str]
+# {"total": {kind: Counter}, "period": {기간: {kind: Counter}}, "media_type": {타입: {kind: Counter}}}
+Stats = Dict[str, dict]
+
+
+def new_stats() -> Stats:
+    return {"total": {kind: Counter() for kind in KINDS}, "period": {}, "media_type": {}}
+
+
+def period_key(timestamp: str, period: str = "month") -> str:
+    """timestamp(2025-07-28T09:00:00+0000) → 기간 키 (month: 2025-07, week: 2025-W31, day: 2025-07-28)"""
+    if not timestamp:
+        return "unknown"
+    if period == "day":
+        return timestamp[:10]
+    if period == "week":
+        try:
+            year, week, _ = date.fromisoformat(timestamp[:10]).isocalendar()
+        except ValueError:
+            return "unknown"
+        return f"{year}-W{week:02d}"
+    return timestamp[:7]
+
+
+def tokenize_caption(caption: str, ngram: int = 2) -> Dict[str, List[str]]:
+    """
+    캡션 하나에서 한국어 단어 / 해시태그 / 멘션 / 단어 n-gram 을 한 번에 추출
+    해시태그 / 멘션 안의 한국어도 단어로 집계 (extract_words() 결과와 동일)
+    반환: {kind: 토큰 목록} (Counter 생성은 집계 쪽에서 한꺼번에)
+    """
+    tokens: Dict[str, List[str]] = {"word": [], "hashtag": [], "mention": []}
+    words = tokens["word"]
+    for m in TOKEN_RE.finditer(caption):
+        kind = m.lastgroup
+        token = m.group(kind)
+        if kind == "word":
+            words.append(token)
+        else:
+            tokens[kind].append(token.lower())
+            words.extend(KOREAN_WORD_RE.findall(token))
+    tokens["ngram"] = (
+        [" ".join(words[i:i + ngram]) for i in range(len(words) - ngram + 1)] if ngram > 1 else []
+    )
+    return tokens
+
+
+def _counters(stats: Stats, dim: str, key: str) -> Dict[str, Counter]:
+    counters = stats[dim].get(key)
+    if counters is None:
+        counters = stats[dim][key] = {kind: Counter() for kind in KINDS}
+    return counters
+
+
+def _add(target: Dict[str, Counter], counts: Dict[str, Counter]) -> None:
+    for kind, counter in counts.items():
+        if counter:
+            target.setdefault(kind, Counter()).update(counter)
+
+
+def analyze_rows(rows: List[CaptionRow], ngram: int = 2, period: str = "month") -> Stats:
+    """캡션 묶음 하나를 집계 (프로세스 풀 작업 단위)"""
+    stats = new_stats()
+    total = stats["total"]
+    for caption, timestamp, media_type in rows:
+        tokens = tokenize_caption(caption, ngram)
+        by_period = _counters(stats, "period", period_key(timestamp, period))
+        by_type = _counters(stats, "media_type", media_type or "UNKNOWN")
+        for kind, values in tokens.items():
+            if values:
+                total[kind].update(values)
+                by_period[kind].update(values)
+                by_type[kind].update(values)
+    return stats
+
+
+def merge_stats(target: Stats, other: Stats) -> Stats:
+    """other 의 Counter 들을 target 에 더함"""
+    _add(target["total"], other["total"])
+    for dim in ("period", "media_type"):
+        for key, counts in other[dim].items():
+            _add(target[dim].setdefault(key, {}), counts)
+    return target
+
+
+def caption_rows(posts: Iterable[dict]) -> Iterator[CaptionRow]:
+    """게시물에서 집계에 필요한 값만 추출 (캡션이 없는 게시물은 건너뜀)"""
+    for post in posts:
+        caption = post.get("caption")
+        if caption:
+            yield caption, post.get("timestamp", ""), post.get("media_type", "")
+
+
+def _chunks(rows: Iterable[CaptionRow], size: int) -> Iterator[List[CaptionRow]]:
+    chunk: List[CaptionRow] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_posts(
+    posts: Iterable[dict],
+    workers: Optional[int] = None,
+    ngram: int = 2,
+    period: str = "month",
+    chunk_size: int = CHUNK_SIZE,
+    checkpoint=None,
+    checkpoint_every: int = 0,
+) -> Stats:
+    """
+    게시물 캡션을 chunk_size 단위로 나눠 프로세스 풀에서 집계한 뒤 Counter 병합
+    - workers: 프로세스 수 (기본: CPU 수), 1 이면 현재 프로세스에서 처리
+    - 진행 중인 작업은 workers*2 개까지만 유지 → 입력 iterator 를 끝까지 메모리에 올리지 않음
+    - checkpoint(stats): checkpoint_every 개 chunk 를 병합할 때마다 호출 (중간 결과 저장용)
+    """
+    total = new_stats()
+    merged = 0
+
+    def merged_one(part: Stats) -> None:
+        nonlocal merged
+        merge_stats(total, part)
+        merged += 1
+        if checkpoint and checkpoint_every and merged % checkpoint_every == 0:
+            checkpoint(total)
+
+    chunks = _chunks(caption_rows(posts), chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in chunks:
+            merged_one(analyze_rows(chunk, ngram, period))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for chunk in chunks:
+            in_flight.add(pool.submit(analyze_rows, chunk, ngram, period))
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    merged_one(future.result())
+        for future in in_flight:
+            merged_one(future.result())
+    return total
+
+
+# 종류별 결과 파일명 / 헤더
+OUTPUT_FILES = {
+    "word": ("words.csv", ["단어", "횟수"]),
+    "hashtag": ("hashtags.csv", ["해시태그", "횟수"]),
+    "mention": ("mentions.csv", ["멘션", "횟수"]),
+    "ngram": ("ngrams.csv", ["n-gram", "횟수"]),
+}
+BREAKDOWN_FILE = "caption_breakdown.csv"
+
+
+def _write_csv(path: str, header: List[str], rows: Iterable[list]) -> None:
+    """임시 파일에 한 줄씩 쓴 뒤 교체 (중간 저장 중에도 이전 결과 파일은 온전히 유지)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def write_results(stats: Stats, output_dir: str, top: int = 0) -> List[str]:
+    """
+    종류별 빈도 CSV(words.csv 등) 와 기간/미디어 타입별 breakdown CSV 저장
+    - top: 0 보다 크면 각 목록을 상위 top 개까지만 저장
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    limit = top or None
+    paths = []
+    for kind, (filename, header) in OUTPUT_FILES.items():
+        path = os.path.join(output_dir, filename)
+        _write_csv(path, header, stats["total"][kind].most_common(limit))
+        paths.append(path)
+
+    def breakdown_rows() -> Iterator[list]:
+        for dim in ("period", "media_type"):
+            for key in sorted(stats[dim]):
+                for kind, counter in sorted(stats[dim][key].items()):
+                    for token, count in counter.most_common(limit):
+                        yield [dim, key, kind, token, count]
+
+    path = os.path.join(output_dir, BREAKDOWN_FILE)
+    _write_csv(path, ["구분", "키", "종류", "토큰", "횟수"], breakdown_rows())
+    paths.append(path)
+    return paths
+
+
+def analyze_file(path: str, **kwargs) -> Stats:
+    """미디어 덤프 파일(JSON / JSONL)을 한 건씩 읽으면서 집계"""
+    return analyze_posts(iter_media(path), **kwargs)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Count Korean words, hashtags, mentions and n-grams in captions"
+    )
+    parser.add_argument("inputs", nargs="+", help="미디어 JSON / JSONL(.gz) 파일 (여러 계정 가능)")
+    parser.add_argument("--output-dir", "-o", default="scripts", help="결과 CSV 저장 폴더 (기본: scripts)")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--ngram", type=int, default=2, help="단어 n-gram 길이 (기본: 2, 1 이면 생략)")
+    parser.add_argument(
+        "--period", choices=["day", "week", "month"], default="month",
+        help="기간별 집계 단위 (기본: month)"
+    )
+    parser.add_argument("--top", type=int, default=0, help="목록별 상위 N 개만 저장 (기본: 전부)")
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=50,
+        help=f"{CHUNK_SIZE}개 캡션 묶음 N 개마다 중간 결과 저장 (0 이면 끝에 한 번만)"
+    )
+    args = parser.parse_args(argv)
+
+    def checkpoint(stats: Stats) -> None:
+        write_results(stats, args.output_dir, args.top)
+        print(f"💾 중간 저장: 단어 {len(stats['total']['word'])}개")
+
+    def all_posts() -> Iterator[dict]:
+        for path in args.inputs:
+            yield from iter_media(path)
+
+    stats = analyze_posts(
+        all_posts(), workers=args.workers, ngram=args.ngram, period=args.period,
+        checkpoint=checkpoint, checkpoint_every=args.checkpoint_every,
+    )
+    for path in write_results(stats, args.output_dir, args.top):
+        print(f"✅ 저장 완료: {path}")
+
+
+if __name__ == "__main__":
+    main()
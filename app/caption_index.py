@@ -0,0 +1,221 @@
+import os
+import re
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from .caption_analytics import tokenize_caption
+
+# 한국어 외 검색어(영문·숫자)도 찾을 수 있도록 함께 색인
+LATIN_WORD_RE = re.compile(r"[A-Za-z0-9]{2,}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS caption_docs (
+    doc_id    INTEGER PRIMARY KEY,
+    source    TEXT NOT NULL,
+    media_id  TEXT NOT NULL,
+    username  TEXT,
+    timestamp TEXT,
+    UNIQUE (source, media_id)
+);
+CREATE INDEX IF NOT EXISTS idx_caption_docs_timestamp ON caption_docs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_caption_docs_username  ON caption_docs(username);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS caption_fts USING fts5(
+    words, hashtags, mentions, tokenize = 'unicode61'
+);
+"""
+
+
+def caption_terms(caption: str) -> Dict[str, str]:
+    """
+    캡션 → 색인 컬럼 (공백으로 구분된 토큰)
+    한국어 단어는 extract_words() 와 같은 기준([가-힣]{2,}), 해시태그·멘션은 기호를 뗀 소문자
+    """
+    tokens = tokenize_caption(caption or "", ngram=1)
+    words = tokens["word"] + [w.lower() for w in LATIN_WORD_RE.findall(caption or "")]
+    return {
+        "words": " ".join(words),
+        "hashtags": " ".join(tag.lstrip("#") for tag in tokens["hashtag"]),
+        "mentions": " ".join(m.lstrip("@") for m in tokens["mention"]),
+    }
+
+
+def _quote(token: str) -> str:
+    return '"' + token.replace('"', '""') + '"'
+
+
+def build_match(term: Optional[str] = None, hashtag: Optional[str] = None, prefix: bool = True) -> Optional[str]:
+    """
+    검색어 / 해시태그 → FTS5 MATCH 식
+    한국어는 조사·어미가 붙어 색인되므로 기본은 접두어 검색 ("청도" → "청도혁신센터" 도 일치)
+    """
+    clauses = []
+    if term:
+        terms = caption_terms(term)
+        tokens = terms["words"].split() + terms["hashtags"].split()
+        if not tokens:
+            tokens = term.split()
+        for token in tokens:
+            clauses.append(f"words : {_quote(token)}{'*' if prefix else ''}")
+    if hashtag:
+        clauses.append(f"hashtags : {_quote(hashtag.lstrip('#').lower())}")
+    return " AND ".join(clauses) or None
+
+
+class CaptionIndex:
+    """
+    SQLite FTS5 캡션 색인 (Storage 와 같은 DB 파일 사용)
+    - add(): 게시물 단위로 색인 추가/갱신 (source + media_id 기준으로 한 건만 유지)
+    - search(): 검색어 / 해시태그 / username / 기간 조건으로 조회
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.conn.executescript(SCHEMA)
+
+    def add(self, source: str, docs: Iterable[Dict[str, Any]]) -> int:
+        """
+        docs: {"media_id", "caption", "username", "timestamp"} 목록
+        호출한 쪽의 트랜잭션 안에서 실행해도 됨 (commit 하지 않음)
+        """
+        count = 0
+        for doc in docs:
+            row = self.conn.execute(
+                "SELECT doc_id FROM caption_docs WHERE source = ? AND media_id = ?",
+                (source, doc["media_id"]),
+            ).fetchone()
+            if row:
+                doc_id = row[0]
+                self.conn.execute(
+                    "UPDATE caption_docs SET username = COALESCE(?, username), "
+                    "timestamp = COALESCE(?, timestamp) WHERE doc_id = ?",
+                    (doc.get("username"), doc.get("timestamp"), doc_id),
+                )
+                if doc.get("caption") is None:
+                    # 캡션 없는 부분 갱신(upsert 의 COALESCE 와 동일) → 기존 색인 유지
+                    count += 1
+                    continue
+                self.conn.execute("DELETE FROM caption_fts WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = self.conn.execute(
+                    "INSERT INTO caption_docs (source, media_id, username, timestamp) VALUES (?, ?, ?, ?)",
+                    (source, doc["media_id"], doc.get("username"), doc.get("timestamp")),
+                ).lastrowid
+            terms = caption_terms(doc.get("caption"))
+            self.conn.execute(
+                "INSERT INTO caption_fts (rowid, words, hashtags, mentions) VALUES (?, ?, ?, ?)",
+                (doc_id, terms["words"], terms["hashtags"], terms["mentions"]),
+            )
+            count += 1
+        return count
+
+    def rebuild(self) -> int:
+        """Storage 의 media / hashtag_posts 테이블 전체로 색인 다시 만들기"""
+        with self.conn:
+            self.conn.execute("DELETE FROM caption_fts")
+            self.conn.execute("DELETE FROM caption_docs")
+            count = self.add("media", (
+                {"media_id": r[0], "caption": r[1], "username": r[2], "timestamp": r[3]}
+                for r in self.conn.execute("SELECT id, caption, username, timestamp FROM media").fetchall()
+            ))
+            count += self.add("hashtag", (
+                {"media_id": r[0], "caption": r[1], "username": r[2], "timestamp": r[3]}
+                for r in self.conn.execute(
+                    "SELECT DISTINCT media_id, caption, username, timestamp FROM hashtag_posts"
+                ).fetchall()
+            ))
+        return count
+
+    def search(
+        self,
+        term: Optional[str] = None,
+        hashtag: Optional[str] = None,
+        username: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        source: Optional[str] = None,
+        limit: int = 100,
+        prefix: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        조건에 맞는 게시물 목록 (최신순)
+        - since / until: timestamp 문자열 비교 (예: "2025-05-01")
+        """
+        where, params = [], []
+        match = build_match(term, hashtag, prefix)
+        if match:
+            sql = ("SELECT d.source, d.media_id, d.username, d.timestamp "
+                   "FROM caption_fts JOIN caption_docs AS d ON d.doc_id = caption_fts.rowid")
+            where.append("caption_fts MATCH ?")
+            params.append(match)
+        else:
+            sql = "SELECT d.source, d.media_id, d.username, d.timestamp FROM caption_docs AS d"
+        if username:
+            where.append("d.username = ?")
+            params.append(username.lstrip("@"))
+        if since:
+            where.append("d.timestamp >= ?")
+            params.append(since)
+        if until:
+            where.append("d.timestamp < ?")
+            params.append(until)
+        if source:
+            where.append("d.source = ?")
+            params.append(source)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY d.timestamp DESC LIMIT ?"
+        params.append(limit)
+
+        keys = ("source", "media_id", "username", "timestamp")
+        return [dict(zip(keys, row)) for row in self.conn.execute(sql, params)]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Search collected captions (SQLite FTS5)")
+    parser.add_argument("--db", default=os.getenv("DB_PATH"), help="SQLite DB 경로 (기본: env DB_PATH)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("rebuild", help="media / hashtag_posts 테이블로 색인 다시 만들기")
+
+    search = sub.add_parser("search", help="캡션 검색")
+    search.add_argument("term", nargs="?", help="검색어 (한국어는 접두어 일치)")
+    search.add_argument("--hashtag", "-t", help="해시태그 (# 생략 가능)")
+    search.add_argument("--username", "-u", help="작성자 username")
+    search.add_argument("--days", type=int, help="최근 N 일 이내")
+    search.add_argument("--since", help="이 날짜 이후 (예: 2025-05-01)")
+    search.add_argument("--until", help="이 날짜 이전")
+    search.add_argument("--source", choices=["media", "hashtag"], help="내 게시물 / 해시태그 수집분만")
+    search.add_argument("--exact", action="store_true", help="접두어가 아닌 단어 전체 일치")
+    search.add_argument("--limit", "-n", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    if not args.db:
+        parser.error("--db 또는 환경변수 DB_PATH 를 지정하세요.")
+
+    conn = sqlite3.connect(args.db)
+    index = CaptionIndex(conn)
+
+    if args.command == "rebuild":
+        start = time.time()
+        print(f"✅ {index.rebuild()}건 색인 완료 ({time.time() - start:.2f}s)")
+    else:
+        since = args.since
+        if args.days:
+            since = (datetime.now(timezone.utc) - timedelta(days=args.days)).strftime("%Y-%m-%d")
+        start = time.time()
+        results = index.search(
+            args.term, args.hashtag, args.username, since, args.until,
+            args.source, args.limit, prefix=not args.exact,
+        )
+        elapsed_ms = (time.time() - start) * 1000
+        for r in results:
+            print(r["timestamp"], r["source"], r["username"] or "", r["media_id"])
+        print(f"🔎 {len(results)}건 ({elapsed_ms:.1f}ms)")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("change_tracker")
+
+# 해시에 포함할 미디어 필드 (insights 는 지표 이름 → 값만 포함, title / description 등 정의는 제외)
+HASH_FIELDS = (
+    "caption", "permalink", "media_type", "media_product_type", "timestamp",
+    "media_url", "like_count", "comments_count",
+)
+
+# 델타 로그에 남길 최근 실행 수 (더 오래된 델타를 못 받은 exporter 는 전체 재생성)
+DELTA_LOG_KEEP = int(os.getenv("DELTA_LOG_KEEP", "60"))
+
+
+def dataset_stem(dataset_path: str) -> str:
+    for ext in (".jsonl.gz", ".jsonl", ".json.gz", ".json", ".igarc"):
+        if dataset_path.endswith(ext):
+            return dataset_path[: -len(ext)]
+    return dataset_path
+
+
+def hash_path_for(dataset_path: str) -> str:
+    return dataset_stem(dataset_path) + ".hashes.json"
+
+
+def delta_path_for(dataset_path: str) -> str:
+    return dataset_stem(dataset_path) + ".delta.jsonl"
+
+
+def metric_values(post: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """insights → {지표: 값}, insights 가 목록이 아니면(오류 등) None"""
+    insights = post.get("insights")
+    if not isinstance(insights, list):
+        return None
+    values = {}
+    for insight in insights:
+        if not isinstance(insight, dict) or not insight.get("name"):
+            continue
+        items = insight.get("values")
+        values[insight["name"]] = items[0].get("value") if items and isinstance(items, list) else None
+    return values
+
+
+def content_hash(post: Dict[str, Any]) -> str:
+    """캡션 / 링크 / 지표 값 등 내용 기준 해시 (같은 내용이면 수집 시각과 무관하게 같은 값)"""
+    body = {field: post.get(field) for field in HASH_FIELDS}
+    if "insights" in post:
+        body["insights"] = metric_values(post)
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ChangeTracker:
+    """
+    데이터 파일 옆에 미디어별 내용 해시(<stem>.hashes.json) 를 두고 실행마다 델타 기록
+    - observe(): 이번 실행에서 저장한 미디어를 넘기면 new / changed 판정
+    - finish(): complete=True 면 이번에 안 보인 미디어를 deleted 로 판정,
+      변경이 있으면 <stem>.delta.jsonl 에 {seq, new, changed, deleted, records} 한 줄 추가
+    records 에 new / changed 미디어를 함께 남겨서 exporter 가 원본 전체를 다시 읽지 않고 델타만 반영
+    해시 파일이 없던 첫 실행은 baseline 델타(레코드 없음) → exporter 는 전체 재생성
+    """
+
+    def __init__(self, dataset_path: str):
+        self.dataset_path = dataset_path
+        self.hash_path = hash_path_for(dataset_path)
+        self.delta_path = delta_path_for(dataset_path)
+        state = {}
+        self.baseline = not os.path.exists(self.hash_path)
+        if not self.baseline:
+            with open(self.hash_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        self.seq: int = state.get("seq", 0)
+        if self.baseline:
+            # 해시 파일만 지운 경우에도 seq 는 델타 로그에 이어서 증가 → exporter 가 baseline 을 보고 전체 재생성
+            self.seq = max((entry["seq"] for entry in read_deltas(self.delta_path)), default=0)
+        self.hashes: Dict[str, str] = state.get("hashes", {})
+        self.seen: set = set()
+        self.new: List[str] = []
+        self.changed: List[str] = []
+        self.records: List[Dict[str, Any]] = []
+
+    def observe(self, post: Dict[str, Any]) -> Optional[str]:
+        """미디어 1건 판정 → "new" / "changed" / None(변경 없음)"""
+        media_id = post.get("id")
+        if not media_id or media_id in self.seen:
+            return None
+        self.seen.add(media_id)
+        digest = content_hash(post)
+        previous = self.hashes.get(media_id)
+        if previous == digest:
+            return None
+        self.hashes[media_id] = digest
+        status = "new" if previous is None else "changed"
+        (self.new if previous is None else self.changed).append(media_id)
+        self.records.append(post)
+        return status
+
+    def observe_many(self, posts: Iterable[Dict[str, Any]]) -> None:
+        for post in posts:
+            self.observe(post)
+
+    def unchanged(self, complete: bool = True) -> bool:
+        """지금까지 넘긴 미디어가 모두 이전과 같으면 True (complete 면 삭제된 미디어도 없어야 함)"""
+        if self.new or self.changed:
+            return False
+        return not complete or all(mid in self.seen for mid in self.hashes)
+
+    def finish(self, complete: bool = True) -> Dict[str, Any]:
+        """
+        델타 확정 + 해시 / 델타 로그 저장, 델타 요약 반환
+        - complete: 이번 실행에서 데이터셋 전체를 넘겼으면 True (안 보인 미디어 = deleted)
+                    새 미디어만 이어 붙인 경우처럼 일부만 넘겼으면 False
+        """
+        deleted = [mid for mid in self.hashes if mid not in self.seen] if complete else []
+        for mid in deleted:
+            del self.hashes[mid]
+
+        delta = {"seq": self.seq, "new": self.new, "changed": self.changed, "deleted": deleted}
+        if self.new or self.changed or deleted:
+            self.seq += 1
+            delta["seq"] = self.seq
+            entry = {**delta, "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "records": self.records}
+            if self.baseline:  # 데이터셋 전체가 new → 레코드를 복사해 두지 않음
+                entry.update(baseline=True, new=[], records=[])
+            self._append_delta(entry)
+        self._save_hashes()
+        logger.debug(describe(delta))
+        return delta
+
+    def _save_hashes(self) -> None:
+        tmp = self.hash_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": self.seq, "hashes": self.hashes}, f)
+        os.replace(tmp, self.hash_path)
+
+    def _append_delta(self, entry: Dict[str, Any]) -> None:
+        """델타 한 줄 추가, DELTA_LOG_KEEP 개를 넘으면 오래된 줄부터 제거"""
+        entries = read_deltas(self.delta_path)
+        entries.append(entry)
+        entries = entries[-DELTA_LOG_KEEP:]
+        tmp = self.delta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for item in entries:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.delta_path)
+
+
+def describe(delta: Dict[str, Any]) -> str:
+    return (
+        f"🔎 변경 감지: 새 {len(delta['new'])}개, 변경 {len(delta['changed'])}개, "
+        f"삭제 {len(delta['deleted'])}개 (seq={delta['seq']})"
+    )
+
+
+def read_deltas(delta_path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(delta_path):
+        return []
+    with open(delta_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def pending_changes(dataset_path: str, after_seq: int) -> Optional[Tuple[int, Dict[str, Optional[Dict[str, Any]]]]]:
+    """
+    after_seq 이후 델타를 미디어별 최종 상태로 합침 → (마지막 seq, {media_id: 최신 레코드 또는 None(삭제)})
+    필요한 델타가 로그에서 이미 잘려 나갔으면 None (전체 재생성 필요)
+    """
+    entries = [entry for entry in read_deltas(delta_path_for(dataset_path)) if entry["seq"] > after_seq]
+    last_seq = entries[-1]["seq"] if entries else after_seq
+    if entries and entries[0]["seq"] != after_seq + 1:
+        return None
+    if any(entry.get("baseline") for entry in entries):
+        return None
+    changes: Dict[str, Optional[Dict[str, Any]]] = {}
+    for entry in entries:
+        for mid in entry["deleted"]:
+            changes[mid] = None
+        for record in entry["records"]:
+            changes[record["id"]] = record
+    return last_seq, changes
+
+
+def current_seq(dataset_path: str) -> int:
+    path = hash_path_for(dataset_path)
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("seq", 0)
+
+
+def load_export_state(output_base: str) -> Dict[str, Any]:
+    path = output_base + ".export.json"
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_export_state(output_base: str, state: Dict[str, Any]) -> None:
+    """exporter 상태 기록 (<output_base>.export.json)"""
+    path = output_base + ".export.json"
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def changes_since_export(
+    dataset_path: str, output_base: str
+) -> Optional[Tuple[int, Dict[str, Optional[Dict[str, Any]]]]]:
+    """
+    exporter 가 마지막으로 반영한 뒤의 변경 → (마지막 seq, {media_id: 레코드 또는 None})
+    상태가 없거나, 다른 데이터셋이거나, 델타를 이어 붙일 수 없으면 None (전체 재생성)
+    """
+    state = load_export_state(output_base)
+    seq = state.get("seq")
+    if state.get("dataset") != os.path.abspath(dataset_path) or seq is None:
+        return None
+    if seq > current_seq(dataset_path):  # 해시 파일을 지우고 다시 시작한 경우
+        return None
+    return pending_changes(dataset_path, seq)
+
+
+def mark_exported(dataset_path: str, output_base: str, seq: Optional[int] = None, **extra: Any) -> None:
+    """exporter 가 seq 까지 반영했음을 기록 (기본: 데이터셋의 현재 seq)"""
+    save_export_state(output_base, {
+        "dataset": os.path.abspath(dataset_path),
+        "seq": current_seq(dataset_path) if seq is None else seq,
+        **extra,
+    })
@@ -0,0 +1,69 @@
+import sys
+import importlib
+from typing import List, Optional
+
+# 서브커맨드 → 모듈 (선택한 모듈만 import 하므로 가벼운 명령은 pandas / requests 를 불러오지 않음)
+COMMANDS = {
+    "hashtag-id":     ("hash_ID_srch",      "해시태그 이름 → ID 조회 (캐시 / 7일 한도)"),
+    "hashtag-posts":  ("hash_ID_posts",     "해시태그 최근 게시물 조회"),
+    "crawl-hashtags": ("hashtag_crawler",   "여러 해시태그 recent/top 게시물 동시 수집"),
+    "poll-hashtags":  ("hashtag_scheduler", "해시태그 recent 게시물 상시 폴링 (속도별 간격 / 요청 예산)"),
+    "accounts":       ("user_id",           "연결된 IG 비즈니스 계정 조회"),
+    "crawl-accounts": ("multi_account",     "연결된 계정 전부 미디어 + insights 동시 수집"),
+    "media":          ("my_contents",       "내 계정 미디어 목록 수집"),
+    "insights":       ("my_insight",        "내 계정 미디어 + insights 수집"),
+    "retry-insights": ("my_insight_test",   "media_id 목록 insights 재수집"),
+    "export":         ("js_to_csv",         "insights 데이터셋 → CSV / Parquet"),
+    "archive":        ("insights_archive",  "insights 덤프 ↔ 압축 아카이브(.igarc)"),
+    "analytics":      ("engagement_analytics", "미디어 타입별 참여율 / 이동 비율 / top-N / 시간대 heatmap"),
+    "captions":       ("caption_analytics", "캡션 해시태그 / 단어 집계"),
+    "search":         ("caption_index",     "캡션 검색 색인 (FTS5)"),
+    "convert":        ("converter_ins",     "미디어 JSON → CSV + 단어 빈도"),
+    "mock-server":    ("mock_graph",        "로컬 mock Graph API 서버"),
+    "bench":          ("benchmark",         "mock 대상 처리량 벤치마크"),
+}
+
+
+def usage() -> str:
+    lines = ["usage: python -m app <command> [options]", "", "commands:"]
+    for name, (_, help_text) in COMMANDS.items():
+        lines.append(f"  {name:<16}{help_text}")
+    lines.append(f"  {'serve':<16}API 서버 실행 (uvicorn app.main:app)")
+    lines.append("")
+    lines.append("명령별 옵션: python -m app <command> --help")
+    return "\n".join(lines)
+
+
+def serve(argv: List[str]) -> None:
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m app serve", description="Run the FastAPI service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--reload", action="store_true")
+    args = parser.parse_args(argv)
+    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=args.reload)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        raise SystemExit(0 if argv else 2)
+
+    command, rest = argv[0], argv[1:]
+    if command != "serve" and command not in COMMANDS:
+        print(f"알 수 없는 명령: {command}\n\n{usage()}", file=sys.stderr)
+        raise SystemExit(2)
+
+    # 튜닝 값(GRAPH_*, DB_PATH 등)은 모듈 import 시 읽으므로 .env 를 먼저 로드
+    from . import config
+    config.load_env()
+
+    if command == "serve":
+        serve(rest)
+        return
+    module = importlib.import_module(f".{COMMANDS[command][0]}", __package__)
+    sys.argv[0] = f"python -m app {command}"  # argparse usage 에 서브커맨드 표시
+    module.main(rest)
@@ -0,0 +1,75 @@
+import os
+import logging
+import threading
+from typing import Optional
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+
+def load_env() -> None:
+    """
+    .env 를 프로세스에서 한 번만 로드 (이미 설정된 환경변수는 덮어쓰지 않음)
+    import 시에는 호출하지 않음 → CLI / API 서버 진입점, 또는 env() 를 처음 부를 때 로드
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if _env_loaded:
+            return
+        try:
+            from dotenv import load_dotenv
+        except ImportError:  # python-dotenv 없이 환경변수만 쓰는 경우
+            pass
+        else:
+            load_dotenv()
+        _env_loaded = True
+
+
+def env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """환경변수 조회 (처음 호출할 때 .env 로드), 빈 문자열은 없는 것으로 처리"""
+    load_env()
+    value = os.getenv(name)
+    return value if value else default
+
+
+def require(name: str) -> str:
+    """꼭 필요한 설정 조회 (없으면 RuntimeError)"""
+    value = env(name)
+    if not value:
+        raise RuntimeError(f"환경변수 {name}을(를) 설정해주세요.")
+    return value
+
+
+def output_dir() -> str:
+    """결과 저장 폴더 (env OUTPUT_DIR, 없으면 현재 폴더), 처음 쓸 때 생성"""
+    path = env("OUTPUT_DIR", ".")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def setup_logging(
+    logger: logging.Logger,
+    log_file: Optional[str] = None,
+    fmt: str = LOG_FORMAT,
+    console: bool = True,
+) -> logging.Logger:
+    """
+    CLI 실행 시 로거에 파일 / 콘솔 핸들러 연결 (라이브러리로 import 할 때는 핸들러를 달지 않음)
+    같은 파일 핸들러는 한 번만 추가
+    """
+    logger.setLevel(logging.INFO)
+    if log_file:
+        path = os.path.abspath(log_file)
+        if not any(getattr(h, "baseFilename", None) == path for h in logger.handlers):
+            fh = logging.FileHandler(path, encoding="utf-8")
+            fh.setFormatter(logging.Formatter(fmt))
+            logger.addHandler(fh)
+    if console and not any(type(h) is logging.StreamHandler for h in logger.handlers):
+        ch = logging.StreamHandler()
+        ch.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+        logger.addHandler(ch)
+    return logger
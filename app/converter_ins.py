@@ -1,69 +1,134 @@
-import json
+import os
 import csv
-import re
-from collections import Counter
+import argparse
+from typing import Any, Dict, List, Optional
+from .change_tracker import changes_since_export, load_export_state, mark_exported
+from .media_reader import iter_media
+from .caption_analytics import analyze_file, write_results
 
-# 1. JSON을 간단한 CSV로 변환
-def json_to_csv():
-    # JSON 파일 읽기
-    with open('/mnt/user-data/uploads/all_user_media.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # CSV로 저장
-    with open('/mnt/user-data/outputs/posts.csv', 'w', newline='', encoding='utf-8-sig') as f:
+SCRIPTS_DIR  = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+POSTS_INPUT  = os.path.join(SCRIPTS_DIR, 'all_user_media.json')
+POSTS_OUTPUT = os.path.join(SCRIPTS_DIR, 'posts.csv')
+POSTS_HEADER = ['날짜', '제목/내용', '링크']
+
+
+def post_row(post: Dict[str, Any]) -> List[str]:
+    # 날짜 간단히 변환 (YYYY-MM-DD 형식)
+    date = post['timestamp'][:10] if 'timestamp' in post else ''
+    # 내용
+    caption = post.get('caption', '').replace('\n', ' ').replace('\r', '')[:500]  # 500자로 제한
+    # 링크
+    link = post.get('permalink', '')
+    return [date, caption, link]
+
+
+def _write_rows(output_path: str, rows: List[List[str]]) -> None:
+    tmp = output_path + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8-sig') as f:
         writer = csv.writer(f)
-        writer.writerow(['날짜', '제목/내용', '링크'])  # 헤더
-        
-        for post in data:
-            # 날짜 간단히 변환 (YYYY-MM-DD 형식)
-            date = post['timestamp'][:10] if 'timestamp' in post else ''
-            # 내용
-            caption = post.get('caption', '').replace('\n', ' ').replace('\r', '')[:500]  # 500자로 제한
-            # 링크
-            link = post.get('permalink', '')
-            
-            writer.writerow([date, caption, link])
-    
+        writer.writerow(POSTS_HEADER)  # 헤더
+        writer.writerows(rows)
+    os.replace(tmp, output_path)
+
+
+def _apply_delta(input_path: str, output_path: str) -> Optional[int]:
+    """
+    지난 변환 이후 바뀐 미디어만 posts.csv 에 반영 (변경은 제자리, 새 미디어는 맨 앞, 삭제는 제거)
+    CSV 에는 id 컬럼이 없으므로 행 순서대로의 id 목록을 변환 상태(<csv>.export.json) 에 둠
+    반영할 수 없으면 None (전체 변환)
+    """
+    base = os.path.splitext(output_path)[0]
+    ids = load_export_state(base).get('ids')
+    pending = changes_since_export(input_path, base)
+    if pending is None or ids is None or not os.path.exists(output_path):
+        return None
+    seq, changes = pending
+    if changes:
+        with open(output_path, 'r', newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))[1:]
+        if len(rows) != len(ids):
+            return None
+        known = set(ids)
+        new_ids = [mid for mid, record in changes.items() if record is not None and mid not in known]
+        merged_ids, merged_rows = [], []
+        for mid in new_ids:
+            merged_ids.append(mid)
+            merged_rows.append(post_row(changes[mid]))
+        for mid, row in zip(ids, rows):
+            if mid in changes:
+                if changes[mid] is None:
+                    continue
+                row = post_row(changes[mid])
+            merged_ids.append(mid)
+            merged_rows.append(row)
+        _write_rows(output_path, merged_rows)
+        ids = merged_ids
+    mark_exported(input_path, base, seq, ids=ids)
+    return len(changes)
+
+
+# 1. JSON을 간단한 CSV로 변환
+def json_to_csv(input_path: str = POSTS_INPUT, output_path: str = POSTS_OUTPUT, full: bool = False):
+    # 지난 변환 이후 바뀐 미디어만 반영 (change_tracker 델타), 불가능하면 전체 변환
+    if not full:
+        changed = _apply_delta(input_path, output_path)
+        if changed is not None:
+            print(f"✅ posts.csv 델타 반영 완료! (바뀐 게시물 {changed}개)")
+            return
+
+    # JSON 파일을 한 건씩 읽으면서 바로 CSV로 저장
+    ids, rows = [], []
+    for post in iter_media(input_path):
+        ids.append(post.get('id'))
+        rows.append(post_row(post))
+    _write_rows(output_path, rows)
+    mark_exported(input_path, os.path.splitext(output_path)[0], ids=ids)
+
     print("✅ posts.csv 파일 생성 완료!")
 
 # 2. 사용된 단어만 뽑기
-def extract_words():
-    # JSON 파일 읽기
-    with open('scripts/all_user_media.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # 모든 텍스트 합치기
-    all_text = ""
-    for post in data:
-        caption = post.get('caption', '')
-        if caption:
-            all_text += caption + " "
-    
-    # 한국어 단어만 추출 (2글자 이상)
-    korean_words = re.findall(r'[가-힣]{2,}', all_text)
-    
-    # 빈도 계산
-    word_count = Counter(korean_words)
-    
-    # 결과를 간단한 CSV로 저장
-    with open('scripts/words.csv', 'w', newline='', encoding='utf-8-sig') as f:
-        writer = csv.writer(f)
-        writer.writerow(['단어', '횟수'])  # 헤더
-        
-        # 빈도 높은 순으로 저장
-        for word, count in word_count.most_common():
-            writer.writerow([word, count])
-    
+def extract_words(input_path: str = POSTS_INPUT, output_dir: str = SCRIPTS_DIR):
+    # 캡션 분석 엔진으로 집계 (프로세스 풀 + 한 건씩 읽기)
+    # 한국어 단어(2글자 이상)와 함께 해시태그 / 멘션 / n-gram / 기간·타입별 집계도 저장
+    stats = analyze_file(input_path)
+    word_count = stats["total"]["word"]
+    write_results(stats, output_dir)
+
     print(f"✅ words.csv 파일 생성 완료! (총 {len(word_count)}개 단어)")
-    
+
     # 상위 20개 단어 출력
     print("\n📊 가장 많이 사용된 단어 TOP 20:")
     for i, (word, count) in enumerate(word_count.most_common(20), 1):
         print(f"{i:2d}. {word} ({count}회)")
 
 # 실행
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert media JSON into a simple posts CSV and caption word statistics"
+    )
+    parser.add_argument(
+        "input", nargs="?", default=POSTS_INPUT,
+        help="미디어 JSON / JSONL(.gz) 파일 경로 (기본: scripts/all_user_media.json)"
+    )
+    parser.add_argument(
+        "--output-dir", "-o", default=SCRIPTS_DIR,
+        help="posts.csv / words.csv 등을 저장할 폴더 (기본: scripts/)"
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="델타 반영 대신 항상 posts.csv 전체를 다시 변환"
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"입력 파일이 없습니다: {args.input}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
     print("🚀 변환 시작...")
-    json_to_csv()
-    extract_words()
-    print("\n✨ 모든 작업 완료!")
\ No newline at end of file
+    json_to_csv(args.input, os.path.join(args.output_dir, 'posts.csv'), full=args.full)
+    extract_words(args.input, args.output_dir)
+    print("\n✨ 모든 작업 완료!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from .graph_client import RATE_LIMIT_CODES, redact
+from .jsonl_writer import JsonlWriter, is_jsonl_path
+from .media_reader import iter_media
+
+logger = logging.getLogger("dead_letter")
+
+# 재시도 간격: BASE * 2^(시도 횟수-1) (+ jitter), 최대 MAX 초 / MAX_ATTEMPTS 회 실패하면 포기
+DEAD_LETTER_BACKOFF_BASE = float(os.getenv("DEAD_LETTER_BACKOFF_BASE", "300"))
+DEAD_LETTER_BACKOFF_MAX  = float(os.getenv("DEAD_LETTER_BACKOFF_MAX", "86400"))
+DEAD_LETTER_MAX_ATTEMPTS = int(os.getenv("DEAD_LETTER_MAX_ATTEMPTS", "5"))
+
+# 일시적 오류를 뜻하는 Graph API 오류 코드 (1: unknown, 2: service unavailable)
+TRANSIENT_CODES = {1, 2}
+
+# 다시 요청해도 결과가 바뀌지 않는 오류 (지원하지 않는 지표, 삭제된 미디어 등)
+PERMANENT_CLASSES = {"client"}
+
+_STATUS_RE = re.compile(r"^(\d{3})\b")
+
+
+def classify_error(error: Any) -> str:
+    """
+    insights 오류 → 오류 분류
+    - rate_limit: 429 / Graph 호출 한도 코드(HTTP 400/403 으로 내려옴) / server: 5xx, is_transient
+    - network: 연결·타임아웃 / client: 그 밖의 4xx (재시도해도 같은 결과) / unknown: 판단 불가
+    error 는 graph_client.error_info() 의 dict({"status", "code", ...}) 또는 문자열
+    """
+    if isinstance(error, dict):
+        code, status = error.get("code"), error.get("status")
+        if status == 429 or code in RATE_LIMIT_CODES:
+            return "rate_limit"
+        if error.get("is_transient") or code in TRANSIENT_CODES or (status is not None and status >= 500):
+            return "server"
+        if status is not None and status >= 400:
+            return "client"
+        error = error.get("message") or ""
+    text = error if isinstance(error, str) else json.dumps(error, ensure_ascii=False)
+    lowered = text.lower()
+    match = _STATUS_RE.match(text.strip())
+    status = int(match.group(1)) if match else None
+    if status == 429 or "rate limit" in lowered or "request limit" in lowered:
+        return "rate_limit"
+    if status is not None and status >= 500:
+        return "server"
+    if status is not None and status >= 400:
+        return "client"
+    if any(word in lowered for word in ("timeout", "timed out", "connection", "응답 없음")):
+        return "network"
+    return "unknown"
+
+
+def is_failed(post: Dict[str, Any]) -> bool:
+    """insights 가 정상 목록이 아니면(오류 문자열/객체, 없음) 실패"""
+    return not isinstance(post.get("insights"), list)
+
+
+class DeadLetterStore:
+    """
+    insights 수집에 실패한 미디어 기록 (JSON 파일)
+    - record(): 오류 분류 / 시도 횟수 / 다음 재시도 시각(지수 백오프) 갱신
+    - resolve(): 재시도에 성공한 미디어 제거
+    - due(): 지금 재시도할 차례인 항목 (영구 오류·최대 시도 초과는 제외)
+    여러 워커 스레드에서 동시에 사용해도 안전
+    """
+
+    def __init__(self, path: str, max_attempts: int = DEAD_LETTER_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, post: Dict[str, Any], metrics: Optional[str], error: Any) -> None:
+        now = time.time()
+        error_class = classify_error(error)
+        with self._lock:
+            entry = self._entries.get(post["id"]) or {
+                "media_id": post["id"],
+                "attempts": 0,
+                "first_failed_at": now,
+            }
+            attempts = entry["attempts"] + 1
+            delay = min(DEAD_LETTER_BACKOFF_MAX, DEAD_LETTER_BACKOFF_BASE * (2 ** (attempts - 1)))
+            entry.update({
+                "media_type": post.get("media_type"),
+                "media_product_type": post.get("media_product_type"),
+                "timestamp": post.get("timestamp"),
+                "metrics": metrics,
+                "error": redact(error if isinstance(error, str) else json.dumps(error, ensure_ascii=False)),
+                "error_class": error_class,
+                "attempts": attempts,
+                "last_failed_at": now,
+                "next_retry_at": now + random.uniform(delay / 2, delay),
+            })
+            self._entries[post["id"]] = entry
+
+    def resolve(self, media_id: str) -> bool:
+        with self._lock:
+            return self._entries.pop(media_id, None) is not None
+
+    def due(self, now: Optional[float] = None, include_permanent: bool = False,
+            ignore_schedule: bool = False) -> List[Dict[str, Any]]:
+        """재시도 대상 항목 (오래 실패한 것부터)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = [
+                dict(entry) for entry in self._entries.values()
+                if (include_permanent or entry["error_class"] not in PERMANENT_CLASSES)
+                and entry["attempts"] < self.max_attempts
+                and (ignore_schedule or entry["next_retry_at"] <= now)
+            ]
+        return sorted(entries, key=lambda entry: entry["first_failed_at"])
+
+    def save(self) -> None:
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_class: Dict[str, int] = {}
+            for entry in self._entries.values():
+                by_class[entry["error_class"]] = by_class.get(entry["error_class"], 0) + 1
+            gave_up = sum(1 for entry in self._entries.values() if entry["attempts"] >= self.max_attempts)
+            return {"failed": len(self._entries), "by_class": by_class, "gave_up": gave_up}
+
+
+def record_results(store: DeadLetterStore, posts: Iterable[Dict[str, Any]], get_metrics) -> int:
+    """수집 결과를 보고 실패한 미디어는 기록, 성공한 미디어는 기록에서 제거 → 실패 수 반환"""
+    failed = 0
+    for post in posts:
+        if is_failed(post):
+            store.record(post, get_metrics(post), post.get("insights", "insights 없음"))
+            failed += 1
+        else:
+            store.resolve(post["id"])
+    return failed
+
+
+def merge_into_dataset(path: str, recovered: Dict[str, List[Dict[str, Any]]]) -> int:
+    """
+    재시도에 성공한 insights({media_id: insights}) 를 기존 데이터 파일(JSON / JSONL / .igarc)에 반영
+    임시 파일에 한 건씩 쓴 뒤 교체 → 반영한 미디어 수 반환
+    """
+    if not recovered or not os.path.exists(path):
+        return 0
+    merged = 0
+    tmp_path = path + ".tmp"
+    if is_jsonl_path(path):
+        with JsonlWriter(tmp_path) as writer:
+            for post in iter_media(path):
+                if post.get("id") in recovered:
+                    post["insights"] = recovered[post["id"]]
+                    merged += 1
+                writer.write(post)
+    else:
+        posts = []
+        for post in iter_media(path):
+            if post.get("id") in recovered:
+                post["insights"] = recovered[post["id"]]
+                merged += 1
+            posts.append(post)
+        if path.endswith(".igarc"):
+            from .insights_archive import write_archive
+            write_archive(tmp_path, posts)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(posts, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return merged
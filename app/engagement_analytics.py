@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from .change_tracker import current_seq, dataset_stem
+from .js_to_csv import flatten_insights
+from .media_reader import iter_media
+
+# 게시 시각(요일 / 시간대)을 볼 시간대
+ANALYTICS_TZ = os.getenv("ANALYTICS_TZ", "Asia/Seoul")
+# reach 가 이보다 작은 게시물은 백분위 / top-N 에서 제외 (reach 1, 좋아요 1 = 100% 같은 잡음)
+ANALYTICS_MIN_REACH = int(os.getenv("ANALYTICS_MIN_REACH", "30"))
+
+# 결과 구조가 바뀌면 올려서 이전 캐시를 무효화
+REPORT_VERSION = 1
+
+# 미디어 메타 필드 (insights 덤프에 없으면 --media 파일에서 id 로 합침)
+META_FIELDS = ("media_type", "media_product_type", "timestamp", "permalink", "caption")
+# 비율 계산에 쓰는 지표 (없으면 0)
+RATE_METRICS = ("reach", "interactions", "saved", "shares")
+# total_interactions 가 없는 지표 세트에서 대신 합칠 지표
+INTERACTION_METRICS = ("likes", "comments", "saved", "shares")
+# 비율 컬럼: (컬럼명, 분자)
+RATES = (("engagement_rate(%)", "interactions"), ("save_rate(%)", "saved"), ("share_rate(%)", "shares"))
+WEEKDAYS = ("월", "화", "수", "목", "금", "토", "일")
+
+
+def analytics_path_for(dataset_path: str) -> str:
+    return dataset_stem(dataset_path) + ".analytics.json"
+
+
+def dataset_version(dataset_path: str, media_path: Optional[str] = None, **params: Any) -> str:
+    """
+    데이터셋 버전 키: change_tracker seq + 파일 크기 / 수정 시각 (+ 메타 파일, 집계 옵션)
+    수집 스크립트가 바뀐 게 없어 데이터 파일을 다시 쓰지 않으면 키도 그대로
+    """
+    parts: List[Any] = [REPORT_VERSION, current_seq(dataset_path), params]
+    for path in (dataset_path, media_path):
+        if path:
+            st = os.stat(path)
+            parts.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+# =====================================
+# 1️⃣ 데이터셋 → DataFrame
+# =====================================
+def read_columns(records: Iterable[Dict[str, Any]]) -> Dict[str, list]:
+    """한 번 읽으면서 지표 컬럼(flatten_insights) 과 메타 컬럼을 함께 구성"""
+    meta: Dict[str, list] = {field: [] for field in META_FIELDS}
+
+    def tap() -> Iterable[Dict[str, Any]]:
+        for post in records:
+            for field, column in meta.items():
+                column.append(post.get(field))
+            yield post
+
+    metrics = flatten_insights(tap())
+    return {**metrics, **meta}
+
+
+def media_group(df):
+    """get_metrics_for_post() 와 같은 기준의 지표 세트 구분 (STORY / REELS / VIDEO / FEED)"""
+    import numpy as np
+
+    product = df["media_product_type"].fillna("")
+    kind = df["media_type"].fillna("")
+    return np.select(
+        [product == "STORY", product == "REELS", kind == "VIDEO"],
+        ["STORY", "REELS", "VIDEO"],
+        default="FEED",
+    )
+
+
+def _ratio(numerator, denominator):
+    """벡터 비율(%) (분모가 0 이면 0), 소수 둘째 자리"""
+    import numpy as np
+
+    num = np.asarray(numerator, dtype="float64")
+    den = np.asarray(denominator, dtype="float64")
+    out = np.zeros_like(num)
+    np.divide(num, den, out=out, where=den > 0)
+    return (out * 100).round(2)
+
+
+def build_posts(dataset_path: str, media_path: Optional[str] = None, tz: str = ANALYTICS_TZ):
+    """
+    게시물별 DataFrame: id / 메타 / 지표 / interactions / 비율 / media_group / posted_at(tz)
+    - media_path: insights 덤프에 media_type / timestamp 가 없을 때 미디어 목록 파일에서 id 로 합침
+    """
+    import pandas as pd
+
+    columns = read_columns(iter_media(dataset_path))
+    df = pd.DataFrame(columns)
+    if media_path:
+        meta = pd.DataFrame(read_columns(iter_media(media_path)))[["id", *META_FIELDS]]
+        meta = meta.drop_duplicates("id").set_index("id")
+        for field in META_FIELDS:
+            df[field] = df[field].fillna(df["id"].map(meta[field]))
+
+    metrics = [name for name in columns if name != "id" and name not in META_FIELDS]
+    df[metrics] = df[metrics].apply(pd.to_numeric, errors="coerce").fillna(0)
+    if "total_interactions" in df.columns:
+        df["interactions"] = df["total_interactions"]
+    else:
+        df["interactions"] = df.reindex(columns=list(INTERACTION_METRICS), fill_value=0).sum(axis=1)
+    for name in RATE_METRICS:
+        if name not in df.columns:
+            df[name] = 0
+    for column, numerator in RATES:
+        df[column] = _ratio(df[numerator], df["reach"])
+
+    df["media_group"] = media_group(df)
+    posted = pd.to_datetime(df["timestamp"], format="%Y-%m-%dT%H:%M:%S%z", errors="coerce", utc=True)
+    df["posted_at"] = posted.dt.tz_convert(tz)
+    return df
+
+
+# =====================================
+# 2️⃣ 집계 (모두 벡터 연산)
+# =====================================
+def rate_table(df):
+    """
+    media_group / media_type / media_product_type 별 비율
+    - 비율은 합계 기준 (Σ분자 / Σreach), 게시물별 비율의 중앙값도 함께 (reach 0 인 게시물 제외)
+    """
+    import pandas as pd
+
+    reached = df["engagement_rate(%)"].where(df["reach"] > 0)
+    frames = []
+    for dimension in ("ALL", "media_group", "media_type", "media_product_type"):
+        keys = pd.Series("ALL", index=df.index) if dimension == "ALL" else df[dimension].fillna("UNKNOWN")
+        grouped = df.groupby(keys)
+        sums = grouped[list(RATE_METRICS)].sum()
+        table = pd.DataFrame({"dimension": dimension, "posts": grouped.size(), "reach": sums["reach"]})
+        for column, numerator in RATES:
+            table[column] = _ratio(sums[numerator], sums["reach"])
+        table["median_engagement_rate(%)"] = reached.groupby(keys).median().round(2)
+        frames.append(table.rename_axis("key").reset_index())
+    return pd.concat(frames, ignore_index=True)
+
+
+def rolling_table(df, windows: Iterable[int] = (7, 30)):
+    """게시일 기준 일별 합계 → 최근 N일 이동 비율 (게시물이 없는 날도 0 으로 채워서 달력 기준)"""
+    daily = (
+        df.dropna(subset=["posted_at"])
+        .assign(posts=1)
+        .set_index("posted_at")[["posts", *RATE_METRICS]]
+        .resample("D")
+        .sum()
+    )
+    table = daily[["posts"]].copy()
+    for window in windows:
+        rolled = daily.rolling(f"{window}D").sum()
+        table[f"posts_{window}d"] = rolled["posts"].astype("int64")
+        for column, numerator in RATES:
+            table[column.replace("(%)", f"_{window}d(%)")] = _ratio(rolled[numerator], rolled["reach"])
+    table.index = table.index.strftime("%Y-%m-%d")
+    return table.rename_axis("date").reset_index()
+
+
+def add_percentiles(df, min_reach: int = ANALYTICS_MIN_REACH):
+    """media_group 안에서의 engagement_rate 백분위 (reach < min_reach 는 제외 → NaN)"""
+    eligible = df["reach"] >= min_reach
+    ranks = df.loc[eligible].groupby("media_group")["engagement_rate(%)"].rank(pct=True)
+    df["percentile"] = (ranks * 100).round(1).reindex(df.index)
+    return df
+
+
+def top_posts(df, top: int = 10, min_reach: int = ANALYTICS_MIN_REACH):
+    """engagement_rate 상위 top 개 (전체 + media_group 별)"""
+    import pandas as pd
+
+    eligible = df[df["reach"] >= min_reach].sort_values(
+        ["engagement_rate(%)", "reach"], ascending=False, kind="stable"
+    )
+    overall = eligible.head(top).assign(group="ALL")
+    by_group = eligible.groupby("media_group", sort=True).head(top).assign(group=lambda d: d["media_group"])
+    table = pd.concat([overall, by_group.sort_values("group", kind="stable")], ignore_index=True)
+    table["rank"] = table.groupby("group").cumcount() + 1
+    table["caption"] = table["caption"].fillna("").str.replace("\n", " ").str.slice(0, 60)
+    columns = ["group", "rank", "id", "media_type", "timestamp", "permalink", "reach",
+               *(column for column, _ in RATES), "percentile", "caption"]
+    return table[columns]
+
+
+def hour_heatmap(df) -> Dict[str, Any]:
+    """요일(월~일) × 시간(0~23) 게시물 수 / 합계 기준 engagement_rate (np.bincount 한 번씩)"""
+    import numpy as np
+
+    posted = df["posted_at"].dropna()
+    rows = df.loc[posted.index]
+    slot = (posted.dt.weekday * 24 + posted.dt.hour).to_numpy()
+    posts = np.bincount(slot, minlength=168)
+    interactions = np.bincount(slot, weights=rows["interactions"].to_numpy(dtype="float64"), minlength=168)
+    reach = np.bincount(slot, weights=rows["reach"].to_numpy(dtype="float64"), minlength=168)
+    return {
+        "weekdays": list(WEEKDAYS),
+        "posts": posts.reshape(7, 24).tolist(),
+        "engagement_rate(%)": _ratio(interactions, reach).reshape(7, 24).tolist(),
+    }
+
+
+def _records(df) -> List[Dict[str, Any]]:
+    # to_json 이 numpy 타입 / NaN(→ null) / Timestamp 를 한 번에 처리
+    return json.loads(df.to_json(orient="records", force_ascii=False, date_format="iso"))
+
+
+def compute_report(
+    dataset_path: str,
+    media_path: Optional[str] = None,
+    top: int = 10,
+    windows: Iterable[int] = (7, 30),
+    tz: str = ANALYTICS_TZ,
+    min_reach: int = ANALYTICS_MIN_REACH,
+) -> Dict[str, Any]:
+    """데이터셋 전체 집계 → 대시보드용 JSON 호환 dict"""
+    start = time.time()
+    df = add_percentiles(build_posts(dataset_path, media_path, tz), min_reach)
+    post_columns = ["id", "media_group", "media_type", "media_product_type", "timestamp",
+                    "reach", "interactions", *(column for column, _ in RATES), "percentile"]
+    report = {
+        "posts": len(df),
+        "rates": _records(rate_table(df)),
+        "rolling": _records(rolling_table(df, windows)),
+        "top": _records(top_posts(df, top, min_reach)),
+        "heatmap": hour_heatmap(df),
+        "post_ranks": _records(df[post_columns]),
+        "elapsed_ms": int((time.time() - start) * 1000),
+    }
+    return report
+
+
+# =====================================
+# 3️⃣ 데이터셋 버전별 캐시
+# =====================================
+# 같은 집계 파일을 동시에 계산하지 않도록 경로별 lock (API 서버의 to_thread 동시 요청)
+_report_locks: Dict[str, threading.Lock] = {}
+_report_locks_guard = threading.Lock()
+
+
+def _report_lock(path: str) -> threading.Lock:
+    with _report_locks_guard:
+        return _report_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def _write_report(report: Dict[str, Any], path: str) -> None:
+    """고유한 임시 파일에 쓴 뒤 교체 (다른 프로세스가 같은 집계를 써도 충돌 없음)"""
+    f = tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=os.path.dirname(path) or ".",
+        prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False,
+    )
+    try:
+        with f:
+            json.dump(report, f, ensure_ascii=False)
+        os.replace(f.name, path)
+    except BaseException:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+        raise
+
+
+def load_report(
+    dataset_path: str,
+    media_path: Optional[str] = None,
+    refresh: bool = False,
+    top: int = 10,
+    windows: Iterable[int] = (7, 30),
+    tz: str = ANALYTICS_TZ,
+    min_reach: int = ANALYTICS_MIN_REACH,
+) -> Dict[str, Any]:
+    """
+    <stem>.analytics.json 에 저장된 집계가 지금 데이터셋 버전과 같으면 그대로 반환, 아니면 다시 계산해서 저장
+    반환 dict 의 "cached" 로 캐시 사용 여부 확인
+    같은 데이터셋을 동시에 요청하면 한 번만 계산하고 나머지는 저장된 집계를 사용
+    """
+    params = {"top": top, "windows": list(windows), "tz": tz, "min_reach": min_reach}
+    key = dataset_version(dataset_path, media_path, **params)
+    path = analytics_path_for(dataset_path)
+    with _report_lock(path):
+        if not refresh and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+            if report.get("key") == key:
+                report["cached"] = True
+                return report
+
+        report = {
+            "key": key,
+            "dataset": os.path.abspath(dataset_path),
+            "media": os.path.abspath(media_path) if media_path else None,
+            "seq": current_seq(dataset_path),
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "params": params,
+            **compute_report(dataset_path, media_path, top, windows, tz, min_reach),
+        }
+        _write_report(report, path)
+    report["cached"] = False
+    return report
+
+
+def write_tables(report: Dict[str, Any], output_dir: str) -> List[str]:
+    """표 형태 결과(rates / rolling / top / post_ranks / heatmap) 를 CSV 로 저장"""
+    import pandas as pd
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name in ("rates", "rolling", "top", "post_ranks"):
+        path = os.path.join(output_dir, f"engagement_{name}.csv")
+        pd.DataFrame(report[name]).to_csv(path, index=False, encoding="utf-8-sig")
+        paths.append(path)
+    heatmap = report["heatmap"]
+    path = os.path.join(output_dir, "engagement_heatmap.csv")
+    pd.DataFrame(heatmap["engagement_rate(%)"], index=heatmap["weekdays"]).to_csv(path, encoding="utf-8-sig")
+    paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Engagement / save / share rates, rolling windows and heatmaps")
+    parser.add_argument("input", help="insights 데이터셋 (JSON / JSONL(.gz) / .igarc)")
+    parser.add_argument("--media", "-m", help="media_type / timestamp 가 없는 덤프일 때 합칠 미디어 목록 파일")
+    parser.add_argument("--top", type=int, default=10, help="상위 게시물 수 (전체 / media_group 별)")
+    parser.add_argument("--windows", type=int, nargs="+", default=[7, 30], help="이동 비율 기간(일)")
+    parser.add_argument("--tz", default=ANALYTICS_TZ, help="요일 / 시간대 기준 시간대")
+    parser.add_argument("--min-reach", type=int, default=ANALYTICS_MIN_REACH,
+                        help="백분위 / top-N 에 포함할 최소 reach")
+    parser.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 계산")
+    parser.add_argument("--output-dir", "-o", help="지정하면 표를 CSV 로 저장")
+    args = parser.parse_args(argv)
+
+    report = load_report(args.input, args.media, args.refresh, args.top, args.windows, args.tz, args.min_reach)
+    source = "캐시" if report["cached"] else f"계산 {report['elapsed_ms']}ms"
+    print(f"📊 게시물 {report['posts']}개 (seq={report['seq']}, {source}): {analytics_path_for(args.input)}")
+
+    for row in report["rates"]:
+        if row["dimension"] in ("ALL", "media_group"):
+            print(f"  {row['key']:<8} 게시물 {row['posts']:>5}개  참여율 {row['engagement_rate(%)']:6.2f}%  "
+                  f"저장률 {row['save_rate(%)']:5.2f}%  공유율 {row['share_rate(%)']:5.2f}%  "
+                  f"(중앙값 {row['median_engagement_rate(%)']}%)")
+
+    print(f"\n🏆 참여율 TOP {args.top} (reach ≥ {args.min_reach}):")
+    for row in report["top"]:
+        if row["group"] == "ALL":
+            print(f"{row['rank']:2d}. {row['engagement_rate(%)']:6.2f}%  reach {row['reach']:>6}  "
+                  f"{row['timestamp'] or ''}  {row['caption']}")
+
+    heatmap = report["heatmap"]
+    slots = [
+        (rate, WEEKDAYS[day], hour, heatmap["posts"][day][hour])
+        for day, rates in enumerate(heatmap["engagement_rate(%)"])
+        for hour, rate in enumerate(rates)
+        if heatmap["posts"][day][hour] >= 2
+    ]
+    if slots:
+        print("\n⏰ 참여율 높은 게시 시간대 (게시물 2개 이상):")
+        for rate, day, hour, posts in sorted(slots, reverse=True)[:5]:
+            print(f"  {day} {hour:02d}시  {rate:.2f}% ({posts}개)")
+
+    if args.output_dir:
+        for path in write_tables(report, args.output_dir):
+            print(f"✅ 저장 완료: {path}")
+
+
+if __name__ == "__main__":
+    main()
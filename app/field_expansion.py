@@ -0,0 +1,94 @@
+import logging
+import requests
+from . import graph_client
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("field_expansion")
+
+# ?ids= 조회 1회에 담을 수 있는 최대 노드 수
+IDS_LIMIT = 50
+
+
+def insights_field(metrics: str) -> str:
+    """insights 엣지를 필드 확장으로 요청하는 필드 문자열 (예: insights.metric(reach,likes))"""
+    return f"insights.metric({metrics})"
+
+
+def fetch_nodes(ids: List[str], fields: str, access_token: str) -> Dict[str, Any]:
+    """
+    여러 노드를 ?ids= 요청 한 번으로 조회 → {id: 노드}
+    노드 하나라도 요청한 필드를 지원하지 않으면 요청 전체가 4xx 로 실패 (HTTPError)
+    """
+    url = graph_client.graph_url("")
+    params = {"ids": ",".join(ids), "fields": fields, "access_token": access_token}
+    return graph_client.get(url, params=params).json()
+
+
+def _is_client_error(e: requests.RequestException) -> bool:
+    response = getattr(e, "response", None)
+    return response is not None and 400 <= response.status_code < 500 and not graph_client.is_rate_limited(response)
+
+
+def expand_insights(
+    posts: List[Dict[str, Any]],
+    get_metrics: Callable[[Dict[str, Any]], Optional[str]],
+    access_token: str,
+    fallback: Callable[[Dict[str, Any], str], Dict[str, Any]],
+    on_done: Optional[Callable[[Dict[str, Any], Optional[str], Dict[str, Any]], None]] = None,
+) -> Dict[str, int]:
+    """
+    get_metrics() 가 같은 미디어끼리 묶어서 insights 를 필드 확장(?ids=...&fields=insights.metric(...))으로 조회
+    - 묶음 요청이 4xx 로 실패하면 반으로 나눠 재시도 → 문제 미디어만 fallback(post, metrics) 개별 호출
+    - on_done(post, metrics, insights): 미디어마다 결과가 정해지면 호출 (insights 는 {"data": [...]} 또는 {"error": ...})
+    반환: {"requests": 필드 확장 요청 수, "fallback": 개별 호출 수}
+    """
+    stats = {"requests": 0, "fallback": 0}
+
+    def finish(post: Dict[str, Any], metrics: Optional[str], insights: Dict[str, Any]) -> None:
+        if on_done:
+            on_done(post, metrics, insights)
+
+    def run(chunk: List[Dict[str, Any]], metrics: str) -> None:
+        stats["requests"] += 1
+        try:
+            nodes = fetch_nodes([post["id"] for post in chunk], insights_field(metrics), access_token)
+        except requests.RequestException as e:
+            if not _is_client_error(e):
+                # 5xx / 네트워크 오류는 graph_client 가 이미 재시도함 → 묶음 전체 실패 처리
+                error = graph_client.error_info(e)
+                logger.error(f"❌ insights 필드 확장 요청 실패 ({len(chunk)}건): {error}")
+                for post in chunk:
+                    finish(post, metrics, {"error": error})
+                return
+            if len(chunk) == 1:
+                stats["fallback"] += 1
+                finish(chunk[0], metrics, fallback(chunk[0], metrics))
+                return
+            half = len(chunk) // 2
+            run(chunk[:half], metrics)
+            run(chunk[half:], metrics)
+            return
+
+        for post in chunk:
+            node = nodes.get(post["id"]) or {}
+            insights = node.get("insights")
+            if isinstance(insights, dict) and "data" in insights:
+                finish(post, metrics, {"data": insights["data"]})
+            else:
+                # 필드 확장 결과에 insights 가 빠진 미디어만 개별 호출
+                stats["fallback"] += 1
+                finish(post, metrics, fallback(post, metrics))
+
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for post in posts:
+        metrics = get_metrics(post)
+        if metrics:
+            groups[metrics].append(post)
+        else:
+            finish(post, metrics, {"error": "metrics 가 지정되지 않은 미디어 타입"})
+
+    for metrics, group in groups.items():
+        for i in range(0, len(group), IDS_LIMIT):
+            run(group[i:i + IDS_LIMIT], metrics)
+    return stats
@@ -0,0 +1,79 @@
+import json
+import logging
+import requests
+from . import config, graph_client
+from urllib.parse import urlencode
+from typing import List, Dict, Any, Optional
+
+# Graph API batch 요청 1회에 담을 수 있는 최대 하위 요청 수
+BATCH_LIMIT = 50
+
+logger = logging.getLogger("graph_batch")
+
+
+def relative_url(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """batch 하위 요청용 relative_url 생성 (access_token은 batch 요청에서 한 번만 전달)"""
+    url = f"{graph_client.API_VERSION}/{path.lstrip('/')}"
+    if params:
+        url += "?" + urlencode(params)
+    return url
+
+
+def _parse_sub_response(item: Optional[dict]) -> Dict[str, Any]:
+    """batch 응답의 하위 항목 하나를 일반 GET 응답(dict) 또는 {"error": ...} 로 변환"""
+    if item is None:
+        # 하위 요청이 시간 내에 처리되지 못하면 null 이 돌아옴
+        return {"error": "batch 하위 요청 응답 없음 (timeout)"}
+
+    try:
+        body = json.loads(item.get("body") or "{}")
+    except ValueError:
+        body = {}
+
+    code = item.get("code")
+    if code != 200:
+        err = body.get("error") if isinstance(body, dict) else None
+        if isinstance(err, dict):  # graph_client.error_info() 와 같은 모양 (code 로 호출 한도 구분)
+            return {"error": {"status": code, **{
+                key: err[key] for key in ("code", "error_subcode", "type", "message", "is_transient") if key in err
+            }}}
+        return {"error": f"{code} Error: {item.get('body')}"}
+    return body
+
+
+def _send_batch(urls: List[str], access_token: str) -> List[Dict[str, Any]]:
+    """최대 BATCH_LIMIT 개의 GET 요청을 batch POST 한 번으로 전송"""
+    batch = [{"method": "GET", "relative_url": url} for url in urls]
+    data = {
+        "access_token": access_token,
+        "batch": json.dumps(batch),
+        "include_headers": "false",
+    }
+    try:
+        resp = graph_client.post(graph_client.GRAPH_API_BASE, data=data, timeout=60)
+        responses = resp.json()
+    except requests.RequestException as e:
+        error = graph_client.error_info(e)
+        logger.error(f"❌ batch 요청 실패 ({len(urls)}건): {error}")
+        return [{"error": error} for _ in urls]
+    except ValueError as e:
+        logger.error(f"❌ batch 응답 파싱 실패 ({len(urls)}건): {e}")
+        return [{"error": str(e)} for _ in urls]
+
+    if not isinstance(responses, list) or len(responses) != len(urls):
+        logger.error(f"❌ batch 응답 형식 오류: 요청 {len(urls)}건")
+        return [{"error": "batch 응답 형식 오류"} for _ in urls]
+
+    return [_parse_sub_response(item) for item in responses]
+
+
+def batch_get(urls: List[str], access_token: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    여러 GET 요청(relative_url 목록)을 BATCH_LIMIT 개씩 묶어 batch 요청으로 전송
+    - 반환: 입력 순서와 같은 응답 목록, 실패한 하위 요청은 각각 {"error": ...}
+    """
+    token = access_token or config.env("ACCESS_TOKEN")
+    results: List[Dict[str, Any]] = []
+    for i in range(0, len(urls), BATCH_LIMIT):
+        results.extend(_send_batch(urls[i:i + BATCH_LIMIT], token))
+    return results
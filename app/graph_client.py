@@ -0,0 +1,285 @@
+import os
+import re
+import time
+import random
+import logging
+import threading
+import contextvars
+import requests
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from .rate_limiter import get_limiter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 튜닝 값은 import 시 프로세스 환경변수에서 읽음 (.env 는 진입점에서 config.load_env() 로 먼저 로드)
+API_VERSION    = os.getenv("API_VERSION", "v23.0")
+# 로컬 mock 서버로 테스트할 때는 GRAPH_API_BASE=http://127.0.0.1:8000 처럼 지정
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.facebook.com")
+
+# 커넥션 풀 / 타임아웃 / 재시도 설정
+HTTP_POOL_SIZE    = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_TIMEOUT      = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_RETRIES  = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "1.0"))
+HTTP_BACKOFF_MAX  = float(os.getenv("HTTP_BACKOFF_MAX", "60"))
+
+# 재시도 대상 HTTP 상태 코드 (429 는 rate limiter 가 별도 처리)
+RETRY_STATUS = {500, 502, 503, 504}
+# 호출 한도 초과를 뜻하는 Graph API 오류 코드 (HTTP 400/403 으로 내려오는 경우가 있음)
+RATE_LIMIT_CODES = {4, 17, 32, 613, 80001, 80002}
+
+# 오류 메시지(요청 URL 포함)에서 가릴 access_token 값
+_TOKEN_RE = re.compile(r"(access_token=)[^&\s'\"]+")
+
+logger = logging.getLogger("graph_client")
+
+# 요청 1건(재시도 포함 각 시도)마다 호출되는 hook 목록
+# hook(method, url, status_code, elapsed_ms, attempt, error)
+RequestHook = Callable[[str, str, Optional[int], int, int, Optional[Exception]], None]
+_hooks: List[RequestHook] = []
+
+# 응답을 받을 때마다 호출되는 hook 목록 (사용량 헤더 / 본문 확인용)
+# hook(method, url, response)
+ResponseHook = Callable[[str, str, requests.Response], None]
+_response_hooks: List[ResponseHook] = []
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# 현재 요청이 어느 비즈니스 계정 작업인지 (계정별 rate limiter 선택용)
+_account: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("graph_account", default=None)
+
+
+def graph_url(path: str) -> str:
+    """Graph API 엔드포인트 전체 URL 생성 (예: graph_url("me/accounts"))"""
+    return f"{GRAPH_API_BASE}/{API_VERSION}/{path.lstrip('/')}"
+
+
+def _build_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """프로세스 전체에서 공유하는 keep-alive 세션 반환 (최초 호출 시 생성)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(HTTP_POOL_SIZE)
+    return _session
+
+
+def configure(pool_size: Optional[int] = None) -> None:
+    """
+    커넥션 풀 크기 변경 (동시 워커 수보다 작으면 연결을 재사용하지 못함)
+    """
+    global _session, HTTP_POOL_SIZE
+    with _session_lock:
+        if pool_size is not None:
+            HTTP_POOL_SIZE = pool_size
+        old, _session = _session, _build_session(HTTP_POOL_SIZE)
+    if old is not None:
+        old.close()
+
+
+@contextmanager
+def account_scope(account_id: Optional[str]) -> Iterator[None]:
+    """
+    with 블록 안의 요청은 계정별 rate limiter 로 속도 조절 (앱 단위 limiter 도 함께 적용)
+    contextvars 기반이므로 스레드 풀에 넘길 때는 contextvars.copy_context().run 으로 감쌀 것
+    """
+    token = _account.set(account_id)
+    try:
+        yield
+    finally:
+        _account.reset(token)
+
+
+def current_account() -> Optional[str]:
+    return _account.get()
+
+
+def add_request_hook(hook: RequestHook) -> None:
+    """요청 타이밍 hook 등록"""
+    _hooks.append(hook)
+
+
+def remove_request_hook(hook: RequestHook) -> None:
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def add_response_hook(hook: ResponseHook) -> None:
+    """응답 hook 등록"""
+    _response_hooks.append(hook)
+
+
+def remove_response_hook(hook: ResponseHook) -> None:
+    if hook in _response_hooks:
+        _response_hooks.remove(hook)
+
+
+def _emit_response(method: str, url: str, resp: requests.Response) -> None:
+    for hook in list(_response_hooks):
+        try:
+            hook(method, url, resp)
+        except Exception as e:
+            logger.warning(f"response hook 오류: {e}")
+
+
+def _emit(method: str, url: str, status: Optional[int], elapsed_ms: int,
+          attempt: int, error: Optional[Exception]) -> None:
+    for hook in list(_hooks):
+        try:
+            hook(method, url, status, elapsed_ms, attempt, error)
+        except Exception as e:  # hook 오류가 요청을 깨뜨리지 않도록
+            logger.warning(f"request hook 오류: {e}")
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    재시도 대기 시간(초): Retry-After 헤더가 있으면 우선, 없으면 full jitter 지수 백오프
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_rate_limited(resp: requests.Response) -> bool:
+    """HTTP 429 이거나 Graph API 호출 한도 오류 코드인지 확인"""
+    if resp.status_code == 429:
+        return True
+    if resp.status_code < 400:
+        return False
+    try:
+        error = resp.json().get("error", {})
+    except ValueError:
+        return False
+    return isinstance(error, dict) and error.get("code") in RATE_LIMIT_CODES
+
+
+class IncompletePagination(requests.RequestException):
+    """페이징 도중 요청이 최종 실패 — 그때까지 받은 항목은 partial 에 보존"""
+
+    def __init__(self, partial: List[Any], cause: Exception):
+        super().__init__(f"페이징 중단 ({len(partial)}개까지 수집): {redact(str(cause))}")
+        self.partial = partial
+
+
+def redact(text: str) -> str:
+    """오류 메시지의 access_token 값을 가림 (파일 / 로그에 남기기 전)"""
+    return _TOKEN_RE.sub(r"\1***", text)
+
+
+def error_info(e: requests.RequestException) -> Any:
+    """
+    요청 예외 → 저장용 오류 정보
+    - Graph API 오류 본문이 있으면 {"status", "code", "error_subcode", "type", "message", "is_transient"}
+      (호출 한도 오류도 HTTP 400/403 으로 내려오므로 code 로 구분해야 함)
+    - 응답이 없으면(네트워크 오류 등) access_token 을 가린 문자열
+    """
+    resp = getattr(e, "response", None)
+    if resp is not None:
+        try:
+            error = resp.json().get("error")
+        except (ValueError, AttributeError):
+            error = None
+        info: Dict[str, Any] = {"status": resp.status_code}
+        if isinstance(error, dict):
+            info.update({
+                key: error[key]
+                for key in ("code", "error_subcode", "type", "message", "is_transient")
+                if key in error
+            })
+        else:
+            info["message"] = resp.reason or redact(str(e))
+        return info
+    return redact(str(e))
+
+
+def request(
+    method: str,
+    url: str,
+    params: Optional[dict] = None,
+    data: Optional[dict] = None,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+    raise_for_status: bool = True,
+) -> requests.Response:
+    """
+    공유 세션으로 요청 전송 + 공통 재시도 정책 적용
+    - 매 시도 전 공유 rate limiter 토큰 획득, 응답의 사용량 헤더로 속도 조정
+      (account_scope 안이면 계정별 limiter 도 거침: 앱 사용량 → 공유, 계정 사용량 → 계정별)
+    - 네트워크 오류, 5xx 는 백오프 후 재시도
+    - 429/호출 한도 오류는 limiter 를 감속·일시 정지시킨 뒤 재시도
+    - 그 외 4xx 는 바로 반환(raise_for_status=True 면 HTTPError)
+    """
+    timeout = HTTP_TIMEOUT if timeout is None else timeout
+    retries = max(1, HTTP_MAX_RETRIES if max_retries is None else max_retries)
+    session = get_session()
+    limiter = get_limiter()
+    account = current_account()
+    account_limiter = get_limiter(account) if account else None
+
+    for attempt in range(retries):
+        last = attempt == retries - 1
+        if account_limiter:
+            account_limiter.acquire()
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, url, params=params, data=data, timeout=timeout)
+        except requests.RequestException as e:
+            _emit(method, url, None, int((time.perf_counter() - start) * 1000), attempt, e)
+            if last:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"요청 에러, 재시도 {attempt+1}/{retries} ({delay:.1f}s 후): {e}")
+            time.sleep(delay)
+            continue
+
+        _emit(method, url, resp.status_code, int((time.perf_counter() - start) * 1000), attempt, None)
+        _emit_response(method, url, resp)
+        if account_limiter:
+            account_limiter.update(resp.headers)
+            limiter.update(resp.headers, sources=("app",))
+        else:
+            limiter.update(resp.headers)
+
+        if is_rate_limited(resp):
+            retry_after = resp.headers.get("Retry-After")
+            # 계정 작업 중의 한도 초과는 해당 계정만 감속 (앱 전체 한도는 X-App-Usage 로 반영)
+            (account_limiter or limiter).penalize(
+                float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+            if not last:
+                logger.warning(f"⚠️ 호출 한도 초과(HTTP {resp.status_code}) → 재시도 {attempt+1}/{retries}")
+                continue
+        elif resp.status_code in RETRY_STATUS and not last:
+            delay = backoff_delay(attempt, resp.headers.get("Retry-After"))
+            logger.warning(
+                f"⚠️ HTTP {resp.status_code} → 재시도 {attempt+1}/{retries} ({delay:.1f}s 후)"
+            )
+            time.sleep(delay)
+            continue
+
+        if raise_for_status:
+            resp.raise_for_status()
+        return resp
+
+    raise RuntimeError("unreachable")
+
+
+def get(url: str, params: Optional[dict] = None, **kwargs) -> requests.Response:
+    return request("GET", url, params=params, **kwargs)
+
+
+def post(url: str, data: Optional[dict] = None, **kwargs) -> requests.Response:
+    return request("POST", url, data=data, **kwargs)
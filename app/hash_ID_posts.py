@@ -1,60 +1,66 @@
-import os
 import argparse
 import logging
 import json
 import time
-import requests
-from dotenv import load_dotenv
+from typing import List, Optional
+from urllib.parse import urlsplit
+from . import config, graph_client
+from .metrics import start_from_env as start_metrics
+from .hashtag_ids import get_hashtag_cache
+from .storage import DB_PATH, Storage
 
-# .env 파일의 변수들을 로드
-load_dotenv()
+DEFAULT_FIELD_PARAMS = "id,caption,permalink,media_type,timestamp,username"
+CRAWLER_LOG = "crawler.log"
 
-# 환경변수에서 꺼내오기
-ACCESS_TOKEN  = os.getenv("ACCESS_TOKEN")
-IG_USER_ID    = os.getenv("IG_USER_ID")
-FIELD_PARAMS  = os.getenv("FIELD_PARAMS", "id,caption,permalink,media_type,timestamp,username")
-HASHTAG_ID    = os.getenv("HASHTAG_ID")
-
-# 로거 설정
+# 로거 (파일 핸들러는 CLI 실행 시 setup_crawler_log 로 연결)
 logger = logging.getLogger("crawler")
-logger.setLevel(logging.INFO)
-fh = logging.FileHandler("crawler.log")
-formatter = logging.Formatter('%(message)s')
-fh.setFormatter(formatter)
-logger.addHandler(fh)
+
+def setup_crawler_log() -> None:
+    """crawler.log 에 README 로그 포맷(JSON 한 줄)만 기록"""
+    config.setup_logging(logger, CRAWLER_LOG, fmt="%(message)s", console=False)
+
+def field_params() -> str:
+    return config.env("FIELD_PARAMS", DEFAULT_FIELD_PARAMS)
 
 def get_hashtag_id(tag: str) -> str:
-    if not IG_USER_ID or not ACCESS_TOKEN:
+    ig_user_id, access_token = config.env("IG_USER_ID"), config.env("ACCESS_TOKEN")
+    if not ig_user_id or not access_token:
         raise RuntimeError("환경변수 IG_USER_ID 또는 ACCESS_TOKEN이 설정되어 있지 않습니다.")
-    url = "https://graph.facebook.com/v23.0/ig_hashtag_search"
-    params = {"user_id": IG_USER_ID, "q": tag, "access_token": ACCESS_TOKEN}
-    resp = requests.get(url, params=params)
-    resp.raise_for_status()
-    data = resp.json().get("data", [])
-    if not data:
-        raise ValueError(f"해시태그 '{tag}' 에 대한 ID를 찾을 수 없습니다.")
-    return data[0]["id"]
+    # hash_ID_srch 와 같은 영구 캐시 사용 (ig_hashtag_search 는 7일 고유 30개 한도)
+    return get_hashtag_cache().resolve(tag, ig_user_id, access_token)
 
 def fetch_hashtag_posts(hashtag_id: str, limit: int = 50) -> list[dict]:
-    url = f"https://graph.facebook.com/v23.0/{hashtag_id}/recent_media"
-    params = {"user_id": IG_USER_ID,"fields": FIELD_PARAMS, "access_token": ACCESS_TOKEN, "limit": limit}
+    url = graph_client.graph_url(f"{hashtag_id}/recent_media")
+    params = {
+        "user_id": config.env("IG_USER_ID"),
+        "fields": field_params(),
+        "access_token": config.env("ACCESS_TOKEN"),
+        "limit": limit,
+    }
+    return get_logged_page(url, params).get("data", [])
+
+def get_logged_page(url: str, params: dict | None = None) -> dict:
+    """해시태그 엣지 페이지 1회 요청 + README 로그 포맷(JSON 한 줄)으로 crawler.log 기록"""
     start = time.time()
-    resp = requests.get(url, params=params)
+    resp = graph_client.get(url, params=params, raise_for_status=False)
     elapsed_ms = int((time.time() - start) * 1000)
-    data = resp.json().get("data", [])
+    try:
+        payload = resp.json()
+    except ValueError:  # 5xx HTML 응답 등
+        payload = {}
     log_entry = {
         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
-        "endpoint": resp.request.path_url,
+        "endpoint": urlsplit(resp.request.path_url).path,  # 쿼리(access_token) 제외
         "status_code": resp.status_code,
         "response_time_ms": elapsed_ms,
-        "items_count": len(data),
+        "items_count": len(payload.get("data", [])),
         "error": None if resp.status_code == 200 else resp.text
     }
     logger.info(json.dumps(log_entry, ensure_ascii=False))
     resp.raise_for_status()
-    return data
+    return payload
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Fetch Instagram posts by hashtag")
     parser.add_argument(
         "--hashtag", "-t",
@@ -62,11 +68,15 @@ if __name__ == "__main__":
         required=False
     )
     parser.add_argument("--limit", "-n", type=int, default=25, help="가져올 게시물 수")
-    args = parser.parse_args()
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로 (지정하면 hashtag_posts 테이블에 upsert)")
+    args = parser.parse_args(argv)
+    setup_crawler_log()
+    start_metrics()  # METRICS_PORT / METRICS_SNAPSHOT 이 있으면 지표 노출
 
     # 1) env 에 HASHTAG_ID 가 있으면 우선 사용
-    if HASHTAG_ID:
-        tag_id = HASHTAG_ID
+    hashtag_id = config.env("HASHTAG_ID")
+    if hashtag_id:
+        tag_id = hashtag_id
     # 2) 없으면 --hashtag 옵션으로 받은 이름을 ID 조회
     elif args.hashtag:
         tag_id = get_hashtag_id(args.hashtag)
@@ -74,6 +84,9 @@ if __name__ == "__main__":
         parser.error("HASHTAG_ID 환경변수 또는 --hashtag/-t 옵션 중 하나를 지정하세요.")
 
     posts = fetch_hashtag_posts(tag_id, args.limit)
+    if args.db:
+        with Storage(args.db) as storage:
+            storage.add_hashtag_posts(tag_id, posts)
 ## 여기에 고급 액세스 권한이 필요함
     for p in posts:
         print(
@@ -84,14 +97,5 @@ if __name__ == "__main__":
         )
 
 
-    # 디버그: 실제 posts 값이 무엇인지 출력
-    print("DEBUG: posts =", posts)
-    print("DEBUG: len(posts) =", len(posts))
-
-    for p in posts:
-        print(
-            p["timestamp"],
-            p["username"],
-            p["permalink"],
-            (p.get("caption", "")[:40] + '...') if p.get("caption") else ''
-        )
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,50 @@
-import os
-import requests
-from dotenv import load_dotenv
+import time
+import argparse
+from typing import List, Optional
+from . import config
+from .hashtag_ids import get_hashtag_cache, normalize_hashtag
 
-load_dotenv()
+def get_hashtag_id(hashtag: str) -> str:
+    """해시태그 ID 조회 (hashtag_ids 영구 캐시 우선, 새 해시태그만 7일 한도 차감)"""
+    return get_hashtag_cache().resolve(hashtag, config.env("IG_USER_ID"), config.env("ACCESS_TOKEN"))
 
-INSTAGRAM_ACCOUNT_ID = os.getenv("IG_USER_ID")
-ACCESS_TOKEN         = os.getenv("ACCESS_TOKEN")
-HASHTAG              = os.getenv("HASHTAG")  # env에서 가져오기
+def get_hashtag_ids(hashtags: list[str]) -> tuple[dict[str, str], list[str]]:
+    """여러 해시태그 일괄 조회 → ({이름: ID}, 한도 때문에 미룬 이름 목록)"""
+    return get_hashtag_cache().resolve_many(hashtags, config.env("IG_USER_ID"), config.env("ACCESS_TOKEN"))
 
-def get_hashtag_id(hashtag: str) -> str:
-    url = "https://graph.facebook.com/v23.0/ig_hashtag_search"
-    params = {
-        "user_id": INSTAGRAM_ACCOUNT_ID,
-        "q": hashtag,
-        "access_token": ACCESS_TOKEN,
-    }
-    resp = requests.get(url, params=params)
-    resp.raise_for_status()
-    data = resp.json().get("data", [])
-    if not data:
-        raise ValueError(f"No hashtag ID found for '{hashtag}'")
-    return data[0]["id"]
+def _when(ts: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
 
-if __name__ == "__main__":
-    if not HASHTAG:
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Resolve Instagram hashtag names to ids")
+    parser.add_argument("hashtags", nargs="*", help="조회할 해시태그 (# 제외, 생략 시 env HASHTAG)")
+    parser.add_argument("--quota", action="store_true", help="캐시 / 7일 조회 한도 상태만 출력")
+    args = parser.parse_args(argv)
+
+    cache = get_hashtag_cache()
+    if args.quota:
+        print(cache.stats())
+        raise SystemExit(0)
+
+    hashtag = config.env("HASHTAG")  # env에서 가져오기
+    tags = args.hashtags or ([hashtag] if hashtag else [])
+    if not tags:
         raise RuntimeError("환경변수 HASHTAG가 설정되어 있지 않습니다.")
     try:
-        tag_id = get_hashtag_id(HASHTAG)
-        print(f"해시태그 '{HASHTAG}' 의 ID는: {tag_id}")
+        # 한도 초과 해시태그는 예외 대신 deferred 로 돌아옴 → 다시 조회 가능한 시각을 함께 안내
+        ids, deferred = get_hashtag_ids(tags)
+        for tag, tag_id in ids.items():
+            print(f"해시태그 '{tag}' 의 ID는: {tag_id}")
+        if deferred:
+            print(f"⏳ 조회 한도 초과로 보류: {', '.join(deferred)} (다음 조회 가능: {_when(cache.next_slot_at())})")
+        missing = [name for name in dict.fromkeys(map(normalize_hashtag, tags))
+                   if name and name not in ids and name not in deferred]
+        if missing:
+            print(f"❓ ID를 찾을 수 없는 해시태그: {', '.join(missing)}")
+        print(f"남은 조회 한도: {cache.remaining()}개 / 7일")
     except Exception as e:
-        print("에러:", e)
\ No newline at end of file
+        print("에러:", e)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import logging
+import argparse
+import requests
+from . import config, graph_client
+from .metrics import start_from_env as start_metrics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .hash_ID_posts import field_params, get_logged_page, setup_crawler_log
+from .hashtag_ids import get_hashtag_cache
+from .jsonl_writer import JsonlWriter, is_jsonl_path
+from .storage import DB_PATH, Storage
+
+logger = logging.getLogger("hashtag_crawler")
+
+EDGES = ("recent_media", "top_media")
+
+# 동시에 페이징할 (해시태그, 엣지) 수
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "8"))
+
+
+def iter_edge_pages(
+    hashtag_id: str,
+    edge: str,
+    limit: int = 50,
+    max_pages: int = 0,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    해시태그 엣지(recent_media / top_media)를 paging.next 를 따라 한 페이지씩 yield
+    - 요청마다 README 로그 포맷으로 crawler.log 기록 (hash_ID_posts.get_logged_page)
+    - max_pages: 0 이면 끝까지
+    """
+    url = graph_client.graph_url(f"{hashtag_id}/{edge}")
+    params = {
+        "user_id": config.env("IG_USER_ID"),
+        "fields": field_params(),
+        "access_token": config.env("ACCESS_TOKEN"),
+        "limit": limit,
+    }
+    pages = 0
+    while url:
+        payload = get_logged_page(url, params)
+        data = payload.get("data", [])
+        if data:
+            yield data
+        pages += 1
+        if max_pages and pages >= max_pages:
+            return
+        url = payload.get("paging", {}).get("next")
+        params = None  # next URL 에 쿼리가 이미 포함됨
+
+
+def _crawl_edge(tag: str, tag_id: str, edge: str, limit: int, max_pages: int) -> List[Dict[str, Any]]:
+    """엣지 하나를 끝까지 페이징, 중간에 실패하면 graph_client.IncompletePagination (받은 만큼은 e.partial)"""
+    posts = []
+    try:
+        for page in iter_edge_pages(tag_id, edge, limit, max_pages):
+            posts.extend(page)
+    except requests.RequestException as e:
+        raise graph_client.IncompletePagination(posts, e) from e
+    return posts
+
+
+class CrawlResult:
+    """
+    여러 해시태그 수집 결과 (media id 기준 중복 제거)
+    - posts: {media_id: 게시물}, 게시물마다 "hashtags"(발견된 해시태그) / "edges"(발견된 엣지) 기록
+    - by_tag: {해시태그: 발견된 media id 수}
+    """
+
+    def __init__(self):
+        self.posts: Dict[str, Dict[str, Any]] = {}
+        self.by_tag: Dict[str, int] = {}
+        self.fetched = 0
+        self.failed: List[Tuple[str, str, Any]] = []
+        self.deferred: List[str] = []
+
+    def add(self, tag: str, edge: str, posts: Iterable[Dict[str, Any]]) -> None:
+        seen = 0
+        for post in posts:
+            self.fetched += 1
+            seen += 1
+            merged = self.posts.get(post["id"])
+            if merged is None:
+                merged = self.posts[post["id"]] = {**post, "hashtags": [], "edges": []}
+            else:
+                # 엣지마다 내려오는 필드가 다를 수 있으므로 빈 값만 채움
+                for key, value in post.items():
+                    merged.setdefault(key, value)
+            if tag not in merged["hashtags"]:
+                merged["hashtags"].append(tag)
+            if edge not in merged["edges"]:
+                merged["edges"].append(edge)
+        self.by_tag[tag] = self.by_tag.get(tag, 0) + seen
+
+    def summary(self) -> Dict[str, Any]:
+        multi = sum(1 for post in self.posts.values() if len(post["hashtags"]) > 1)
+        return {
+            "fetched": self.fetched,
+            "unique": len(self.posts),
+            "multi_tag": multi,
+            "by_tag": self.by_tag,
+            "failed": [f"{tag}/{edge}: {error}" for tag, edge, error in self.failed],
+            "deferred": self.deferred,
+        }
+
+
+def crawl_hashtags(
+    tags: Iterable[str],
+    edges: Iterable[str] = EDGES,
+    limit: int = 50,
+    max_pages: int = 0,
+    workers: int = CRAWL_WORKERS,
+    storage: Optional[Storage] = None,
+) -> CrawlResult:
+    """
+    여러 해시태그의 recent_media / top_media 를 스레드 풀로 동시에 페이징 수집
+    - 해시태그 ID 는 hashtag_ids 캐시로 일괄 조회 (7일 한도를 넘는 새 해시태그는 deferred 로 보류)
+    - (해시태그, 엣지) 하나가 실패해도 나머지는 계속 진행 (failed 에 기록, 실패 전까지 받은 페이지는 반영)
+    - storage 가 주어지면 (해시태그 ID, 게시물) 단위로 hashtag_posts 에 upsert
+    """
+    edges = tuple(edges)
+    result = CrawlResult()
+    # ID 조회가 실패한 해시태그는 failed 에 기록하고 나머지는 계속 수집
+    lookup_errors: Dict[str, Exception] = {}
+    tag_ids, result.deferred = get_hashtag_cache().resolve_many(
+        tags, config.env("IG_USER_ID"), config.env("ACCESS_TOKEN"), errors=lookup_errors
+    )
+    for tag, error in lookup_errors.items():
+        logger.error(f"❌ {tag} ID 조회 실패: {graph_client.redact(str(error))}")
+        result.failed.append((tag, "id", graph_client.error_info(error)))
+    tasks = [(tag, tag_id, edge) for tag, tag_id in tag_ids.items() for edge in edges]
+    logger.info(f"▶️ 해시태그 {len(tag_ids)}개 × 엣지 {len(edges)}개 = {len(tasks)}개 수집 시작")
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(_crawl_edge, tag, tag_id, edge, limit, max_pages): (tag, tag_id, edge)
+            for tag, tag_id, edge in tasks
+        }
+        for future in as_completed(futures):
+            tag, tag_id, edge = futures[future]
+            error = None
+            try:
+                posts = future.result()
+            except graph_client.IncompletePagination as e:
+                # 실패 전까지 받은 페이지는 버리지 않고 반영, 엣지는 failed 에 기록
+                posts, error = e.partial, e
+                result.failed.append((tag, edge, str(e)))
+            # 결과 병합 / DB 저장은 메인 스레드에서만
+            result.add(tag, edge, posts)
+            if storage and posts:
+                storage.add_hashtag_posts(tag_id, posts)
+            if error:
+                logger.error(f"❌ {tag}/{edge} 수집 실패: {error}")
+            else:
+                logger.info(f"✅ {tag}/{edge}: {len(posts)}개 (누적 고유 {len(result.posts)}개)")
+
+    elapsed = time.time() - start
+    logger.info(
+        f"⚡ {len(tasks)}개 엣지, 게시물 {result.fetched}개 (고유 {len(result.posts)}개) 수집: {elapsed:.1f}s"
+    )
+    return result
+
+
+def read_tags(values: List[str], tag_file: Optional[str]) -> List[str]:
+    """명령행 해시태그 + 파일(한 줄에 하나, 빈 줄 무시)"""
+    tags = list(values)
+    if tag_file:
+        with open(tag_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    tags.append(line.strip())
+    return tags
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Crawl recent/top media for many hashtags in one run")
+    parser.add_argument("hashtags", nargs="*", help="수집할 해시태그 (# 제외)")
+    parser.add_argument("--file", "-f", help="해시태그 목록 파일 (한 줄에 하나)")
+    parser.add_argument(
+        "--edges", nargs="+", choices=EDGES, default=list(EDGES),
+        help="수집할 엣지 (기본: recent_media top_media)"
+    )
+    parser.add_argument("--limit", "-n", type=int, default=50, help="페이지당 게시물 수 (최대 50)")
+    parser.add_argument("--max-pages", type=int, default=0, help="엣지별 최대 페이지 수 (0 이면 끝까지)")
+    parser.add_argument("--workers", "-w", type=int, default=CRAWL_WORKERS, help="동시 수집 수")
+    parser.add_argument(
+        "--output", "-o", default="hashtag_posts.json",
+        help="결과 파일 (.json 또는 .jsonl / .jsonl.gz)"
+    )
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로 (지정하면 hashtag_posts 테이블에 upsert)")
+    args = parser.parse_args(argv)
+    setup_crawler_log()
+    start_metrics()  # METRICS_PORT / METRICS_SNAPSHOT 이 있으면 지표 노출
+
+    if not config.env("IG_USER_ID") or not config.env("ACCESS_TOKEN"):
+        parser.error("환경변수 IG_USER_ID 및 ACCESS_TOKEN을 설정해주세요.")
+    tags = read_tags(args.hashtags, args.file)
+    if not tags:
+        parser.error("해시태그를 인자 또는 --file 로 지정하세요.")
+
+    storage = Storage(args.db) if args.db else None
+    try:
+        result = crawl_hashtags(tags, args.edges, args.limit, args.max_pages, args.workers, storage)
+    finally:
+        if storage:
+            storage.close()
+
+    posts = sorted(result.posts.values(), key=lambda p: p.get("timestamp", ""), reverse=True)
+    if is_jsonl_path(args.output):
+        with JsonlWriter(args.output) as writer:
+            writer.write_many(posts)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(posts, f, ensure_ascii=False, indent=2)
+
+    summary = result.summary()
+    print(f"✅ 고유 게시물 {summary['unique']}개 저장: {args.output} "
+          f"(수집 {summary['fetched']}개, 여러 해시태그에서 발견 {summary['multi_tag']}개)")
+    for tag, count in sorted(summary["by_tag"].items()):
+        print(f"  #{tag}: {count}")
+    if summary["failed"]:
+        print("⚠️ 실패:", *summary["failed"], sep="\n  ")
+    if summary["deferred"]:
+        print(f"⏳ 조회 한도로 보류된 해시태그: {', '.join(summary['deferred'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+logger = logging.getLogger("hashtag_ids")
+
+# 해시태그 이름 → ID 캐시 파일
+HASHTAG_ID_CACHE = os.getenv("HASHTAG_ID_CACHE", "hashtag_ids.json")
+
+# ig_hashtag_search 제한: 계정당 7일 동안 고유 해시태그 30개
+HASHTAG_QUOTA        = int(os.getenv("HASHTAG_QUOTA", "30"))
+HASHTAG_QUOTA_WINDOW = 7 * 24 * 3600
+
+
+class HashtagQuotaExceeded(RuntimeError):
+    """7일 고유 해시태그 조회 한도를 다 써서 조회를 거부한 경우 (retry_at: 다시 조회 가능한 시각)"""
+
+    def __init__(self, tag: str, retry_at: float, quota: int = HASHTAG_QUOTA):
+        self.tag = tag
+        self.retry_at = retry_at
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(retry_at))
+        super().__init__(
+            f"해시태그 조회 한도({quota}개/7일) 초과: '{tag}' 는 {when} 이후 조회 가능"
+        )
+
+
+def normalize_hashtag(tag: str) -> str:
+    """'  #Cheongdo ' / '청도 군' → 'cheongdo' / '청도군' (앞의 #, 공백 제거, 소문자, 유니코드 NFC)"""
+    tag = unicodedata.normalize("NFC", tag or "")
+    return "".join(tag.split()).lstrip("#").lower()
+
+
+def search_hashtag_id(tag: str, ig_user_id: str, access_token: str) -> Optional[str]:
+    """ig_hashtag_search 호출 (한도 1회 차감), 결과가 없으면 None"""
+    from . import graph_client  # 캐시로 끝나는 조회는 HTTP 클라이언트(requests)를 불러오지 않음
+    url = graph_client.graph_url("ig_hashtag_search")
+    params = {"user_id": ig_user_id, "q": tag, "access_token": access_token}
+    resp = graph_client.get(url, params=params)
+    data = resp.json().get("data", [])
+    return data[0]["id"] if data else None
+
+
+class HashtagIdCache:
+    """
+    해시태그 ID 영구 캐시 + 7일 조회 한도 추적 (hash_ID_srch / hash_ID_posts / API 서버 공용)
+    - ID 는 바뀌지 않으므로 한 번 조회한 해시태그는 다시 요청하지 않음
+      (없는 해시태그도 한도를 쓰므로 7일 동안은 재조회하지 않음)
+    - 새 해시태그를 조회하기 전에 최근 7일 고유 조회 수를 확인하고, 한도에 닿으면
+      요청을 보내지 않고 HashtagQuotaExceeded 로 거부 (resolve_many 는 defer 가능)
+    - 조회 기록은 요청 직후 바로 파일에 저장 (프로세스가 죽어도 한도 계산 유지)
+    여러 스레드에서 동시에 사용해도 안전
+    """
+
+    def __init__(self, path: str = HASHTAG_ID_CACHE, quota: int = HASHTAG_QUOTA,
+                 window: float = HASHTAG_QUOTA_WINDOW):
+        self.path = path
+        self.quota = quota
+        self.window = window
+        self._lock = threading.Lock()
+        # {"ids": {tag: {"id": str | None, "resolved_at": ts}}, "lookups": {tag: ts}}
+        self._ids: Dict[str, Dict[str, Any]] = {}
+        self._lookups: Dict[str, float] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self._ids = saved.get("ids", {})
+            self._lookups = saved.get("lookups", {})
+
+    # ---- 한도 ----
+    def _prune(self, now: float) -> None:
+        for tag, at in list(self._lookups.items()):
+            if now - at >= self.window:
+                del self._lookups[tag]
+
+    def remaining(self) -> int:
+        """지금 새로 조회할 수 있는 고유 해시태그 수"""
+        with self._lock:
+            self._prune(time.time())
+            return max(0, self.quota - len(self._lookups))
+
+    def next_slot_at(self) -> float:
+        """한도가 하나 이상 비는 시각 (지금 조회 가능하면 현재 시각)"""
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            if len(self._lookups) < self.quota:
+                return now
+            return min(self._lookups.values()) + self.window
+
+    # ---- 조회 ----
+    def get(self, tag: str) -> Optional[str]:
+        """캐시에 있는 ID (없거나 존재하지 않는 해시태그면 None), 요청은 보내지 않음"""
+        with self._lock:
+            entry = self._ids.get(normalize_hashtag(tag))
+            return entry["id"] if entry else None
+
+    def _cached(self, tag: str, now: float) -> Tuple[bool, Optional[str]]:
+        entry = self._ids.get(tag)
+        if entry is None:
+            return False, None
+        if entry["id"] is None and now - entry["resolved_at"] >= self.window:
+            return False, None  # 없던 해시태그는 7일 뒤 다시 확인
+        return True, entry["id"]
+
+    def resolve(self, tag: str, ig_user_id: str, access_token: str) -> str:
+        """
+        해시태그 이름 → ID (캐시 우선)
+        - 없는 해시태그: ValueError
+        - 조회 한도 초과: HashtagQuotaExceeded (요청은 보내지 않음)
+        """
+        name = normalize_hashtag(tag)
+        if not name:
+            raise ValueError("빈 해시태그입니다.")
+        with self._lock:
+            now = time.time()
+            found, tag_id = self._cached(name, now)
+            if not found:
+                self._prune(now)
+                if name not in self._lookups and len(self._lookups) >= self.quota:
+                    raise HashtagQuotaExceeded(name, min(self._lookups.values()) + self.window, self.quota)
+                self._lookups.setdefault(name, now)  # 요청 전에 한도 1 예약
+
+        if not found:
+            import requests
+            try:
+                tag_id = search_hashtag_id(name, ig_user_id, access_token)
+            except requests.RequestException as e:
+                # 응답을 받지 못한 경우에만 예약 취소 (오류 응답도 한도는 차감됐을 수 있음)
+                if getattr(e, "response", None) is None:
+                    with self._lock:
+                        self._lookups.pop(name, None)
+                raise
+            with self._lock:
+                self._ids[name] = {"id": tag_id, "resolved_at": time.time()}
+            self.save()
+            logger.info(f"🔎 해시태그 '{name}' 조회: {tag_id} (남은 한도 {self.remaining()}개)")
+
+        if tag_id is None:
+            raise ValueError(f"해시태그 '{name}' 에 대한 ID를 찾을 수 없습니다.")
+        return tag_id
+
+    def resolve_many(
+        self,
+        tags: Iterable[str],
+        ig_user_id: str,
+        access_token: str,
+        defer: bool = True,
+        errors: Optional[Dict[str, Exception]] = None,
+    ) -> Tuple[Dict[str, str], List[str]]:
+        """
+        여러 해시태그를 한 번에 조회 → ({정규화된 이름: ID}, 한도 때문에 미룬 이름 목록)
+        - 캐시에 있는 것부터 처리하고, 새 조회는 남은 한도만큼만 진행
+        - defer=False 면 한도 초과 시 HashtagQuotaExceeded 발생
+        - 존재하지 않는 해시태그는 결과에서 빠짐 (경고 로그)
+        - errors 를 넘기면 요청이 실패한 해시태그는 {이름: 예외} 로 기록하고 나머지를 계속 조회
+          (없으면 RequestException 을 그대로 올림)
+        """
+        import requests
+
+        names = list(dict.fromkeys(n for n in map(normalize_hashtag, tags) if n))
+        resolved: Dict[str, str] = {}
+        deferred: List[str] = []
+        now = time.time()
+        with self._lock:
+            cached = {name: self._cached(name, now) for name in names}
+        # 캐시된 것 먼저 → 한도는 새 해시태그에만 사용
+        for name in sorted(names, key=lambda n: not cached[n][0]):
+            try:
+                resolved[name] = self.resolve(name, ig_user_id, access_token)
+            except HashtagQuotaExceeded:
+                if not defer:
+                    raise
+                deferred.append(name)
+            except ValueError as e:
+                logger.warning(f"⚠️ {e}")
+            except requests.RequestException as e:
+                if errors is None:
+                    raise
+                errors[name] = e
+        if deferred:
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.next_slot_at()))
+            logger.warning(f"⏳ 조회 한도 초과로 {len(deferred)}개 보류 ({when} 이후 재시도): {deferred}")
+        return {name: resolved[name] for name in names if name in resolved}, deferred
+
+    def save(self) -> None:
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids, "lookups": self._lookups}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.time())
+            return {
+                "cached": sum(1 for entry in self._ids.values() if entry["id"]),
+                "lookups_in_window": len(self._lookups),
+                "remaining": max(0, self.quota - len(self._lookups)),
+            }
+
+
+_cache: Optional[HashtagIdCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_hashtag_cache() -> HashtagIdCache:
+    """프로세스 전체에서 공유하는 해시태그 ID 캐시 반환 (최초 호출 시 HASHTAG_ID_CACHE 로드)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HashtagIdCache()
+    return _cache
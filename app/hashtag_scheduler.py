@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+import requests
+from . import config
+from .metrics import start_from_env as start_metrics
+from .hash_ID_posts import setup_crawler_log
+from .hashtag_crawler import iter_edge_pages, read_tags
+from .hashtag_ids import get_hashtag_cache, normalize_hashtag
+from .jsonl_writer import JsonlWriter
+from .storage import DB_PATH, Storage
+
+logger = logging.getLogger("hashtag_scheduler")
+
+# 스케줄러 상태 파일 (해시태그별 간격 / 다음 폴링 시각 / 최근 media id, 요청 예산 사용 기록)
+SCHEDULER_STATE = os.getenv("SCHEDULER_STATE", "hashtag_scheduler.json")
+
+# 해시태그별 폴링 간격 범위 / 시작값(초)
+SCHEDULER_MIN_INTERVAL   = float(os.getenv("SCHEDULER_MIN_INTERVAL", "300"))
+SCHEDULER_MAX_INTERVAL   = float(os.getenv("SCHEDULER_MAX_INTERVAL", "21600"))
+SCHEDULER_START_INTERVAL = float(os.getenv("SCHEDULER_START_INTERVAL", "1800"))
+# 폴링 1회에 새 게시물이 이 정도 쌓이도록 간격 조절 (페이지 크기보다 작게 잡아야 recent_media 창을 놓치지 않음)
+SCHEDULER_TARGET_NEW = float(os.getenv("SCHEDULER_TARGET_NEW", "20"))
+# 이미 본 media id 가 나올 때까지 따라갈 최대 페이지 수 (한 페이지 = 요청 1회)
+SCHEDULER_MAX_PAGES = int(os.getenv("SCHEDULER_MAX_PAGES", "3"))
+# 전체 요청 예산: SCHEDULER_BUDGET_WINDOW 초 동안 SCHEDULER_BUDGET 회 (Graph API 기본 200회/시간)
+SCHEDULER_BUDGET        = int(os.getenv("SCHEDULER_BUDGET", "200"))
+SCHEDULER_BUDGET_WINDOW = float(os.getenv("SCHEDULER_BUDGET_WINDOW", "3600"))
+# 해시태그별로 기억할 최근 media id 수 (중복 판정용)
+SCHEDULER_SEEN_KEEP = int(os.getenv("SCHEDULER_SEEN_KEEP", "1000"))
+
+# 속도(게시물/초) 이동평균 가중치: 클수록 최근 폴링을 더 반영
+VELOCITY_ALPHA = 0.5
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Graph API timestamp('2024-05-01T12:34:56+0000') → epoch 초"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z").timestamp()
+    except ValueError:
+        return None
+
+
+def page_velocity(posts: List[Dict[str, Any]]) -> Optional[float]:
+    """게시물 timestamp 범위로 추정한 속도(게시물/초), timestamp 가 2개 미만이면 None"""
+    stamps = [ts for ts in map(parse_timestamp, (post.get("timestamp") for post in posts)) if ts]
+    if len(stamps) < 2 or max(stamps) <= min(stamps):
+        return None
+    return (len(stamps) - 1) / (max(stamps) - min(stamps))
+
+
+class RequestBudget:
+    """
+    모든 해시태그가 나눠 쓰는 요청 예산 (최근 window 초 동안 limit 회)
+    - 요청 시각을 기록해 두고 상태 파일에 함께 저장 → 재시작해도 직전 사용량 유지
+    """
+
+    def __init__(self, limit: int = SCHEDULER_BUDGET, window: float = SCHEDULER_BUDGET_WINDOW,
+                 spent: Iterable[float] = ()):
+        self.limit = max(1, limit)
+        self.window = window
+        self.spent: List[float] = sorted(spent)
+
+    def _prune(self, now: float) -> None:
+        while self.spent and now - self.spent[0] >= self.window:
+            self.spent.pop(0)
+
+    def remaining(self, now: Optional[float] = None) -> int:
+        self._prune(time.time() if now is None else now)
+        return max(0, self.limit - len(self.spent))
+
+    def next_slot_at(self, now: Optional[float] = None) -> float:
+        """요청을 하나 더 보낼 수 있는 시각 (지금 가능하면 now)"""
+        now = time.time() if now is None else now
+        self._prune(now)
+        if len(self.spent) < self.limit:
+            return now
+        return self.spent[len(self.spent) - self.limit] + self.window
+
+    def spend(self, now: Optional[float] = None) -> None:
+        self.spent.append(time.time() if now is None else now)
+
+    @property
+    def rate(self) -> float:
+        """예산이 허용하는 평균 초당 요청 수"""
+        return self.limit / self.window
+
+
+class HashtagScheduler:
+    """
+    여러 해시태그의 recent_media 를 해시태그별 간격으로 계속 폴링하는 스케줄러
+    - 폴링마다 처음 보는 media id 수 / 경과 시간으로 속도를 구해 다음 간격 계산
+      (간격 ≈ SCHEDULER_TARGET_NEW / 속도, MIN~MAX 범위, 첫 폴링은 게시물 timestamp 로 추정)
+    - 첫 페이지부터 모두 새 게시물이면 창을 놓쳤을 수 있으므로 다음 페이지를 따라가고 간격을 절반으로
+    - 전체 요청 예산(RequestBudget)을 넘지 않도록, 해시태그별 예상 요청 수 합이 예산보다 크면 간격을 비례해서 늘림
+    - 폴링할 때마다 상태 파일에 저장 → 재시작하면 다음 폴링 시각 / 본 media id 를 이어서 사용
+    """
+
+    def __init__(
+        self,
+        tags: Iterable[str],
+        state_path: str = SCHEDULER_STATE,
+        budget: Optional[RequestBudget] = None,
+        limit: int = 50,
+        writer: Optional[JsonlWriter] = None,
+        storage: Optional[Storage] = None,
+    ):
+        self.state_path = state_path
+        self.limit = limit
+        self.writer = writer
+        self.storage = storage
+        self._stop = threading.Event()
+        saved: Dict[str, Any] = {}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        # 명령행에서 빠진 해시태그 상태도 남겨 둠 (다시 추가하면 이어서 폴링)
+        self.tags: Dict[str, Dict[str, Any]] = saved.get("tags", {})
+        self.budget = budget or RequestBudget()
+        self.budget.spent = sorted(set(self.budget.spent) | set(saved.get("budget_spent", [])))
+        self.active = list(dict.fromkeys(n for n in map(normalize_hashtag, tags) if n))
+        now = time.time()
+        for name in self.active:
+            self.tags.setdefault(name, {
+                "tag_id": None,
+                "interval": SCHEDULER_START_INTERVAL,
+                "next_at": now,
+                "last_polled_at": None,
+                "velocity": None,
+                "polls": 0,
+                "new_total": 0,
+                "errors": 0,
+                "seen": [],
+            })
+
+    # ---- 상태 ----
+    def save(self) -> None:
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"tags": self.tags, "budget_spent": self.budget.spent}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """해시태그별 요약 (다음 폴링 순)"""
+        rows = []
+        for name in sorted(self.active, key=lambda n: self.tags[n]["next_at"]):
+            state = self.tags[name]
+            rows.append({
+                "tag": name,
+                "interval": state["interval"],
+                "next_at": state["next_at"],
+                "velocity_per_hour": round(state["velocity"] * 3600, 1) if state["velocity"] is not None else None,
+                "polls": state["polls"],
+                "new_total": state["new_total"],
+                "errors": state["errors"],
+            })
+        return rows
+
+    # ---- 간격 ----
+    def _budget_scale(self) -> float:
+        """해시태그별 간격대로 폴링할 때의 예상 초당 요청 수가 예산을 넘으면 그 배율 (아니면 1)"""
+        demand = sum(
+            self.tags[name].get("pages", 1) / self.tags[name]["interval"]
+            for name in self.active if self.tags[name]["tag_id"]
+        )
+        return max(1.0, demand / self.budget.rate)
+
+    def _next_interval(self, state: Dict[str, Any], new: int, elapsed: Optional[float],
+                       estimate: Optional[float], saturated: bool) -> float:
+        if saturated:  # 다음 페이지까지 모두 새 게시물 → 창을 놓치고 있으므로 빠르게 좁힘
+            return max(SCHEDULER_MIN_INTERVAL, state["interval"] / 2)
+        observed = new / elapsed if elapsed else estimate
+        if observed is not None:
+            previous = state["velocity"]
+            state["velocity"] = observed if previous is None else (
+                VELOCITY_ALPHA * observed + (1 - VELOCITY_ALPHA) * previous
+            )
+        velocity = state["velocity"]
+        if velocity is None:  # 아직 추정 불가 (timestamp 필드 없음) → 시작 간격 유지
+            interval = state["interval"]
+        elif velocity == 0:  # 조용한 해시태그 → 점점 드물게
+            interval = state["interval"] * 2
+        else:
+            interval = SCHEDULER_TARGET_NEW / velocity
+        return min(SCHEDULER_MAX_INTERVAL, max(SCHEDULER_MIN_INTERVAL, interval))
+
+    # ---- 폴링 ----
+    def _resolve(self, name: str) -> bool:
+        """해시태그 ID 조회 (캐시 우선), 조회 한도에 걸리면 한도가 비는 시각으로 미룸"""
+        state = self.tags[name]
+        if state["tag_id"]:
+            return True
+        cache = get_hashtag_cache()
+        tag_ids, deferred = cache.resolve_many([name], config.env("IG_USER_ID"), config.env("ACCESS_TOKEN"))
+        if name in tag_ids:
+            state["tag_id"] = tag_ids[name]
+            return True
+        state["next_at"] = cache.next_slot_at() if deferred else time.time() + SCHEDULER_MAX_INTERVAL
+        return False
+
+    def _wait(self, until: float) -> bool:
+        """until 까지 대기, 중간에 stop() 되면 False"""
+        delay = until - time.time()
+        return not self._stop.wait(delay) if delay > 0 else not self._stop.is_set()
+
+    def poll(self, name: str) -> int:
+        """
+        해시태그 1개 폴링 → 새 게시물 수
+        - 페이지마다 예산 1회 사용 (예산이 비면 빌 때까지 대기)
+        - 이미 본 media id 가 나오거나 SCHEDULER_MAX_PAGES 에 닿으면 중단
+        """
+        state = self.tags[name]
+        now = time.time()
+        seen = set(state["seen"])
+        new_posts: List[Dict[str, Any]] = []
+        first_page: List[Dict[str, Any]] = []
+        pages = 0
+        overlapped = False
+        edge_pages = iter_edge_pages(state["tag_id"], "recent_media", self.limit)
+        while pages < SCHEDULER_MAX_PAGES:
+            if not self._wait(self.budget.next_slot_at()):
+                break
+            self.budget.spend()
+            try:
+                page = next(edge_pages)
+            except StopIteration:  # 다음 페이지 없음 → 요청을 보내지 않았으므로 예산 반환
+                self.budget.spent.pop()
+                overlapped = True
+                break
+            pages += 1
+            first_page = first_page or page
+            fresh = [post for post in page if post["id"] not in seen]
+            new_posts.extend(fresh)
+            seen.update(post["id"] for post in fresh)
+            if len(fresh) < len(page):
+                overlapped = True
+                break
+            if not state["seen"]:  # 첫 폴링은 첫 페이지만 (속도는 timestamp 로 추정)
+                overlapped = True
+                break
+
+        if new_posts:
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+            if self.writer:
+                self.writer.write_many({**post, "hashtag": name, "polled_at": stamp} for post in new_posts)
+                self.writer.flush()  # 상태 저장 전에 기록 (재시작 시 같은 게시물을 다시 내보내지 않도록)
+            if self.storage:
+                self.storage.add_hashtag_posts(state["tag_id"], new_posts)
+                self.storage.flush()
+
+        elapsed = now - state["last_polled_at"] if state["last_polled_at"] else None
+        estimate = page_velocity(first_page) if elapsed is None else None
+        saturated = elapsed is not None and not overlapped and pages >= SCHEDULER_MAX_PAGES
+        state["interval"] = self._next_interval(state, len(new_posts), elapsed, estimate, saturated)
+        state["seen"] = (state["seen"] + [post["id"] for post in new_posts])[-SCHEDULER_SEEN_KEEP:]
+        state["pages"] = max(1, pages)
+        state["last_polled_at"] = now
+        state["polls"] += 1
+        state["new_total"] += len(new_posts)
+        state["errors"] = 0
+        state["next_at"] = now + state["interval"] * self._budget_scale()
+        return len(new_posts)
+
+    def run_once(self, name: str) -> None:
+        """해시태그 1개 처리 (ID 조회 → 폴링 → 다음 시각 계산 → 상태 저장)"""
+        state = self.tags[name]
+        try:
+            if self._resolve(name):
+                new = self.poll(name)
+                logger.info(
+                    f"✅ #{name}: 새 게시물 {new}개, 다음 폴링 {state['interval'] / 60:.0f}분 뒤 "
+                    f"(남은 예산 {self.budget.remaining()}회)"
+                )
+        except requests.RequestException as e:
+            state["errors"] += 1
+            backoff = min(SCHEDULER_MAX_INTERVAL, SCHEDULER_MIN_INTERVAL * 2 ** (state["errors"] - 1))
+            state["next_at"] = time.time() + backoff
+            logger.error(f"❌ #{name} 폴링 실패 ({state['errors']}회째, {backoff:.0f}초 뒤 재시도): {e}")
+        self.save()
+
+    def run(self, once: bool = False) -> None:
+        """
+        다음 폴링 시각이 가장 이른 해시태그부터 계속 처리 (stop() 까지)
+        - once: 지금 차례인 해시태그만 한 번씩 처리하고 종료 (cron 용)
+        """
+        if not self.active:
+            return
+        started = time.time()
+        logger.info(f"▶️ 해시태그 {len(self.active)}개 폴링 시작 (예산 {self.budget.limit}회/{self.budget.window:.0f}초)")
+        while not self._stop.is_set():
+            name = min(self.active, key=lambda n: self.tags[n]["next_at"])
+            due = self.tags[name]["next_at"]
+            if once and due > started:
+                break
+            if not self._wait(due):
+                break
+            self.run_once(name)
+        logger.info(f"⏹️ 스케줄러 종료 (상태 저장: {self.state_path})")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Poll hashtags continuously with adaptive per-tag intervals")
+    parser.add_argument("hashtags", nargs="*", help="폴링할 해시태그 (# 제외)")
+    parser.add_argument("--file", "-f", help="해시태그 목록 파일 (한 줄에 하나)")
+    parser.add_argument("--state", default=SCHEDULER_STATE, help="상태 파일 (재시작 시 이어서 폴링)")
+    parser.add_argument("--output", "-o", default="hashtag_stream.jsonl",
+                        help="새 게시물을 이어 붙일 JSONL 파일 (.jsonl / .jsonl.gz)")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로 (지정하면 hashtag_posts 테이블에 upsert)")
+    parser.add_argument("--limit", "-n", type=int, default=50, help="페이지당 게시물 수 (최대 50)")
+    parser.add_argument("--budget", type=int, default=SCHEDULER_BUDGET,
+                        help="전체 요청 예산 (--budget-window 초당 횟수)")
+    parser.add_argument("--budget-window", type=float, default=SCHEDULER_BUDGET_WINDOW, help="예산 기간(초)")
+    parser.add_argument("--once", action="store_true", help="지금 차례인 해시태그만 한 번 폴링하고 종료")
+    parser.add_argument("--status", action="store_true", help="상태 파일의 해시태그별 간격 / 속도만 출력")
+    args = parser.parse_args(argv)
+
+    tags = read_tags(args.hashtags, args.file)
+    if args.status:
+        scheduler = HashtagScheduler(tags, args.state)
+        if not tags:
+            scheduler.active = list(scheduler.tags)
+        for row in scheduler.status():
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["next_at"]))
+            print(f"#{row['tag']:<20} 간격 {row['interval'] / 60:6.1f}분  다음 {when}  "
+                  f"속도 {row['velocity_per_hour']}/시간  폴링 {row['polls']}회  새 게시물 {row['new_total']}개")
+        return
+
+    setup_crawler_log()
+    start_metrics()  # METRICS_PORT / METRICS_SNAPSHOT 이 있으면 지표 노출
+    if not config.env("IG_USER_ID") or not config.env("ACCESS_TOKEN"):
+        parser.error("환경변수 IG_USER_ID 및 ACCESS_TOKEN을 설정해주세요.")
+    if not tags:
+        parser.error("해시태그를 인자 또는 --file 로 지정하세요.")
+
+    storage = Storage(args.db) if args.db else None
+    with JsonlWriter(args.output, append=True) as writer:
+        scheduler = HashtagScheduler(
+            tags, args.state, RequestBudget(args.budget, args.budget_window),
+            limit=args.limit, writer=writer, storage=storage,
+        )
+        # Ctrl+C / SIGTERM → 진행 중인 폴링을 마치고 상태 저장 후 종료
+        signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        try:
+            scheduler.run(once=args.once)
+        finally:
+            if storage:
+                storage.close()
+
+
+if __name__ == "__main__":
+    main()
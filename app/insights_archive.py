@@ -0,0 +1,439 @@
+import os
+import sys
+import gzip
+import json
+import struct
+import argparse
+from array import array
+from itertools import zip_longest
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .media_reader import iter_media
+
+# 파일 구조: MAGIC + 버전(1B) + 압축 코덱(1B) + 본문(코덱으로 압축)
+# 본문: 헤더 JSON 길이(u32) + 헤더 JSON + 블록(ids / set_index / values / extras)
+MAGIC   = b"IGARC"
+VERSION = 1
+ARCHIVE_EXT = ".igarc"
+
+CODECS = {"none": 0, "gzip": 1, "zstd": 2}
+CODEC_NAMES = {code: name for name, code in CODECS.items()}
+
+# 기본 압축 (zstd 는 zstandard 패키지가 있을 때만, 없으면 gzip)
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_LEVEL       = int(os.getenv("ARCHIVE_LEVEL", "19"))
+
+# set_index 에서 "표준 insights 목록이 아닌 행" 표시 (원본을 extras 에 그대로 보관)
+RAW_ROW = 0xFFFF
+
+# 값 범위에 맞춰 가장 작은 정수 타입 선택
+_INT_TYPES = (("b", 1 << 7), ("h", 1 << 15), ("i", 1 << 31), ("q", 1 << 63))
+
+
+def has_zstd() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_compression() -> str:
+    if ARCHIVE_COMPRESSION == "zstd" and not has_zstd():
+        return "gzip"
+    return ARCHIVE_COMPRESSION
+
+
+def is_archive_path(path: str) -> bool:
+    return path.endswith(ARCHIVE_EXT)
+
+
+def _compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "none":
+        return data
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=min(9, level), mtime=0)
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd 압축에는 zstandard 패키지가 필요합니다 (pip install zstandard).")
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"지원하지 않는 압축 방식: {codec}")
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "none":
+        return data
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd 로 압축된 파일입니다. zstandard 패키지를 설치하세요.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"지원하지 않는 압축 방식: {codec}")
+
+
+def _pack_array(values: array) -> bytes:
+    """배열 → little-endian 바이트"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack_array(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _int_array(values: List[int]) -> array:
+    lo, hi = (min(values), max(values)) if values else (0, 0)
+    for typecode, bound in _INT_TYPES:
+        if -bound <= lo and hi < bound:
+            return array(typecode, values)
+    raise OverflowError("int64 범위를 넘는 값")
+
+
+def _numeric_ids(ids: List[str]) -> Optional[array]:
+    """media id 가 모두 uint64 에 들어가는 숫자 문자열이면 정수 배열로 (아니면 None → 문자열 목록으로 저장)"""
+    try:
+        values = array("Q", (int(mid) for mid in ids))
+    except (ValueError, OverflowError):
+        return None
+    if any(str(value) != mid for value, mid in zip(values, ids)):  # 앞자리 0, 공백 등
+        return None
+    return values
+
+
+def _standard_insights(media_id: Any, insights: Any) -> Optional[List[Tuple[Tuple[str, str, str, str], int]]]:
+    """
+    Graph API 기본 응답 모양이면 [(지표 정의, 값), ...], 아니면 None
+    기본 모양: {name, period, values: [{value: 정수}], title, description, id: "<media>/insights/<name>/<period>"}
+    """
+    if not isinstance(media_id, str) or not isinstance(insights, list):
+        return None
+    result = []
+    for insight in insights:
+        if not isinstance(insight, dict) or len(insight) != 6:
+            return None
+        name, period = insight.get("name"), insight.get("period")
+        title, description = insight.get("title"), insight.get("description")
+        values = insight.get("values")
+        if not (isinstance(name, str) and isinstance(period, str)
+                and isinstance(title, str) and isinstance(description, str)):
+            return None
+        if not (isinstance(values, list) and len(values) == 1
+                and isinstance(values[0], dict) and list(values[0]) == ["value"]):
+            return None
+        value = values[0]["value"]
+        if type(value) is not int or not -(1 << 63) <= value < (1 << 63):
+            return None
+        if insight.get("id") != f"{media_id}/insights/{name}/{period}":
+            return None
+        result.append(((name, period, title, description), value))
+    return result
+
+
+class InsightsArchive:
+    """
+    insights 덤프의 압축 저장 형식 (.igarc)
+    - 지표 정의(name / period / title / description) 는 사전에 한 번만, 미디어별 지표 조합은 set 으로 한 번만 기록
+    - 미디어별 값은 set 순서대로 이어 붙인 정수 배열 (값 범위에 맞는 가장 작은 타입)
+    - media id 는 숫자면 uint64 배열, 표준 모양이 아닌 insights(오류 문자열 / 객체 등) 와 id / insights 외 필드는 extras(JSON)
+    - iter_posts() 로 원래 Graph API 모양을 그대로 복원 (손실 없음)
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.metrics: List[Tuple[str, str, str, str]] = []
+        self.sets: List[List[int]] = []
+        self.set_index = array("H")
+        self.values = array("q")
+        self.raw: Dict[int, Any] = {}       # 행 → 원본 insights (표준 모양이 아닌 경우)
+        self.fields: Dict[int, Dict[str, Any]] = {}  # 행 → id / insights 외 필드
+        self.meta: Dict[str, Any] = {}
+        self._offsets: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---- 인코딩 ----
+    @classmethod
+    def from_posts(cls, posts: Iterable[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> "InsightsArchive":
+        archive = cls()
+        archive.meta = dict(meta or {})
+        metric_codes: Dict[Tuple[str, str, str, str], int] = {}
+        set_codes: Dict[Tuple[int, ...], int] = {}
+        values: List[int] = []
+
+        for row, post in enumerate(posts):
+            media_id = post.get("id")
+            archive.ids.append(media_id if isinstance(media_id, str) else "")
+            rest = {k: v for k, v in post.items() if k not in ("id", "insights")}
+            if not isinstance(media_id, str):
+                rest["id"] = media_id  # 문자열이 아닌 id 는 원본 그대로 보관 (없는 경우 포함)
+            if rest or "id" not in post:
+                rest["__order__"] = list(post)
+                archive.fields[row] = rest
+
+            standard = _standard_insights(media_id, post.get("insights")) if "insights" in post else None
+            if standard is None:
+                archive.set_index.append(RAW_ROW)
+                if "insights" in post:
+                    archive.raw[row] = post["insights"]
+                continue
+
+            codes = []
+            for definition, value in standard:
+                code = metric_codes.get(definition)
+                if code is None:
+                    code = metric_codes[definition] = len(archive.metrics)
+                    archive.metrics.append(definition)
+                codes.append(code)
+                values.append(value)
+            key = tuple(codes)
+            set_code = set_codes.get(key)
+            if set_code is None:
+                set_code = set_codes[key] = len(archive.sets)
+                if set_code >= RAW_ROW:
+                    raise ValueError("지표 조합이 너무 많습니다 (최대 65535).")
+                archive.sets.append(codes)
+            archive.set_index.append(set_code)
+
+        archive.values = _int_array(values)
+        return archive
+
+    def to_bytes(self, compression: Optional[str] = None, level: int = ARCHIVE_LEVEL) -> bytes:
+        codec = compression or default_compression()
+        if codec not in CODECS:
+            raise ValueError(f"지원하지 않는 압축 방식: {codec}")
+
+        numeric_ids = _numeric_ids(self.ids)
+        ids_block = _pack_array(numeric_ids) if numeric_ids is not None else b""
+        set_block = _pack_array(self.set_index)
+        value_block = _pack_array(self.values)
+        extras_block = json.dumps(
+            {"raw": self.raw, "fields": self.fields}, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8") if (self.raw or self.fields) else b""
+
+        header = {
+            "count": len(self.ids),
+            "metrics": [list(definition) for definition in self.metrics],
+            "sets": self.sets,
+            "ids": None if numeric_ids is not None else self.ids,
+            "values_type": self.values.typecode,
+            "blocks": [len(ids_block), len(set_block), len(value_block), len(extras_block)],
+            "meta": self.meta,
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        body = b"".join((
+            struct.pack("<I", len(header_bytes)), header_bytes,
+            ids_block, set_block, value_block, extras_block,
+        ))
+        return MAGIC + bytes((VERSION, CODECS[codec])) + _compress(body, codec, level)
+
+    # ---- 디코딩 ----
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "InsightsArchive":
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("insights 아카이브(.igarc) 파일이 아닙니다.")
+        version, codec = data[len(MAGIC)], data[len(MAGIC) + 1]
+        if version != VERSION:
+            raise ValueError(f"지원하지 않는 아카이브 버전: {version}")
+        if codec not in CODEC_NAMES:
+            raise ValueError(f"알 수 없는 압축 코덱: {codec}")
+        body = _decompress(data[len(MAGIC) + 2:], CODEC_NAMES[codec])
+
+        (header_len,) = struct.unpack_from("<I", body)
+        pos = 4 + header_len
+        header = json.loads(body[4:pos].decode("utf-8"))
+        blocks = []
+        for size in header["blocks"]:
+            blocks.append(body[pos:pos + size])
+            pos += size
+        ids_block, set_block, value_block, extras_block = blocks
+
+        archive = cls()
+        archive.meta = header.get("meta") or {}
+        archive.metrics = [tuple(definition) for definition in header["metrics"]]
+        archive.sets = header["sets"]
+        if header["ids"] is None:
+            archive.ids = [str(mid) for mid in _unpack_array("Q", ids_block)]
+        else:
+            archive.ids = header["ids"]
+        archive.set_index = _unpack_array("H", set_block)
+        archive.values = _unpack_array(header["values_type"], value_block)
+        if extras_block:
+            extras = json.loads(extras_block.decode("utf-8"))
+            archive.raw = {int(row): value for row, value in extras["raw"].items()}
+            archive.fields = {int(row): value for row, value in extras["fields"].items()}
+        if len(archive.ids) != header["count"] or len(archive.set_index) != header["count"]:
+            raise ValueError("아카이브가 손상되었습니다 (행 수 불일치).")
+        return archive
+
+    @property
+    def offsets(self) -> array:
+        """행별 values 시작 위치 (표준 모양이 아닌 행은 길이 0)"""
+        if self._offsets is None:
+            lengths = [len(codes) for codes in self.sets]
+            offsets, pos = array("q"), 0
+            for set_code in self.set_index:
+                offsets.append(pos)
+                if set_code != RAW_ROW:
+                    pos += lengths[set_code]
+            self._offsets = offsets
+        return self._offsets
+
+    def iter_posts(self) -> Iterator[Dict[str, Any]]:
+        """원래 Graph API 모양({id, ..., insights: [...]}) 으로 복원해서 한 건씩 yield"""
+        offsets = self.offsets
+        for row, media_id in enumerate(self.ids):
+            set_code = self.set_index[row]
+            if set_code == RAW_ROW:
+                insights = self.raw.get(row, _MISSING)
+            else:
+                start = offsets[row]
+                insights = []
+                for i, code in enumerate(self.sets[set_code]):
+                    name, period, title, description = self.metrics[code]
+                    insights.append({
+                        "name": name,
+                        "period": period,
+                        "values": [{"value": self.values[start + i]}],
+                        "title": title,
+                        "description": description,
+                        "id": f"{media_id}/insights/{name}/{period}",
+                    })
+
+            fields = self.fields.get(row)
+            if fields is None:
+                post = {"id": media_id}
+                if insights is not _MISSING:
+                    post["insights"] = insights
+                yield post
+                continue
+            values = {"id": media_id, **fields, "insights": insights}
+            yield {key: values[key] for key in fields["__order__"]}
+
+    def columns(self) -> Dict[str, list]:
+        """
+        js_to_csv.flatten_insights() 와 같은 컬럼 구성 ({"id": [...], "<metric>": [...]}, 없는 값은 0)
+        Graph API 모양으로 복원하지 않고 정수 배열에서 바로 만듦
+        """
+        count = len(self.ids)
+        columns: Dict[str, list] = {}
+        offsets = self.offsets
+        set_names = [[self.metrics[code][0] for code in codes] for codes in self.sets]
+        for row in range(count):
+            set_code = self.set_index[row]
+            if set_code == RAW_ROW:
+                continue
+            start = offsets[row]
+            for i, name in enumerate(set_names[set_code]):
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [0] * count
+                column[row] = self.values[start + i]
+        return {"id": list(self.ids), **columns}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "media": len(self.ids),
+            "metrics": len(self.metrics),
+            "metric_sets": len(self.sets),
+            "values": len(self.values),
+            "values_type": self.values.typecode,
+            "raw_rows": len(self.raw),
+        }
+
+    # ---- 파일 ----
+    def save(self, path: str, compression: Optional[str] = None, level: int = ARCHIVE_LEVEL) -> int:
+        """임시 파일에 쓴 뒤 교체 → 중간에 중단돼도 기존 파일 유지, 기록한 바이트 수 반환"""
+        data = self.to_bytes(compression, level)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    @classmethod
+    def load(cls, path: str) -> "InsightsArchive":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+_MISSING = object()
+
+
+def write_archive(path: str, posts: Iterable[Dict[str, Any]], compression: Optional[str] = None,
+                  meta: Optional[Dict[str, Any]] = None) -> InsightsArchive:
+    archive = InsightsArchive.from_posts(posts, meta)
+    archive.save(path, compression)
+    return archive
+
+
+def read_archive(path: str) -> Iterator[Dict[str, Any]]:
+    """.igarc → Graph API 모양의 미디어를 한 건씩 (media_reader.iter_media 에서 사용)"""
+    yield from InsightsArchive.load(path).iter_posts()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pack insights dumps into the compact .igarc archive format")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pack = sub.add_parser("pack", help="JSON / JSONL 덤프 → .igarc")
+    pack.add_argument("input", help="미디어 덤프 (.json / .jsonl / .gz)")
+    pack.add_argument("--output", "-o", help=f"출력 파일 (기본: 입력 이름 + {ARCHIVE_EXT})")
+    pack.add_argument("--compression", "-c", choices=sorted(CODECS), help="압축 방식 (기본: zstd, 없으면 gzip)")
+    pack.add_argument("--level", type=int, default=ARCHIVE_LEVEL, help=f"압축 레벨 (기본: {ARCHIVE_LEVEL}, gzip 은 최대 9)")
+    pack.add_argument("--fetched-at", help="스냅샷 수집 시각 (meta 에 기록)")
+    pack.add_argument("--verify", action="store_true", help="저장 후 다시 읽어 원본과 같은지 확인")
+
+    unpack = sub.add_parser("unpack", help=".igarc → JSON / JSONL (Graph API 모양 그대로)")
+    unpack.add_argument("input")
+    unpack.add_argument("--output", "-o", required=True, help="출력 파일 (.json / .jsonl / .jsonl.gz)")
+
+    info = sub.add_parser("info", help="아카이브 요약 정보")
+    info.add_argument("input")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        output = args.output or os.path.splitext(args.input.removesuffix(".gz"))[0] + ARCHIVE_EXT
+        meta = {"source": os.path.basename(args.input)}
+        if args.fetched_at:
+            meta["fetched_at"] = args.fetched_at
+        archive = InsightsArchive.from_posts(iter_media(args.input), meta)
+        size = archive.save(output, args.compression, args.level)
+        source_size = os.path.getsize(args.input)
+        print(f"✅ {len(archive)}개 미디어 → '{output}' ({source_size:,} → {size:,} bytes, "
+              f"{source_size / max(size, 1):.1f}배 축소)")
+        if args.verify:
+            restored = InsightsArchive.load(output).iter_posts()
+            # 건수가 다르면 zip 이 짧은 쪽에서 멈추므로 끝까지 짝지어 비교
+            for original, copy in zip_longest(iter_media(args.input), restored, fillvalue=_MISSING):
+                if original != copy:
+                    media_id = (copy if original is _MISSING else original).get("id")
+                    raise SystemExit(f"❌ 복원 결과가 원본과 다릅니다: id={media_id}")
+            print("🔁 원본과 동일하게 복원됨")
+    elif args.command == "unpack":
+        from .jsonl_writer import JsonlWriter, is_jsonl_path
+        posts = read_archive(args.input)
+        if is_jsonl_path(args.output):
+            with JsonlWriter(args.output) as writer:
+                writer.write_many(posts)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(list(posts), f, ensure_ascii=False, indent=2)
+        print(f"✅ '{args.output}' 저장 완료")
+    else:
+        archive = InsightsArchive.load(args.input)
+        print({**archive.stats(), "bytes": os.path.getsize(args.input), "meta": archive.meta})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("insights_cache")
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# (게시물 나이 상한, 재조회 간격) — 위에서부터 처음 맞는 구간 적용
+REFRESH_POLICY = [
+    (DAY, HOUR),         # 게시 후 1일 이내: 1시간마다
+    (30 * DAY, DAY),     # 30일 이내: 하루마다
+    (None, 7 * DAY),     # 그 이후: 일주일마다
+]
+
+
+def post_age_seconds(post: Dict[str, Any], now: Optional[float] = None) -> Optional[float]:
+    """게시물 timestamp(예: 2025-07-28T09:00:00+0000) 기준 경과 시간(초), 알 수 없으면 None"""
+    ts = post.get("timestamp")
+    if not ts:
+        return None
+    try:
+        posted = datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        return None
+    now = time.time() if now is None else now
+    return now - posted.astimezone(timezone.utc).timestamp()
+
+
+def refresh_interval(post: Dict[str, Any], now: Optional[float] = None) -> int:
+    """게시물 나이에 따른 insights 재조회 간격(초), 나이를 모르면 가장 짧은 간격"""
+    age = post_age_seconds(post, now)
+    if age is None:
+        return REFRESH_POLICY[0][1]
+    for max_age, interval in REFRESH_POLICY:
+        if max_age is None or age < max_age:
+            return interval
+    return REFRESH_POLICY[-1][1]
+
+
+class InsightsCache:
+    """
+    media id + metric 세트 단위로 insights 응답을 저장하는 파일 캐시
+    - get(): 게시물 나이에 따른 재조회 간격 안이면 저장된 data 반환, 아니면 None
+    - put(): 정상 응답(data 목록)만 저장, 오류 응답은 저장하지 않음
+    - fetched_at(): 저장된 항목의 실제 조회 시각 (재사용분 스냅샷 시각으로 사용)
+    - save(): 임시 파일에 쓴 뒤 교체
+    여러 워커 스레드에서 동시에 사용해도 안전
+    """
+
+    def __init__(self, path: str, force_refresh: bool = False):
+        self.path = path
+        self.force_refresh = force_refresh
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    @staticmethod
+    def key(media_id: str, metrics: Optional[str]) -> str:
+        return f"{media_id}|{metrics or ''}"
+
+    def get(self, post: Dict[str, Any], metrics: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(self.key(post["id"], metrics))
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if self.force_refresh or now - entry["fetched_at"] >= refresh_interval(post, now):
+                self.stale += 1
+                return None
+            self.hits += 1
+            return entry["data"]
+
+    def fetched_at(self, post: Dict[str, Any], metrics: Optional[str]) -> Optional[float]:
+        """저장된 insights 의 실제 조회 시각(epoch), 항목이 없으면 None"""
+        with self._lock:
+            entry = self._entries.get(self.key(post["id"], metrics))
+            return entry["fetched_at"] if entry else None
+
+    def put(self, post: Dict[str, Any], metrics: Optional[str], data: Any) -> None:
+        if not isinstance(data, list):
+            return
+        with self._lock:
+            self._entries[self.key(post["id"], metrics)] = {"fetched_at": time.time(), "data": data}
+
+    def save(self) -> None:
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,121 @@
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from .graph_client import redact
+
+logger = logging.getLogger("jobs")
+
+# 끝난 작업을 몇 개까지 보관할지 (오래된 것부터 삭제)
+MAX_FINISHED_JOBS = 200
+
+
+class Job:
+    """
+    백그라운드 작업 1건의 상태
+    - status: queued → running → done / failed
+    - progress(done, total): 작업 함수가 진행 상황을 알릴 때 호출 (워커 스레드에서 호출해도 됨)
+    """
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.done = 0
+        self.total: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        info = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            info["result"] = self.result
+        return info
+
+
+class JobManager:
+    """
+    블로킹 수집 함수를 스레드에서 실행하는 작업 관리자
+    - submit(): 같은 dedupe_key 의 작업이 진행 중이면 새로 만들지 않고 그 작업 반환
+    - 동시에 실행하는 작업 수는 max_running 으로 제한 (나머지는 queued 로 대기)
+    """
+
+    def __init__(self, max_running: int = 2):
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[Hashable, Job] = {}
+        self._slots = asyncio.Semaphore(max(1, max_running))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        return list(self._jobs.values())
+
+    def submit(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        fn: Callable[[Job], Any],
+        dedupe_key: Optional[Hashable] = None,
+    ) -> Job:
+        """fn(job) 을 백그라운드 스레드에서 실행, 반환값은 job.result 에 저장"""
+        if dedupe_key is not None:
+            active = self._active.get(dedupe_key)
+            if active is not None and not active.finished:
+                return active
+
+        job = Job(kind, params)
+        self._jobs[job.id] = job
+        if dedupe_key is not None:
+            self._active[dedupe_key] = job
+        asyncio.ensure_future(self._run(job, fn, dedupe_key))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[Job], Any], dedupe_key: Optional[Hashable]) -> None:
+        async with self._slots:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await asyncio.to_thread(fn, job)
+                job.status = "done"
+            except Exception as e:
+                # 요청 예외 메시지에는 access_token 이 든 URL 이 포함될 수 있음 → 가려서 보관 / 노출
+                job.error = redact(str(e))
+                logger.error(f"❌ 작업 실패 ({job.kind} {job.id}): {job.error}")
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                if dedupe_key is not None and self._active.get(dedupe_key) is job:
+                    del self._active[dedupe_key]
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
@@ -1,66 +1,217 @@
-import json
-import pandas as pd
 import os
+import argparse
+from typing import Any, Dict, Iterable, List, Optional
+from .change_tracker import changes_since_export, mark_exported
+from .media_reader import iter_media
+
+# 출력 형식별 확장자
+FORMAT_EXT = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
 
-# =====================================
-# 1️⃣ 파일 경로 설정
-# =====================================
-input_path = r"C:\Users\Administrator\Desktop\git_pre\instagram_api\scripts\all_user_media_with_insights.json"  # JSON 파일 경로 수정
-output_path = r"C:\Users\Administrator\Desktop\git_pre\instagram_api\scripts\all_user_media_with_insights.csv"  # 저장할 CSV 경로
 
 # =====================================
-# 2️⃣ JSON 파일 불러오기
+# 1️⃣ JSON → 컬럼 (Flatten)
 # =====================================
-with open(input_path, "r", encoding="utf-8") as f:
-    data = json.load(f)
+def flatten_insights(records: Iterable[Dict[str, Any]]) -> Dict[str, list]:
+    """
+    게시물별 insights 를 행(dict) 대신 컬럼 목록으로 바로 구성
+    - records 는 iter_media() 처럼 한 건씩 읽는 iterator 여도 됨 (원본 전체를 메모리에 두지 않음)
+    - 반환: {"id": [...], "<metric>": [...], ...} (없는 값은 0)
+    - insights 가 목록이 아니면(오류 문자열 / error_info 객체 등) 해당 행의 지표는 0
+    """
+    ids: List[str] = []
+    metrics: Dict[str, list] = {}
+    broken = 0
+
+    for i, post in enumerate(records):
+        ids.append(post.get("id", ""))
+        for column in metrics.values():
+            column.append(0)
+        insights = post.get("insights", [])
+        # ✅ insights가 dict 리스트인지 확인
+        if not isinstance(insights, list):
+            broken += 1
+            continue
+        for insight in insights:
+            if not isinstance(insight, dict):  # ✅ 문자열일 경우 건너뛰기
+                continue
+            values = insight.get("values")
+            value = values[0].get("value", 0) if values and isinstance(values, list) else 0
+            column = metrics.get(insight.get("name"))
+            if column is None:
+                column = metrics[insight.get("name")] = [0] * (i + 1)
+            column[i] = value
+
+    if broken:
+        print(f"⚠️ insights 구조가 비정상인 게시물 {broken}개 → 지표 0 처리")
+    return {"id": ids, **metrics}
 
-print(f"📦 불러온 게시물 개수: {len(data)}")
 
 # =====================================
-# 3️⃣ JSON → 평탄화 (Flatten)
+# 2️⃣ DataFrame 변환 + 파생 지표
 # =====================================
-rows = []
+def build_frame(columns: Dict[str, list]):
+    """컬럼 dict → 타입이 지정된 DataFrame (지표는 정수형, engagement_rate(%) 벡터 연산)"""
+    import pandas as pd
 
-for post in data:
-    post_id = post.get("id", "")
-    row = {"id": post_id}
+    df = pd.DataFrame({"id": pd.Series(columns["id"], dtype="string")})
+    for name, values in columns.items():
+        if name == "id":
+            continue
+        series = pd.to_numeric(pd.Series(values), errors="coerce").fillna(0)
+        if (series % 1 == 0).all():
+            series = series.astype("int64")
+        df[name] = series
+    return add_engagement_rate(df)
 
-    insights = post.get("insights", [])
-    # ✅ insights가 dict 리스트인지 확인
-    if isinstance(insights, list):
-        for insight in insights:
-            if isinstance(insight, dict):  # ✅ 문자열일 경우 건너뛰기
-                name = insight.get("name")
-                value = 0
-                if insight.get("values") and isinstance(insight["values"], list):
-                    value = insight["values"][0].get("value", 0)
-                row[name] = value
-    else:
-        print(f"⚠️ {post_id} → insights 구조가 비정상입니다: {type(insights)}")
 
-    rows.append(row)
+def add_engagement_rate(df):
+    """engagement_rate(%) = total_interactions / reach * 100 (reach 가 0 이면 0)"""
+    if "reach" in df.columns and "total_interactions" in df.columns:
+        reach = df["reach"].where(df["reach"] != 0)
+        df["engagement_rate(%)"] = (df["total_interactions"] / reach * 100).round(2).fillna(0)
+    return df
+
+
+def apply_changes(df, changes: Dict[str, Optional[Dict[str, Any]]]):
+    """
+    기존 출력 DataFrame 에 델타({media_id: 최신 레코드 또는 None(삭제)}) 반영
+    - 바뀐 미디어만 flatten → 변경은 제자리 교체, 새 미디어는 맨 앞(최신순), 삭제는 제거
+    """
+    import pandas as pd
+
+    records = [record for record in changes.values() if record is not None]
+    derived = ["engagement_rate(%)"]  # 합친 뒤 다시 계산
+    base = df.drop(columns=derived, errors="ignore").drop_duplicates("id").set_index("id")
+    update = build_frame(flatten_insights(records)).drop(columns=derived, errors="ignore").set_index("id")
+
+    order = [mid for mid in update.index if mid not in base.index]
+    order += [mid for mid in base.index if changes.get(mid, True) is not None]
+    merged = pd.concat([base.drop(index=base.index.intersection(list(changes))), update]).reindex(order)
+
+    for name in merged.columns:
+        series = pd.to_numeric(merged[name], errors="coerce").fillna(0)
+        merged[name] = series.astype("int64") if (series % 1 == 0).all() else series
+    merged.index.name = "id"
+    return add_engagement_rate(merged.reset_index().astype({"id": "string"}))
 
-# =====================================
-# 4️⃣ DataFrame 변환
-# =====================================
-df = pd.DataFrame(rows)
-df.fillna(0, inplace=True)
 
 # =====================================
-# 5️⃣ engagement_rate(%) 추가
+# 3️⃣ CSV / Parquet / Feather 저장
 # =====================================
-if "reach" in df.columns and "total_interactions" in df.columns:
-    df["engagement_rate(%)"] = df.apply(
-        lambda x: round((x["total_interactions"] / x["reach"] * 100), 2)
-        if x["reach"] != 0 else 0,
-        axis=1
+def save_frame(df, output_base: str, formats: List[str]) -> List[str]:
+    """formats 별로 output_base + 확장자 파일 저장, 저장한 경로 목록 반환"""
+    paths = []
+    for fmt in formats:
+        path = output_base + FORMAT_EXT[fmt]
+        if fmt == "csv":
+            df.to_csv(path, index=False, encoding="utf-8-sig")
+        elif fmt == "parquet":
+            df.to_parquet(path, index=False, compression="zstd")
+        elif fmt == "feather":
+            df.to_feather(path, compression="zstd")
+        paths.append(path)
+    return paths
+
+
+def load_frame(output_base: str, formats: List[str]):
+    """이전에 저장한 출력 중 하나를 읽음 (parquet → feather → csv 순, 없으면 None)"""
+    import pandas as pd
+
+    for fmt in ("parquet", "feather", "csv"):
+        path = output_base + FORMAT_EXT[fmt]
+        if fmt not in formats or not os.path.exists(path):
+            continue
+        if fmt == "parquet":
+            return pd.read_parquet(path)
+        if fmt == "feather":
+            return pd.read_feather(path)
+        return pd.read_csv(path, dtype={"id": "string"}, encoding="utf-8-sig")
+    return None
+
+
+def export_delta(input_path: str, output_base: str, formats: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    지난 내보내기 이후의 델타(change_tracker) 만 기존 출력에 반영
+    델타를 이어 붙일 수 없거나 출력 파일이 없으면 None (전체 재생성 필요)
+    """
+    if any(not os.path.exists(output_base + FORMAT_EXT[fmt]) for fmt in formats):
+        return None
+    pending = changes_since_export(input_path, output_base)
+    if pending is None:
+        return None
+    seq, changes = pending
+    if changes:
+        df = load_frame(output_base, formats)
+        if df is None:
+            return None
+        save_frame(apply_changes(df, changes), output_base, formats)
+    mark_exported(input_path, output_base, seq)
+    deleted = sum(1 for record in changes.values() if record is None)
+    return {"seq": seq, "upserted": len(changes) - deleted, "deleted": deleted}
+
+
+def output_base_for(input_path: str, output: str = None) -> str:
+    """출력 경로에서 확장자를 뗀 기준 경로 (기본: 입력 파일과 같은 이름)"""
+    path = output or input_path
+    for ext in (".jsonl.gz", ".jsonl", ".json", ".igarc", *FORMAT_EXT.values()):
+        if path.endswith(ext):
+            return path[: -len(ext)]
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Flatten media insights JSON into CSV / Parquet / Feather"
+    )
+    parser.add_argument(
+        "input",
+        help="insights 가 포함된 JSON / JSONL(.gz) 또는 insights 아카이브(.igarc) 파일 경로"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        help="저장할 파일 경로 (확장자는 --format 에 따라 결정, 기본: 입력 파일과 같은 이름)"
+    )
+    parser.add_argument(
+        "--format", "-f",
+        nargs="+", choices=sorted(FORMAT_EXT), default=["csv"],
+        help="저장 형식 (여러 개 지정 가능, 기본: csv)"
     )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="델타 반영 대신 항상 전체를 다시 변환 (기본: 지난 내보내기 이후 바뀐 미디어만 반영)"
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f"입력 파일이 없습니다: {args.input}")
+
+    output_base = output_base_for(args.input, args.output)
+    if not args.full:
+        result = export_delta(args.input, output_base, args.format)
+        if result is not None:
+            print(
+                f"⚡ 델타 반영 (seq={result['seq']}): 추가/변경 {result['upserted']}개, "
+                f"삭제 {result['deleted']}개 → {', '.join(output_base + FORMAT_EXT[f] for f in args.format)}"
+            )
+            return
+
+    if args.input.endswith(".igarc"):
+        # 아카이브는 Graph API 모양으로 복원하지 않고 정수 배열에서 바로 컬럼 구성
+        from .insights_archive import InsightsArchive
+        columns = InsightsArchive.load(args.input).columns()
+    else:
+        # 게시물을 한 건씩 읽으면서 바로 컬럼으로 변환
+        columns = flatten_insights(iter_media(args.input))
+    print(f"📦 불러온 게시물 개수: {len(columns['id'])}")
+
+    df = build_frame(columns)
+
+    for path in save_frame(df, output_base, args.format):
+        print(f"✅ 저장 완료: {path}")
+    mark_exported(args.input, output_base)
+    print("📊 미리보기:")
+    print(df.head())
 
-# =====================================
-# 6️⃣ CSV로 저장
-# =====================================
-df.to_csv(output_path, index=False, encoding="utf-8-sig")
 
-print(f"✅ CSV 저장 완료: {output_path}")
-print("📊 미리보기:")
-print(df.head())
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import gzip
+import json
+import time
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+# 기본 flush 주기: 레코드 수 / 초 (둘 중 먼저 도달하는 쪽)
+FLUSH_EVERY   = int(os.getenv("JSONL_FLUSH_EVERY", "100"))
+FLUSH_SECONDS = float(os.getenv("JSONL_FLUSH_SECONDS", "5"))
+
+
+def is_jsonl_path(path: str) -> bool:
+    """.jsonl / .jsonl.gz 확장자면 스트리밍(JSONL) 출력 대상"""
+    return path.endswith(".jsonl") or path.endswith(".jsonl.gz")
+
+
+def staging_path(path: str) -> str:
+    """path 를 교체하기 전에 먼저 쓸 같은 폴더의 임시 파일 (.tmp-<이름>, .gz 확장자 유지)"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".tmp-{name}")
+
+
+class JsonlWriter:
+    """
+    레코드를 한 줄씩 바로 기록하는 JSONL writer (.gz 확장자면 gzip 압축)
+    - 일정 레코드 수 / 시간마다 flush 해서, 수집 중에도 다른 프로세스가 앞부분을 읽을 수 있음
+    - 중간에 중단돼도 이미 기록한 레코드는 남음
+    여러 스레드에서 write() 해도 줄이 섞이지 않음
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_every: int = FLUSH_EVERY,
+        flush_seconds: float = FLUSH_SECONDS,
+        append: bool = False,
+    ):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.flush_seconds = flush_seconds
+        self.count = 0
+        mode = "at" if append else "wt"
+        if path.endswith(".gz"):
+            self._f = gzip.open(path, mode, encoding="utf-8")
+        else:
+            self._f = open(path, mode, encoding="utf-8")
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+            self.count += 1
+            self._unflushed += 1
+            if (self._unflushed >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self._flush()
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def _flush(self) -> None:
+        self._f.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> Optional[bool]:
+        self.close()
+        return None
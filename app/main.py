@@ -0,0 +1,246 @@
+import os
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import requests
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from . import config
+
+# 튜닝 값(DB_PATH, GRAPH_* 등)은 각 모듈 import 시 읽으므로 .env 를 먼저 로드
+config.load_env()
+
+from . import graph_client
+from . import hash_ID_srch
+from . import hash_ID_posts
+from . import my_contents
+from . import my_insight
+from . import engagement_analytics
+from .hashtag_ids import HashtagQuotaExceeded, get_hashtag_cache, normalize_hashtag
+from .jobs import Job, JobManager
+from .metrics import get_metrics
+from .service_cache import AsyncTTLCache
+from .storage import DB_PATH, Storage
+
+# 같은 조회 결과를 재사용할 시간(초) / 해시태그 ID 는 거의 바뀌지 않으므로 길게
+API_CACHE_TTL         = float(os.getenv("API_CACHE_TTL", "300"))
+API_HASHTAG_ID_TTL    = float(os.getenv("API_HASHTAG_ID_TTL", "86400"))
+# 동시에 실행할 백그라운드 수집 작업 수
+API_MAX_RUNNING_JOBS  = int(os.getenv("API_MAX_RUNNING_JOBS", "2"))
+
+app = FastAPI(title="Instagram Graph API Crawler", version="1.0")
+
+hashtag_ids = AsyncTTLCache(API_HASHTAG_ID_TTL)
+responses = AsyncTTLCache(API_CACHE_TTL)
+jobs = JobManager(API_MAX_RUNNING_JOBS)
+graph_metrics = get_metrics()
+hash_ID_posts.setup_crawler_log()
+
+
+async def _call(fn, *args, **kwargs) -> Any:
+    """블로킹 Graph API 호출을 스레드에서 실행하고 오류를 HTTP 응답으로 변환"""
+    try:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    except HashtagQuotaExceeded as e:
+        retry_after = max(1, int(e.retry_at - time.time()))
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except graph_client.IncompletePagination as e:
+        # 일부만 받은 목록은 응답 / 캐시하지 않음 (완전한 목록인 것처럼 보이지 않도록)
+        raise HTTPException(status_code=502, detail=f"Graph API paging incomplete: {e}")
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 502
+        # 예외 메시지의 요청 URL 에 access_token 이 들어 있으므로 가린 뒤 응답
+        raise HTTPException(status_code=502, detail=f"Graph API error ({status}): {graph_client.redact(str(e))}")
+    except requests.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Graph API request failed: {graph_client.redact(str(e))}")
+
+
+async def resolve_hashtag_id(tag: str) -> str:
+    tag = normalize_hashtag(tag)
+    return await hashtag_ids.get_or_load(tag, lambda: _call(hash_ID_srch.get_hashtag_id, tag))
+
+
+# =====================================
+# 조회 엔드포인트
+# =====================================
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "cache": {"hashtag_ids": hashtag_ids.stats(), "responses": responses.stats()},
+        "hashtag_quota": get_hashtag_cache().stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> str:
+    """Graph API 호출 지표 (Prometheus 텍스트 형식)"""
+    return graph_metrics.render_prometheus()
+
+
+@app.get("/metrics.json")
+async def metrics_snapshot() -> Dict[str, Any]:
+    """엔드포인트별 지연 / 상태 코드 / 재시도 / 사용률 요약 (전체 요청 시간 비중 큰 순)"""
+    return graph_metrics.snapshot()
+
+
+@app.get("/hashtags/{tag}/id")
+async def hashtag_id(tag: str) -> Dict[str, str]:
+    return {"hashtag": normalize_hashtag(tag), "id": await resolve_hashtag_id(tag)}
+
+
+@app.get("/hashtags/{tag}/posts")
+async def hashtag_posts(tag: str, limit: int = Query(25, ge=1, le=50)) -> Dict[str, Any]:
+    tag_id = await resolve_hashtag_id(tag)
+    posts = await responses.get_or_load(
+        ("hashtag_posts", tag_id, limit),
+        lambda: _call(hash_ID_posts.fetch_hashtag_posts, tag_id, limit),
+    )
+    return {"hashtag": normalize_hashtag(tag), "id": tag_id, "count": len(posts), "data": posts}
+
+
+@app.get("/media")
+async def media(limit: int = Query(25, ge=1, le=100)) -> Dict[str, Any]:
+    posts = await responses.get_or_load(
+        ("media", limit),
+        lambda: _call(my_contents.fetch_user_media_all, limit),
+    )
+    return {"count": len(posts), "data": posts}
+
+
+@app.get("/media/{media_id}/insights")
+async def media_insights(
+    media_id: str,
+    metrics: Optional[str] = Query(None, description="쉼표로 구분한 지표 (기본: env INSIGHT_METRICS)"),
+) -> Dict[str, Any]:
+    def load() -> Dict[str, Any]:
+        result = my_insight.fetch_insights(media_id, metrics or config.env("INSIGHT_METRICS"))
+        if "error" in result:
+            raise requests.RequestException(result["error"])
+        return result
+
+    result = await responses.get_or_load(("insights", media_id, metrics), lambda: _call(load))
+    return {"id": media_id, "data": result.get("data", [])}
+
+
+@app.get("/analytics/engagement")
+async def engagement(
+    refresh: bool = False,
+    include_posts: bool = Query(False, description="게시물별 비율 / 백분위(post_ranks) 포함"),
+) -> Dict[str, Any]:
+    """
+    미디어 타입별 참여 / 저장 / 공유율, 이동 비율, top-N, 게시 시간대 heatmap
+    데이터셋 버전이 같으면 <stem>.analytics.json 에 미리 계산해 둔 결과를 그대로 반환
+    """
+    dataset = config.env(
+        "ANALYTICS_DATASET", os.path.join(config.output_dir(), "all_user_media_with_insights.json")
+    )
+    if not os.path.exists(dataset):
+        raise HTTPException(status_code=404, detail=f"데이터셋이 없습니다: {dataset}")
+    report = await asyncio.to_thread(
+        engagement_analytics.load_report, dataset, config.env("ANALYTICS_MEDIA"), refresh
+    )
+    if not include_posts:
+        report.pop("post_ranks", None)
+    return report
+
+
+# =====================================
+# 백그라운드 수집 작업
+# =====================================
+class HashtagCrawlRequest(BaseModel):
+    hashtags: List[str] = Field(..., min_length=1, description="# 제외 해시태그 목록")
+    limit: int = Field(50, ge=1, le=50)
+    save_db: bool = Field(True, description="DB_PATH 가 설정돼 있으면 hashtag_posts 에 upsert")
+
+
+class InsightsCrawlRequest(BaseModel):
+    limit: int = Field(100, ge=1, le=100, description="미디어 목록 페이지 크기")
+    batch: bool = Field(False, description="Graph API batch 요청 사용")
+    workers: Optional[int] = Field(None, ge=1, le=32)
+    save_db: bool = True
+
+
+def _run_hashtag_crawl(job: Job, req: HashtagCrawlRequest, tag_ids: Dict[str, str]) -> Dict[str, Any]:
+    results = {}
+    storage = Storage(DB_PATH) if req.save_db and DB_PATH else None
+    try:
+        job.progress(0, len(tag_ids))
+        for i, (tag, tag_id) in enumerate(tag_ids.items(), 1):
+            posts = hash_ID_posts.fetch_hashtag_posts(tag_id, req.limit)
+            if storage:
+                storage.add_hashtag_posts(tag_id, posts)
+            results[tag] = {"id": tag_id, "count": len(posts), "data": posts}
+            job.progress(i)
+    finally:
+        if storage:
+            storage.close()
+    return results
+
+
+def _run_insights_crawl(job: Job, req: InsightsCrawlRequest) -> List[Dict[str, Any]]:
+    posts = my_insight.fetch_user_media_all(req.limit)
+    job.progress(0, len(posts))
+    storage = Storage(DB_PATH) if req.save_db and DB_PATH else None
+    finished = 0
+
+    def sink(post: Dict[str, Any]) -> None:
+        nonlocal finished
+        finished += 1
+        job.progress(finished)
+        if storage:
+            storage.add_media(post, config.env("IG_USER_ID"))
+
+    try:
+        if req.batch:
+            my_insight.collect_insights_batch(posts, sink=sink)
+        else:
+            my_insight.collect_insights(posts, workers=req.workers or my_insight.INSIGHT_WORKERS, sink=sink)
+    finally:
+        if storage:
+            storage.close()
+    return posts
+
+
+@app.post("/jobs/hashtag-crawl", status_code=202)
+async def start_hashtag_crawl(req: HashtagCrawlRequest) -> Dict[str, Any]:
+    tags = sorted({normalize_hashtag(tag) for tag in req.hashtags})
+    # ID 조회는 요청 안에서 끝내서 잘못된 해시태그는 바로 404
+    ids = await asyncio.gather(*(resolve_hashtag_id(tag) for tag in tags))
+    tag_ids = dict(zip(tags, ids))
+    job = jobs.submit(
+        "hashtag-crawl",
+        {"hashtags": tags, "limit": req.limit},
+        lambda job: _run_hashtag_crawl(job, req, tag_ids),
+        dedupe_key=("hashtag-crawl", tuple(tags), req.limit),
+    )
+    return job.to_dict()
+
+
+@app.post("/jobs/insights-crawl", status_code=202)
+async def start_insights_crawl(req: InsightsCrawlRequest) -> Dict[str, Any]:
+    job = jobs.submit(
+        "insights-crawl",
+        {"limit": req.limit, "batch": req.batch},
+        lambda job: _run_insights_crawl(job, req),
+        dedupe_key=("insights-crawl",),
+    )
+    return job.to_dict()
+
+
+@app.get("/jobs")
+async def list_jobs() -> List[Dict[str, Any]]:
+    return [job.to_dict() for job in jobs.list()]
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, include_result: bool = False) -> Dict[str, Any]:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"작업을 찾을 수 없습니다: {job_id}")
+    return job.to_dict(include_result=include_result and job.finished)
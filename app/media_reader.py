@@ -0,0 +1,116 @@
+import gzip
+import json
+from typing import Any, Dict, Iterator, TextIO
+
+# 한 번에 읽어 들일 문자 수
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\r\n"
+# 배열 안에서 원소 뒤에 올 수 있는 문자 (숫자는 이 문자가 나와야 끝났다고 확정)
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+def _open_text(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith(".jsonl") or path.endswith(".jsonl.gz")
+
+
+def _iter_jsonl(f: TextIO) -> Iterator[Dict[str, Any]]:
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_json_array(f: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    최상위 JSON 배열의 원소를 하나씩 파싱해서 yield
+    버퍼에는 현재 원소와 읽다 만 chunk 만 남기므로 파일 크기와 무관하게 메모리 사용량 일정
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip(_WHITESPACE)
+    if pos >= len(buf):
+        return  # 빈 파일
+    if buf[pos] != "[":
+        raise ValueError("JSON 배열(또는 JSONL) 형식이 아닙니다.")
+    pos += 1
+
+    while True:
+        skip(_WHITESPACE + ",")
+        if pos >= len(buf):
+            raise ValueError("JSON 배열이 닫히지 않았습니다 (파일이 잘렸을 수 있음).")
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                item, end = None, -1
+            # 원소가 버퍼 끝에서 끝났다면 뒤에 내용이 더 있을 수 있으므로 더 읽어서 확인
+            # 숫자는 chunk 경계에서 잘리면 앞부분만으로도 파싱되므로(15000000000|.0) 구분자까지 읽혀야 확정
+            if end != -1 and (eof or (end < len(buf) and (
+                not isinstance(item, (int, float)) or buf[end] in _DELIMITERS
+            ))):
+                break
+            if not fill():
+                if end == -1:
+                    raise ValueError("JSON 배열 원소를 파싱할 수 없습니다 (파일이 잘렸을 수 있음).")
+        pos = end
+        yield item
+
+
+def iter_media(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    미디어 덤프에서 레코드를 하나씩 yield
+    - JSON 배열(.json / .json.gz) 과 JSONL(.jsonl / .jsonl.gz) 모두 지원
+    - insights 아카이브(.igarc) 는 Graph API 모양으로 복원해서 yield
+    - 확장자가 애매하면 첫 글자로 판단 ("[" 이면 배열, 아니면 JSONL)
+    """
+    if path.endswith(".igarc"):
+        from .insights_archive import read_archive
+        yield from read_archive(path)
+        return
+    with _open_text(path) as f:
+        if is_jsonl(path):
+            yield from _iter_jsonl(f)
+            return
+        if path.endswith(".json") or path.endswith(".json.gz"):
+            yield from _iter_json_array(f)
+            return
+
+        head = f.read(1)
+        while head and head in _WHITESPACE:
+            head = f.read(1)
+    if not head:
+        return
+    with _open_text(path) as f:
+        if head == "[":
+            yield from _iter_json_array(f)
+        else:
+            yield from _iter_jsonl(f)
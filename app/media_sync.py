@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import logging
+import requests
+from . import graph_client
+from .jsonl_writer import JsonlWriter
+from .media_reader import iter_media
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger("media_sync")
+
+
+def load_state(state_path: str) -> Dict[str, Any]:
+    """동기화 상태 파일 읽기 (없으면 빈 상태)"""
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state_path: str, state: Dict[str, Any]) -> None:
+    """임시 파일에 쓴 뒤 교체해서, 저장 도중 중단돼도 이전 상태가 깨지지 않도록 함"""
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def load_existing(output_path: str) -> List[Dict[str, Any]]:
+    """이전 실행에서 저장한 미디어 목록 읽기 (JSON 배열 또는 JSONL(.gz), 없으면 빈 목록)"""
+    if not os.path.exists(output_path):
+        return []
+    return list(iter_media(output_path))
+
+
+def merge_media(new_posts: List[Dict[str, Any]], existing: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """새 미디어를 기존 목록 앞에 붙이고 id 기준으로 중복 제거 (새 데이터 우선)"""
+    seen = set()
+    merged = []
+    for post in new_posts + existing:
+        if post.get("id") in seen:
+            continue
+        seen.add(post.get("id"))
+        merged.append(post)
+    return merged
+
+
+def replace_streamed(tmp_path: str, output_path: str, complete: bool = True) -> None:
+    """
+    스트리밍으로 다 쓴 임시 JSONL 로 output_path 교체
+    - complete=False (페이징이 중간에 끊긴 경우): 받은 만큼을 기존 파일과 id 기준으로 병합한 뒤 교체
+    """
+    if not complete:
+        merged = merge_media(list(iter_media(tmp_path)), load_existing(output_path))
+        with JsonlWriter(tmp_path) as writer:
+            writer.write_many(merged)
+    os.replace(tmp_path, output_path)
+
+
+def sync_user_media(
+    ig_user_id: str,
+    fields: Optional[str],
+    access_token: str,
+    state_path: str,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """
+    지난 동기화 이후 새로 올라온 미디어만 가져오는 증분 동기화
+    - /media 는 최신순으로 내려오므로, 이미 본 timestamp 에 도달한 페이지에서 중단
+    - 페이지마다 cursor 와 수집분을 state_path 에 저장 → 중단되면 다음 실행에서 이어서 진행
+    - 재시도 후에도 실패하면 부분 결과를 반환하지 않고 예외 발생 (상태는 보존)
+    반환: 새 미디어 목록 (최신순)
+    """
+    # 이어받기 기준이 timestamp 이므로 필드 지정이 없어도 항상 요청
+    fields = fields or "id"
+    if "timestamp" not in fields.split(","):
+        fields = f"{fields},timestamp"
+
+    state = load_state(state_path)
+    newest_timestamp: Optional[str] = state.get("newest_timestamp")
+    cursor: Optional[str] = state.get("cursor")
+    posts: List[Dict[str, Any]] = state.get("pending", []) if cursor else []
+
+    if cursor:
+        logger.info(f"↩️ 이전 동기화 이어서 진행: 수집분 {len(posts)}개, cursor={cursor[:12]}…")
+    elif newest_timestamp:
+        logger.info(f"🔄 증분 동기화: {newest_timestamp} 이후 미디어만 수집")
+    else:
+        logger.info("🆕 동기화 상태 없음 → 전체 미디어 수집")
+
+    url = graph_client.graph_url(f"{ig_user_id}/media")
+    while True:
+        params = {"fields": fields, "access_token": access_token, "limit": limit}
+        if cursor:
+            params["after"] = cursor
+
+        start = time.time()
+        try:
+            resp = graph_client.get(url, params=params)
+        except requests.RequestException as e:
+            raise RuntimeError(
+                f"미디어 동기화 실패 (수집분 {len(posts)}개는 '{state_path}' 에 보존, 다시 실행하면 이어서 진행): {e}"
+            ) from e
+        elapsed = int((time.time() - start) * 1000)
+
+        payload = resp.json()
+        data = payload.get("data", [])
+        fresh = [p for p in data if not newest_timestamp or p.get("timestamp", "") > newest_timestamp]
+        posts.extend(fresh)
+
+        # 고정(pinned) 게시물은 순서와 무관하게 맨 앞에 올 수 있으므로 페이지 마지막 항목으로 판단
+        reached_known = bool(
+            newest_timestamp and data and data[-1].get("timestamp", "") <= newest_timestamp
+        )
+        paging = payload.get("paging", {})
+        cursor = paging.get("cursors", {}).get("after") if paging.get("next") else None
+
+        logger.info(
+            f"페이지 동기화: time={elapsed}ms, new_this_page={len(fresh)}, total_new={len(posts)}"
+        )
+
+        if reached_known or not cursor:
+            break
+        save_state(state_path, {"newest_timestamp": newest_timestamp, "cursor": cursor, "pending": posts})
+
+    timestamps = [p["timestamp"] for p in posts if p.get("timestamp")]
+    if newest_timestamp:
+        timestamps.append(newest_timestamp)
+    save_state(state_path, {
+        "newest_timestamp": max(timestamps) if timestamps else None,
+        "cursor": None,
+        "pending": [],
+        "last_synced_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    })
+    logger.info(f"✅ 증분 동기화 완료: 새 미디어 {len(posts)}개")
+    return posts
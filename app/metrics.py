@@ -0,0 +1,311 @@
+import os
+import re
+import json
+import time
+import atexit
+import logging
+import threading
+import requests
+from . import graph_client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from typing import Any, Dict, List, Optional, Tuple
+from .rate_limiter import parse_usage_headers
+
+# 지정하면 Prometheus 텍스트 형식(/metrics)과 JSON(/metrics.json)을 이 포트로 노출
+METRICS_PORT     = int(os.getenv("METRICS_PORT", "0"))
+# 지정하면 METRICS_INTERVAL 초마다 JSON 스냅샷을 이 파일에 기록 (종료 시 한 번 더)
+METRICS_SNAPSHOT = os.getenv("METRICS_SNAPSHOT")
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "30"))
+
+# 지연 히스토그램 경계(ms)
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+logger = logging.getLogger("metrics")
+
+_ID_SEGMENT_RE = re.compile(r"^\d[\d_]*$")
+_VERSION_RE = re.compile(r"^v\d+\.\d+$")
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """
+    요청 URL → 엔드포인트 이름 (ID 는 {id} 로 치환, 쿼리 제외)
+    예: .../v23.0/17841.../insights → /{id}/insights, GET / → /?ids, POST / → /batch
+    """
+    parts = [part for part in urlparse(url).path.split("/") if part]
+    if parts and _VERSION_RE.match(parts[0]):
+        parts = parts[1:]
+    if not parts:
+        return "/batch" if method == "POST" else "/?ids"
+    return "/" + "/".join("{id}" if _ID_SEGMENT_RE.match(part) else part for part in parts)
+
+
+def _count_items(payload: Any) -> Optional[int]:
+    """응답 본문의 항목 수: data 목록 / ?ids 결과 / batch 하위 응답 (셀 수 없으면 None)"""
+    if isinstance(payload, list):
+        return len(payload)
+    if isinstance(payload, dict):
+        if isinstance(payload.get("data"), list):
+            return len(payload["data"])
+        if payload and all(isinstance(value, dict) for value in payload.values()) and "error" not in payload:
+            return len(payload)
+    return None
+
+
+class Histogram:
+    """누적 버킷 히스토그램 (Prometheus histogram 과 같은 구조)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 마지막은 +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """버킷 안에서 선형 보간한 근사 분위수"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen, lower = 0, 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= target:
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return float(self.buckets[-1])
+
+
+class GraphMetrics:
+    """
+    Graph API 호출 지표 (graph_client hook 으로 모든 요청에 적용)
+    - 엔드포인트별 지연 히스토그램(ms) / 상태 코드별 요청 수 / 재시도 수 / 페이지당 항목 수
+    - 최근 X-App-Usage / X-Business-Use-Case-Usage 사용률(%)
+    render_prometheus() 로 텍스트 형식, snapshot() 으로 JSON 반환
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._status: Dict[Tuple[str, str, str], int] = {}
+        self._retries: Dict[Tuple[str, str], int] = {}
+        self._items: Dict[Tuple[str, str], List[int]] = {}   # [페이지 수, 항목 수]
+        self._app_usage: Dict[str, float] = {}
+        self._business_usage: Dict[str, float] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            for table in (self._latency, self._status, self._retries, self._items,
+                          self._app_usage, self._business_usage):
+                table.clear()
+
+    # ---- graph_client hook ----
+    def on_request(self, method: str, url: str, status: Optional[int], elapsed_ms: int,
+                   attempt: int, error: Optional[Exception]) -> None:
+        key = (method, endpoint_name(method, url))
+        code = str(status) if status is not None else type(error).__name__
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram(self.buckets)
+            histogram.observe(elapsed_ms)
+            self._status[key + (code,)] = self._status.get(key + (code,), 0) + 1
+            if attempt:
+                self._retries[key] = self._retries.get(key, 0) + 1
+
+    def on_response(self, method: str, url: str, resp: requests.Response) -> None:
+        app = parse_usage_headers(resp.headers, ("app",))
+        business = parse_usage_headers(resp.headers, ("business",))
+        items = None
+        if resp.status_code == 200 and "json" in resp.headers.get("Content-Type", ""):
+            try:
+                items = _count_items(resp.json())
+            except ValueError:
+                pass
+        key = (method, endpoint_name(method, url))
+        with self._lock:
+            if app:
+                self._app_usage["usage"] = app["usage"]
+            if business:
+                self._business_usage[graph_client.current_account() or "default"] = business["usage"]
+            if items is not None:
+                pages = self._items.setdefault(key, [0, 0])
+                pages[0] += 1
+                pages[1] += items
+
+    # ---- 출력 ----
+    def snapshot(self) -> Dict[str, Any]:
+        """엔드포인트별 요약 (전체 요청 시간 중 비중 큰 순)"""
+        with self._lock:
+            wall = sum(h.total for h in self._latency.values()) or 1.0
+            endpoints = []
+            for (method, endpoint), histogram in self._latency.items():
+                statuses = {
+                    code: count for (m, e, code), count in self._status.items() if (m, e) == (method, endpoint)
+                }
+                pages, items = self._items.get((method, endpoint), [0, 0])
+                endpoints.append({
+                    "method": method,
+                    "endpoint": endpoint,
+                    "requests": histogram.count,
+                    "total_s": round(histogram.total / 1000, 3),
+                    "time_share": round(histogram.total / wall, 3),
+                    "avg_ms": round(histogram.total / histogram.count, 1),
+                    "p50_ms": round(histogram.quantile(0.5), 1),
+                    "p95_ms": round(histogram.quantile(0.95), 1),
+                    "p99_ms": round(histogram.quantile(0.99), 1),
+                    "statuses": statuses,
+                    "retries": self._retries.get((method, endpoint), 0),
+                    "items_per_page": round(items / pages, 1) if pages else None,
+                })
+            return {
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "app_usage": self._app_usage.get("usage"),
+                "business_usage": dict(self._business_usage),
+                "endpoints": sorted(endpoints, key=lambda e: e["total_s"], reverse=True),
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식 (0.0.4)"""
+        lines = [
+            "# HELP graph_request_duration_seconds Graph API request latency",
+            "# TYPE graph_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (method, endpoint), histogram in sorted(self._latency.items()):
+                labels = f'method="{method}",endpoint="{endpoint}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'graph_request_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'graph_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"graph_request_duration_seconds_sum{{{labels}}} {histogram.total / 1000:.3f}")
+                lines.append(f"graph_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+            lines += ["# HELP graph_requests_total Graph API requests by status code",
+                      "# TYPE graph_requests_total counter"]
+            for (method, endpoint, code), count in sorted(self._status.items()):
+                lines.append(f'graph_requests_total{{method="{method}",endpoint="{endpoint}",status="{code}"}} {count}')
+
+            lines += ["# HELP graph_request_retries_total Graph API retry attempts",
+                      "# TYPE graph_request_retries_total counter"]
+            for (method, endpoint), count in sorted(self._retries.items()):
+                lines.append(f'graph_request_retries_total{{method="{method}",endpoint="{endpoint}"}} {count}')
+
+            lines += ["# HELP graph_page_items Items returned per response page",
+                      "# TYPE graph_page_items summary"]
+            for (method, endpoint), (pages, items) in sorted(self._items.items()):
+                labels = f'method="{method}",endpoint="{endpoint}"'
+                lines.append(f"graph_page_items_sum{{{labels}}} {items}")
+                lines.append(f"graph_page_items_count{{{labels}}} {pages}")
+
+            lines += ["# HELP graph_usage_percent Latest Graph API usage percentage from response headers",
+                      "# TYPE graph_usage_percent gauge"]
+            if "usage" in self._app_usage:
+                lines.append(f'graph_usage_percent{{source="app"}} {self._app_usage["usage"]:g}')
+            for account, usage in sorted(self._business_usage.items()):
+                lines.append(f'graph_usage_percent{{source="business",account="{account}"}} {usage:g}')
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+_metrics: Optional[GraphMetrics] = None
+_metrics_lock = threading.Lock()
+_started = False
+
+
+def get_metrics() -> GraphMetrics:
+    """graph_client 에 hook 으로 연결된 공유 지표 (최초 호출 시 생성 + 등록)"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                metrics = GraphMetrics()
+                graph_client.add_request_hook(metrics.on_request)
+                graph_client.add_response_hook(metrics.on_response)
+                _metrics = metrics
+    return _metrics
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """/metrics (Prometheus) 와 /metrics.json 을 백그라운드 스레드로 노출"""
+    metrics = get_metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            path = urlparse(self.path).path
+            if path == "/metrics":
+                body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4"
+            elif path == "/metrics.json":
+                body, content_type = json.dumps(metrics.snapshot(), ensure_ascii=False), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8" if "json" in content_type else content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"📈 metrics: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def start_snapshots(path: str, interval: float = METRICS_INTERVAL) -> threading.Event:
+    """interval 초마다 JSON 스냅샷 기록 + 종료 시 마지막 스냅샷 (반환된 Event.set() 으로 중지)"""
+    metrics = get_metrics()
+    stop = threading.Event()
+
+    def loop() -> None:
+        while not stop.wait(interval):
+            try:
+                metrics.write_snapshot(path)
+            except OSError as e:
+                logger.warning(f"metrics 스냅샷 저장 실패: {e}")
+
+    threading.Thread(target=loop, daemon=True).start()
+    atexit.register(metrics.write_snapshot, path)
+    return stop
+
+
+def start_from_env() -> GraphMetrics:
+    """
+    CLI 진입점에서 호출: hook 등록 + METRICS_PORT / METRICS_SNAPSHOT 이 있으면 노출 / 스냅샷 시작
+    (환경변수가 없으면 hook 만 등록하고 아무것도 노출하지 않음)
+    """
+    global _started
+    metrics = get_metrics()
+    with _metrics_lock:
+        if _started:
+            return metrics
+        _started = True
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+    if METRICS_SNAPSHOT:
+        start_snapshots(METRICS_SNAPSHOT, METRICS_INTERVAL)
+    return metrics
@@ -0,0 +1,353 @@
+import os
+import re
+import json
+import time
+import random
+import zlib
+import logging
+import argparse
+import threading
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+from typing import Any, Dict, List, Optional, Tuple
+from .media_reader import iter_media
+
+logger = logging.getLogger("mock_graph")
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+
+# 고정 데이터로 쓸 덤프 (미디어 정보 + insights 를 id 로 합침)
+MEDIA_FIXTURE    = "all_user_media.json"
+INSIGHTS_FIXTURE = "all_user_media_with_insights.json"
+
+# insights 필드 확장 / 중첩 필드 파싱용
+_INSIGHTS_FIELD_RE = re.compile(r"insights\.metric\(([^)]*)\)")
+_VERSION_RE = re.compile(r"^v\d+\.\d+$")
+
+
+def load_fixtures(scripts_dir: str = SCRIPTS_DIR, scale: int = 1) -> List[Dict[str, Any]]:
+    """
+    scripts/*.json 덤프 → 미디어 목록 (insights 포함)
+    - scale: 데이터를 N 배로 복제 (복제본 id 는 "<id>_<n>")
+    """
+    insights = {}
+    insights_path = os.path.join(scripts_dir, INSIGHTS_FIXTURE)
+    if os.path.exists(insights_path):
+        insights = {post["id"]: post.get("insights") for post in iter_media(insights_path)}
+
+    media = []
+    for post in iter_media(os.path.join(scripts_dir, MEDIA_FIXTURE)):
+        item = dict(post)
+        if isinstance(insights.get(post["id"]), list):
+            item["insights"] = insights[post["id"]]
+        media.append(item)
+
+    fixtures = list(media)
+    for n in range(1, max(1, scale)):
+        fixtures.extend({**post, "id": f"{post['id']}_{n}"} for post in media)
+    return fixtures
+
+
+def _split_fields(fields: str) -> List[str]:
+    """최상위 필드 이름만 추출 (owner{id,username} → owner, insights.metric(...) → insights)"""
+    names, depth, current = [], 0, ""
+    for ch in fields:
+        if ch in "{(":
+            depth += 1
+        elif ch in "})":
+            depth -= 1
+        if ch == "," and depth == 0:
+            names.append(current)
+            current = ""
+        else:
+            current += ch
+    names.append(current)
+    return [re.split(r"[{.(]", name.strip(), 1)[0] for name in names if name.strip()]
+
+
+class MockGraphAPI:
+    """
+    Graph API 로컬 mock (벤치마크 / 오프라인 개발용)
+    - /me/accounts, /ig_hashtag_search, /{hashtag}/recent_media|top_media, /{ig_user}/media (paging),
+      /{media}/insights, /{media}, ?ids= (필드 확장 포함), batch POST
+    - latency_ms(+jitter_ms): 응답마다 지연, throttle_rate: 해당 비율만큼 429(code 4) 응답
+    - usage_quota: 최근 60초 요청 수 / usage_quota 를 X-App-Usage / X-Business-Use-Case-Usage 로 전달
+    with 문으로 쓰면 임의 포트로 시작하고 끝나면 종료
+    """
+
+    def __init__(
+        self,
+        fixtures: Optional[List[Dict[str, Any]]] = None,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        throttle_rate: float = 0,
+        throttle_retry_after: int = 1,
+        usage_quota: int = 0,
+        accounts: int = 1,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.fixtures = load_fixtures() if fixtures is None else fixtures
+        self.media = {post["id"]: post for post in self.fixtures}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.throttle_retry_after = throttle_retry_after
+        self.usage_quota = usage_quota
+        self.accounts = [
+            {"id": f"page{i}", "name": f"Page {i}",
+             "instagram_business_account": {"id": f"ig{i}", "username": f"account{i}"}}
+            for i in range(max(1, accounts))
+        ]
+        self.counts: Counter = Counter()
+        self._calls: deque = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockGraphAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockGraphAPI":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def serve_forever(self) -> None:
+        """현재 스레드에서 실행 (CLI 용)"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def _count(self, endpoint: str) -> None:
+        with self._lock:
+            self.counts[endpoint] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    # ---- 사용량 / 지연 ----
+    def _record_call(self) -> float:
+        """요청 기록 후 최근 60초 사용률(%) 반환"""
+        now = time.monotonic()
+        with self._lock:
+            self._calls.append(now)
+            while self._calls and now - self._calls[0] > 60:
+                self._calls.popleft()
+            calls = len(self._calls)
+        return min(100.0, calls / self.usage_quota * 100) if self.usage_quota else 0.0
+
+    def _usage_headers(self, usage: float) -> Dict[str, str]:
+        if not self.usage_quota:
+            return {}
+        value = int(usage)
+        app = {"call_count": value, "total_time": value // 2, "total_cputime": value // 2}
+        business = {self.accounts[0]["instagram_business_account"]["id"]: [{
+            "type": "instagram", "call_count": value, "total_time": value // 2, "total_cputime": value // 2,
+            "estimated_time_to_regain_access": 0,
+        }]}
+        return {"X-App-Usage": json.dumps(app), "X-Business-Use-Case-Usage": json.dumps(business)}
+
+    def _sleep(self) -> None:
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    # ---- 라우팅 ----
+    def dispatch(self, method: str, path: str, query: Dict[str, str], form: Dict[str, str]) -> Tuple[int, Any]:
+        """요청 1건 → (status, body)"""
+        parts = [part for part in path.strip("/").split("/") if part]
+        if parts and _VERSION_RE.match(parts[0]):
+            parts = parts[1:]
+
+        if method == "POST" and not parts and "batch" in form:
+            self._count("batch")
+            return 200, self._batch(json.loads(form["batch"]))
+        if not parts and "ids" in query:
+            self._count("ids")
+            return self._ids(query["ids"].split(","), query.get("fields", "id"))
+        if parts == ["me", "accounts"]:
+            self._count("me/accounts")
+            return 200, self._page(self.accounts, query, path)
+        if parts == ["ig_hashtag_search"]:
+            self._count("ig_hashtag_search")
+            tag = query.get("q", "")
+            return 200, {"data": [{"id": str(17800000000000000 + zlib.crc32(tag.encode()))}]}
+        if len(parts) == 2 and parts[1] in ("recent_media", "top_media"):
+            self._count(parts[1])
+            return 200, self._page(self._hashtag_media(parts[0], parts[1]), query, path, query.get("fields"))
+        if len(parts) == 2 and parts[1] == "media":
+            self._count("media")
+            return 200, self._page(self.fixtures, query, path, query.get("fields"))
+        if len(parts) == 2 and parts[1] == "insights":
+            self._count("insights")
+            post = self.media.get(parts[0])
+            if post is None:
+                return 400, _error(f"Unsupported get request. Object with ID '{parts[0]}' does not exist", 100)
+            return 200, {"data": _insights(post, query.get("metric", ""))}
+        if len(parts) == 1:
+            self._count("node")
+            post = self.media.get(parts[0])
+            if post is None:
+                return 400, _error(f"Unsupported get request. Object with ID '{parts[0]}' does not exist", 100)
+            return 200, _select(post, query.get("fields", "id"))
+        return 404, _error(f"Unknown path components: /{'/'.join(parts)}", 2500)
+
+    def _page(self, items: List[Dict[str, Any]], query: Dict[str, str], path: str,
+              fields: Optional[str] = None) -> Dict[str, Any]:
+        limit = int(query.get("limit", 25))
+        offset = int(query.get("after", 0))
+        data = items[offset:offset + limit]
+        if fields:
+            data = [_select(item, fields) for item in data]
+        payload: Dict[str, Any] = {"data": data}
+        if offset + limit < len(items):
+            next_query = {**query, "after": offset + limit}
+            payload["paging"] = {
+                "cursors": {"after": str(offset + limit)},
+                "next": f"{self.base_url}{path}?{urlencode(next_query)}",
+            }
+        return payload
+
+    def _hashtag_media(self, hashtag_id: str, edge: str) -> List[Dict[str, Any]]:
+        """해시태그마다 고정 데이터 일부를 결정적으로 선택 (해시태그끼리 일부 겹침)"""
+        rng = random.Random(f"{hashtag_id}/{edge}")
+        count = min(len(self.fixtures), 150 if edge == "recent_media" else 50)
+        return rng.sample(self.fixtures, count)
+
+    def _ids(self, ids: List[str], fields: str) -> Tuple[int, Any]:
+        missing = [media_id for media_id in ids if media_id not in self.media]
+        if missing:
+            return 400, _error(f"Unsupported get request. Object with ID '{missing[0]}' does not exist", 100)
+        return 200, {media_id: _select(self.media[media_id], fields) for media_id in ids}
+
+    def _batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        responses = []
+        for sub in requests:
+            url = urlparse(sub.get("relative_url", ""))
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            status, body = self.dispatch(sub.get("method", "GET"), url.path, query, {})
+            responses.append({"code": status, "body": json.dumps(body)})
+        return responses
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # 헤더 / 본문을 나눠 쓸 때 지연(delayed ACK) 방지
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _respond(self, method: str) -> None:
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                form = {}
+                if method == "POST":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+
+                usage = mock._record_call()
+                mock._sleep()
+                headers = mock._usage_headers(usage)
+                if mock.throttle_rate and random.random() < mock.throttle_rate:
+                    mock._count("throttled")
+                    status, body = 429, _error("Application request limit reached", 4)
+                    headers["Retry-After"] = str(mock.throttle_retry_after)
+                else:
+                    status, body = mock.dispatch(method, url.path, query, form)
+
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self._respond("GET")
+
+            def do_POST(self) -> None:
+                self._respond("POST")
+
+        return Handler
+
+
+def _error(message: str, code: int) -> Dict[str, Any]:
+    return {"error": {"message": message, "type": "OAuthException", "code": code}}
+
+
+def _insights(post: Dict[str, Any], metrics: str) -> List[Dict[str, Any]]:
+    """요청한 metric 만 고정 데이터에서 골라 반환 (고정 데이터에 없는 metric 은 0)"""
+    stored = {item["name"]: item for item in post.get("insights") or [] if isinstance(item, dict)}
+    data = []
+    for name in filter(None, (metric.strip() for metric in metrics.split(","))):
+        data.append(stored.get(name) or {
+            "name": name, "period": "lifetime", "values": [{"value": 0}],
+            "id": f"{post['id']}/insights/{name}/lifetime",
+        })
+    return data
+
+
+def _select(post: Dict[str, Any], fields: str) -> Dict[str, Any]:
+    """fields 에 해당하는 최상위 필드만 반환 (insights.metric(...) 은 필드 확장으로 처리)"""
+    node: Dict[str, Any] = {"id": post["id"]}
+    for name in _split_fields(fields):
+        if name == "insights":
+            match = _INSIGHTS_FIELD_RE.search(fields)
+            node["insights"] = {"data": _insights(post, match.group(1) if match else "")}
+        elif name in post:
+            node[name] = post[name]
+    return node
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Serve a local mock of the Graph API endpoints used by this project")
+    parser.add_argument("--port", type=int, default=8765, help="포트 (기본: 8765)")
+    parser.add_argument("--scripts-dir", default=SCRIPTS_DIR, help="고정 데이터(JSON 덤프) 폴더")
+    parser.add_argument("--scale", type=int, default=1, help="고정 데이터를 N 배로 복제")
+    parser.add_argument("--latency", type=float, default=0, help="응답 지연(ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="추가 지연 최대값(ms, 균등 분포)")
+    parser.add_argument("--throttle", type=float, default=0, help="429 응답 비율 (0~1)")
+    parser.add_argument("--usage-quota", type=int, default=0, help="60초당 호출 한도 (지정하면 사용량 헤더 전송)")
+    parser.add_argument("--accounts", type=int, default=1, help="/me/accounts 에 연결할 계정 수")
+    args = parser.parse_args(argv)
+
+    mock = MockGraphAPI(
+        load_fixtures(args.scripts_dir, args.scale),
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        throttle_rate=args.throttle,
+        usage_quota=args.usage_quota,
+        accounts=args.accounts,
+        port=args.port,
+    )
+    logger.info(f"▶️ mock Graph API: {mock.base_url} (미디어 {len(mock.fixtures)}개) → GRAPH_API_BASE={mock.base_url}")
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
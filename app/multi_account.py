@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import logging
+import argparse
+import contextvars
+from . import config, graph_client
+from .metrics import start_from_env as start_metrics
+from . import rate_limiter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+from .jsonl_writer import JsonlWriter
+from .storage import DB_PATH, Storage
+from .user_id import get_linked_accounts
+from . import my_insight
+logger = logging.getLogger("multi_account")
+
+# 동시에 처리할 계정 수 (계정마다 insights 워커는 --workers 개씩 따로 사용)
+ACCOUNT_WORKERS = int(os.getenv("ACCOUNT_WORKERS", "4"))
+
+
+def account_partition(output_dir: str, ig_user_id: str) -> str:
+    """계정별 출력 폴더: <output_dir>/account=<ig_user_id>"""
+    path = os.path.join(output_dir, f"account={ig_user_id}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def crawl_account(
+    account: Dict[str, Any],
+    output_dir: str,
+    limit: int = 100,
+    insights: bool = True,
+    workers: int = my_insight.INSIGHT_WORKERS,
+    batch: bool = False,
+    db_path: Optional[str] = None,
+    filename: str = "media.jsonl",
+) -> Dict[str, Any]:
+    """
+    계정 하나의 미디어(+ insights) 수집 → 계정 폴더의 JSONL 로 입력 순서대로 스트리밍 저장
+    요청은 graph_client.account_scope 안에서 보내므로 계정별 rate 예산을 따로 사용
+    """
+    ig_user_id = account["ig_user_id"]
+    path = os.path.join(account_partition(output_dir, ig_user_id), filename)
+    start = time.time()
+
+    # 계정 스레드마다 별도 연결 (sqlite 연결은 스레드 간 공유 불가)
+    storage = Storage(db_path) if db_path else None
+    try:
+        with graph_client.account_scope(ig_user_id), JsonlWriter(path) as writer:
+            try:
+                posts = my_insight.fetch_user_media_all(limit, ig_user_id=ig_user_id)
+            except graph_client.IncompletePagination as e:
+                logger.warning(f"⚠️ 계정 {ig_user_id}: 미디어 목록 일부만 수집 ({len(e.partial)}개)")
+                posts = e.partial
+
+            def sink(post: Dict[str, Any]) -> None:
+                writer.write(post)
+                if storage:
+                    storage.add_media(post, ig_user_id)
+
+            if not insights:
+                for post in posts:
+                    sink(post)
+            elif batch:
+                my_insight.collect_insights_batch(posts, sink=sink)
+            else:
+                my_insight.collect_insights(posts, workers=workers, sink=sink)
+    finally:
+        if storage:
+            storage.close()
+
+    failed = sum(1 for post in posts if insights and not isinstance(post.get("insights"), list))
+    return {
+        "ig_user_id": ig_user_id,
+        "username": account.get("username"),
+        "media": len(posts),
+        "insights_failed": failed,
+        "elapsed_s": round(time.time() - start, 1),
+        "output": path,
+    }
+
+
+def crawl_accounts(
+    accounts: List[Dict[str, Any]],
+    output_dir: str,
+    account_workers: int = ACCOUNT_WORKERS,
+    **kwargs,
+) -> List[Dict[str, Any]]:
+    """
+    여러 계정을 스레드 풀로 동시에 수집 (계정 하나가 실패해도 나머지는 계속)
+    반환: 계정별 결과 요약 (실패한 계정은 "error" 포함)
+    """
+    # 계정 스레드 × 계정별 insights 워커가 같은 세션을 쓰므로 그만큼 keep-alive 연결을 둘 수 있게 풀 크기 조정
+    pool_size = max(1, account_workers) * max(1, kwargs.get("workers", my_insight.INSIGHT_WORKERS))
+    if pool_size > graph_client.HTTP_POOL_SIZE:
+        graph_client.configure(pool_size=pool_size)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, account_workers)) as pool:
+        futures = {
+            pool.submit(contextvars.copy_context().run, crawl_account, account, output_dir, **kwargs): account
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                result = future.result()
+                logger.info(
+                    f"✅ @{result['username'] or result['ig_user_id']}: 미디어 {result['media']}개, "
+                    f"{result['elapsed_s']}s"
+                )
+            except Exception as e:
+                logger.error(f"❌ 계정 {account['ig_user_id']} 수집 실패: {e}")
+                result = {"ig_user_id": account["ig_user_id"], "username": account.get("username"), "error": str(e)}
+            result["rate_limit"] = rate_limiter.get_limiter(account["ig_user_id"]).stats()
+            results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Crawl media and insights for every linked Instagram business account concurrently"
+    )
+    parser.add_argument(
+        "--accounts", nargs="+",
+        help="수집할 IG 비즈니스 계정 ID (생략 시 /me/accounts 에서 연결된 계정 전부 조회)"
+    )
+    parser.add_argument(
+        "--accounts-file",
+        help="user_id.py --all -o 로 저장한 계정 목록 JSON (조회 생략)"
+    )
+    parser.add_argument("--output-dir", "-o", help="출력 폴더 (계정별 하위 폴더 생성, 기본: env OUTPUT_DIR)")
+    parser.add_argument("--limit", "-n", type=int, default=100, help="미디어 목록 페이지 크기")
+    parser.add_argument("--account-workers", type=int, default=ACCOUNT_WORKERS, help="동시에 처리할 계정 수")
+    parser.add_argument("--workers", "-w", type=int, default=my_insight.INSIGHT_WORKERS, help="계정별 insights 동시 요청 수")
+    parser.add_argument("--batch", action="store_true", help="Graph API batch 요청으로 insights 수집")
+    parser.add_argument("--no-insights", action="store_true", help="미디어 목록만 수집")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite DB 경로 (지정하면 media / insight_snapshots 에 upsert)")
+    args = parser.parse_args(argv)
+
+    if not config.env("ACCESS_TOKEN"):
+        parser.error("환경변수 ACCESS_TOKEN을 설정해주세요.")
+
+    args.output_dir = args.output_dir or config.output_dir()
+    config.setup_logging(logger)
+    config.setup_logging(my_insight.logger, os.path.join(args.output_dir, "my_contents.log"))
+    start_metrics()  # METRICS_PORT / METRICS_SNAPSHOT 이 있으면 지표 노출
+
+    if args.accounts:
+        accounts = [{"ig_user_id": ig_user_id} for ig_user_id in args.accounts]
+    elif args.accounts_file:
+        with open(args.accounts_file, "r", encoding="utf-8") as f:
+            accounts = json.load(f)
+    else:
+        accounts = get_linked_accounts()
+    logger.info(f"▶️ 계정 {len(accounts)}개 수집 시작 (동시 {args.account_workers}개)")
+
+    results = crawl_accounts(
+        accounts,
+        args.output_dir,
+        account_workers=args.account_workers,
+        limit=args.limit,
+        insights=not args.no_insights,
+        workers=args.workers,
+        batch=args.batch,
+        db_path=args.db,
+    )
+
+    summary_path = os.path.join(args.output_dir, "accounts_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    failed = [r for r in results if "error" in r]
+    logger.info(
+        f"✅ 계정 {len(results) - len(failed)}/{len(results)}개 완료, "
+        f"미디어 {sum(r.get('media', 0) for r in results)}개 → {summary_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
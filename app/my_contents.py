@@ -4,86 +4,77 @@ import logging
 import json
 import time
 import requests
-from dotenv import load_dotenv
+from . import config, graph_client
+from .metrics import start_from_env as start_metrics
+from typing import Iterator, List, Optional
+from .jsonl_writer import JsonlWriter, is_jsonl_path, staging_path
+from .storage import DB_PATH, Storage
+from .change_tracker import ChangeTracker, describe
+from .media_sync import load_existing, merge_media, replace_streamed, sync_user_media
 
-# .env 파일 로드
-load_dotenv()
+DEFAULT_FIELD_PARAMS = "id,caption,permalink,media_type,timestamp,username"
 
-ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
-IG_USER_ID   = os.getenv("IG_USER_ID")
-FIELD_PARAMS = os.getenv(
-    "FIELD_PARAMS",
-    "id,caption,permalink,media_type,timestamp,username"
-)
-# 결과 저장 디렉터리
-OUTPUT_DIR = os.getenv(
-    "OUTPUT_DIR",
-    "C:\\Users\\Administrator\\Desktop\\git_pre\\instagram_api\\scripts")
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# 로거 설정
+# 로거 (파일 / 콘솔 핸들러는 CLI 실행 시 main() 에서 연결)
 logger = logging.getLogger("my_contents")
-logger.setLevel(logging.INFO)
-
-# 파일 핸들러
-fh = logging.FileHandler(os.path.join(OUTPUT_DIR, "my_contents.log"), encoding="utf-8")
-fh.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
-logger.addHandler(fh)
-# 콘솔 핸들러
-ch = logging.StreamHandler()
-ch.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
-logger.addHandler(ch)
 
 
-def fetch_user_media_all(limit: int = 25) -> list[dict]:
+def iter_user_media_pages(limit: int = 25) -> Iterator[list[dict]]:
     """
-    내 비즈니스 계정의 모든 미디어를 페이징 처리하며 순차적으로 가져옵니다.
+    내 비즈니스 계정의 미디어를 한 페이지씩 yield 합니다.
     - limit: 한 페이지당 최대 개수
+    - 재시도 후에도 실패하면 RequestException 을 그대로 올림 (끝까지 못 받았음을 호출 측이 알 수 있게)
     """
-    base_url = f"https://graph.facebook.com/v23.0/{IG_USER_ID}/media"
+    base_url = graph_client.graph_url(f"{config.env('IG_USER_ID')}/media")
     params = {
-        "fields": FIELD_PARAMS,
-        "access_token": ACCESS_TOKEN,
+        "fields": config.env("FIELD_PARAMS", DEFAULT_FIELD_PARAMS),
+        "access_token": config.env("ACCESS_TOKEN"),
         "limit": limit,
     }
 
-    all_posts = []
+    total = 0
     next_url = base_url
     next_params = params
 
     while next_url:
-        for attempt in range(3):  # 간단한 재시도 로직
-            start = time.time()
-            try:
-                resp = requests.get(next_url, params=next_params, timeout=10)
-                resp.raise_for_status()
-                break
-            except requests.RequestException as e:
-                logger.warning(f"요청 에러, 재시도 {attempt+1}/3: {e}")
-                time.sleep(2 ** attempt)
-        else:
-            logger.error("3번 재시도 후에도 실패하여 중단합니다.")
-            return all_posts
+        start = time.time()
+        try:  # 재시도는 graph_client 공통 정책으로 처리
+            resp = graph_client.get(next_url, params=next_params)
+        except requests.RequestException as e:
+            logger.error(f"재시도 후에도 실패하여 중단합니다: {graph_client.redact(str(e))}")
+            raise
 
         elapsed = int((time.time() - start) * 1000)
         payload = resp.json()
         data = payload.get("data", [])
-        all_posts.extend(data)
+        total += len(data)
 
         logger.info(
             f"페이지 요청 완료: status={resp.status_code}, "
-            f"time={elapsed}ms, count_this_page={len(data)}, total={len(all_posts)}"
+            f"time={elapsed}ms, count_this_page={len(data)}, total={total}"
         )
+        yield data
 
         paging = payload.get("paging", {})
         next_url = paging.get("next")
         next_params = None  # next_url에 이미 쿼리가 포함되어 있음
 
+
+def fetch_user_media_all(limit: int = 25) -> list[dict]:
+    """
+    내 비즈니스 계정의 모든 미디어를 페이징 처리하며 순차적으로 가져옵니다.
+    - limit: 한 페이지당 최대 개수
+    - 중간에 실패하면 graph_client.IncompletePagination (받은 만큼은 e.partial)
+    """
+    all_posts = []
+    try:
+        for page in iter_user_media_pages(limit):
+            all_posts.extend(page)
+    except requests.RequestException as e:
+        raise graph_client.IncompletePagination(all_posts, e) from e
     return all_posts
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(
         description="Fetch all Instagram business account media with pagination"
     )
@@ -95,21 +86,117 @@ if __name__ == "__main__":
     parser.add_argument(
         "--output", "-o",
         default="all_user_media.json",
-        help="저장할 JSON 파일명"
+        help="저장할 파일명 (.jsonl / .jsonl.gz 이면 페이지마다 바로 기록)"
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--incremental", "-i", action="store_true",
+        help="지난 실행 이후 새 미디어만 수집해서 기존 파일에 병합 (중단 시 이어서 진행)"
+    )
+    parser.add_argument(
+        "--state",
+        help="증분 동기화 상태 파일명 (기본: <output>.sync.json)"
+    )
+    parser.add_argument(
+        "--db",
+        default=DB_PATH,
+        help="SQLite DB 경로 (지정하면 수집 결과를 DB 에도 upsert, 기본: env DB_PATH)"
+    )
+    args = parser.parse_args(argv)
 
-    if not ACCESS_TOKEN or not IG_USER_ID:
+    access_token = config.env("ACCESS_TOKEN")
+    ig_user_id = config.env("IG_USER_ID")
+    field_params = config.env("FIELD_PARAMS", DEFAULT_FIELD_PARAMS)
+    if not access_token or not ig_user_id:
         parser.error("환경변수 ACCESS_TOKEN 및 IG_USER_ID를 설정해주세요.")
 
-    logger.info(f"▶️ 페이징(limit={args.limit}) 시작…")
-    posts = fetch_user_media_all(args.limit)
-    logger.info(f"✅ 총 {len(posts)}개 게시물 수집 완료.")
+    output_dir = config.output_dir()
+    config.setup_logging(logger, os.path.join(output_dir, "my_contents.log"))
+    start_metrics()  # METRICS_PORT / METRICS_SNAPSHOT 이 있으면 지표 노출
 
-    output_path = os.path.join(OUTPUT_DIR, args.output)
-    try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(posts, f, ensure_ascii=False, indent=2)
-        logger.info(f"✅ '{output_path}' 에 저장 완료.")
-    except Exception as e:
-        logger.error(f"❌ JSON 저장 중 오류 발생: {e}")
+    output_path = os.path.join(output_dir, args.output)
+    state_path = os.path.join(
+        output_dir, args.state or f"{os.path.splitext(args.output)[0]}.sync.json"
+    )
+
+    # DB 저장소 (지정한 경우만, 페이지/새 게시물 단위로 upsert)
+    storage = Storage(args.db) if args.db else None
+    # 미디어별 내용 해시 → 새 / 변경 / 삭제 델타 기록 (exporter 가 델타만 반영)
+    tracker = ChangeTracker(output_path)
+
+    if is_jsonl_path(output_path):
+        # JSONL: 도착하는 대로 한 줄씩 기록
+        # 증분 모드는 기존 파일과 id 기준으로 병합(최신순, 새 데이터 우선)해서 임시 파일에 쓴 뒤 교체
+        if args.incremental:
+            new_posts = sync_user_media(ig_user_id, field_params, access_token, state_path, args.limit)
+            if new_posts:
+                posts = merge_media(new_posts, load_existing(output_path))
+                tmp_path = staging_path(output_path)
+                with JsonlWriter(tmp_path) as writer:
+                    writer.write_many(posts)
+                os.replace(tmp_path, output_path)
+            if storage:
+                storage.add_media_many(new_posts, ig_user_id)
+            tracker.observe_many(new_posts)
+            logger.info(describe(tracker.finish(complete=False)))
+            logger.info(f"✅ 새 게시물 {len(new_posts)}개를 '{output_path}' 에 병합.")
+        else:
+            logger.info(f"▶️ 페이징(limit={args.limit}) 시작… (스트리밍 저장)")
+            # 임시 파일에 스트리밍 → 끝까지 받았으면 교체, 중간에 끊겼으면 기존 파일과 병합 후 교체
+            complete = True
+            tmp_path = staging_path(output_path)
+            with JsonlWriter(tmp_path) as writer:
+                try:
+                    for page in iter_user_media_pages(args.limit):
+                        writer.write_many(page)
+                        tracker.observe_many(page)
+                        if storage:
+                            storage.add_media_many(page, ig_user_id)
+                except requests.RequestException:
+                    complete = False  # 못 받은 페이지의 미디어를 삭제로 기록하지 않음
+            replace_streamed(tmp_path, output_path, complete)
+            logger.info(describe(tracker.finish(complete=complete)))
+            if complete:
+                logger.info(f"✅ 총 {writer.count}개 게시물 '{output_path}' 에 저장 완료.")
+            else:
+                logger.info(f"⚠️ 받은 {writer.count}개 게시물만 '{output_path}' 에 병합.")
+    else:
+        complete = True
+        if args.incremental:
+            new_posts = sync_user_media(ig_user_id, field_params, access_token, state_path, args.limit)
+            posts = merge_media(new_posts, load_existing(output_path))
+            logger.info(f"✅ 새 게시물 {len(new_posts)}개 병합, 총 {len(posts)}개.")
+        else:
+            logger.info(f"▶️ 페이징(limit={args.limit}) 시작…")
+            try:
+                posts = fetch_user_media_all(args.limit)
+            except graph_client.IncompletePagination as e:
+                posts, complete = e.partial, False
+            new_posts = posts
+            logger.info(f"✅ 총 {len(posts)}개 게시물 수집 완료.")
+        if storage:
+            storage.add_media_many(new_posts, ig_user_id)
+
+        tracker.observe_many(posts)
+        if not complete:
+            # 일부만 받았으면 기존 파일을 덮어쓰지 않고 받은 만큼만 병합, 삭제 판정도 하지 않음
+            posts = merge_media(posts, load_existing(output_path))
+        if tracker.unchanged(complete) and os.path.exists(output_path):
+            logger.info(f"✅ 바뀐 게시물이 없어 '{output_path}' 를 다시 쓰지 않음.")
+            tracker.finish(complete=complete)
+        else:
+            try:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    json.dump(posts, f, ensure_ascii=False, indent=2)
+                logger.info(f"✅ '{output_path}' 에 저장 완료.")
+                # 파일에 반영된 뒤에만 해시 / 델타 갱신
+                logger.info(describe(tracker.finish(complete=complete)))
+            except Exception as e:
+                logger.error(f"❌ JSON 저장 중 오류 발생: {e}")
+
+    if storage:
+        storage.close()
+        logger.info(f"🗄️ DB '{args.db}' upsert 완료.")
+
+
+if __name__ == "__main__":
+    main()
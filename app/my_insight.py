@@ -4,60 +4,59 @@ import logging
 import json
 import time
 import requests
-from dotenv import load_dotenv
-from typing import List, Dict, Any
-from tqdm import tqdm   # 진행바 라이브러리
+import contextvars
+from . import config, graph_client
+from .metrics import start_from_env as start_metrics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Any, Optional
+from .media_sync import load_existing, merge_media, replace_streamed, sync_user_media
+from .graph_batch import BATCH_LIMIT, batch_get, relative_url
+from .field_expansion import expand_insights
+from .change_tracker import ChangeTracker, describe
+from .dead_letter import DeadLetterStore, is_failed, merge_into_dataset, record_results
+from .insights_cache import InsightsCache
+from .jsonl_writer import JsonlWriter, is_jsonl_path, staging_path
+from .media_reader import iter_media
+from .storage import DB_PATH, Storage
 
-# .env 파일 로드
-load_dotenv()
+# insights 동시 요청 수 / 워커별 추가 요청 간격(초)
+# 요청 속도는 graph_client 의 공유 rate limiter 가 사용량 헤더에 맞춰 조절하므로
+# INSIGHT_DELAY 는 기본 0 (고정 간격이 필요할 때만 지정)
+INSIGHT_WORKERS = int(os.getenv("INSIGHT_WORKERS", "4"))
+INSIGHT_DELAY   = float(os.getenv("INSIGHT_DELAY", "0"))
 
-ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
-IG_USER_ID   = os.getenv("IG_USER_ID")
-FIELD_PARAMS = os.getenv("FIELD_PARAMS")
+# 미디어 목록 필드 (insights 지표 선택에 media_type / media_product_type 필요)
+DEFAULT_FIELD_PARAMS = "id,caption,permalink,media_type,media_product_type,timestamp,username"
 
-# metrics를 env에서 읽고 없으면 기본값 사용
-INSIGHT_METRICS       = os.getenv("INSIGHT_METRICS")
-INSIGHT_METRICS_STORY = os.getenv("INSIGHT_METRICS_STORY")
-INSIGHT_METRICS_REELS = os.getenv("INSIGHT_METRICS_REELS")
-INSIGHT_METRICS_VIDEO = os.getenv("INSIGHT_METRICS_VIDEO")
-
-OUTPUT_DIR = os.getenv("OUTPUT_DIR")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# 로거 설정
+# 로거 (파일 / 콘솔 핸들러는 CLI 실행 시 main() 에서 연결)
 logger = logging.getLogger("ig_contents")
-logger.setLevel(logging.INFO)
-fh = logging.FileHandler(os.path.join(OUTPUT_DIR, "my_contents.log"), encoding="utf-8")
-fh.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
-logger.addHandler(fh)
-ch = logging.StreamHandler()
-ch.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
-logger.addHandler(ch)
 
 
 def get_metrics_for_post(post: dict) -> str:
-    """미디어 타입에 따라 metrics 세트 반환"""
+    """미디어 타입에 따라 metrics 세트 반환 (env INSIGHT_METRICS*)"""
     mtype = post.get("media_type")
     product = post.get("media_product_type")
 
     if product == "STORY":
-        return INSIGHT_METRICS_STORY
+        return config.env("INSIGHT_METRICS_STORY")
     elif product == "REELS":
-        return INSIGHT_METRICS_REELS
+        return config.env("INSIGHT_METRICS_REELS")
     elif mtype == "VIDEO":
-        return INSIGHT_METRICS_VIDEO
+        return config.env("INSIGHT_METRICS_VIDEO")
     else:  # IMAGE, CAROUSEL_ALBUM 등
-        return INSIGHT_METRICS
+        return config.env("INSIGHT_METRICS")
 
 
-def fetch_user_media_all(limit: int = 100) -> List[Dict[str, Any]]:
+def fetch_user_media_all(limit: int = 100, ig_user_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Instagram 비즈니스 계정의 모든 미디어를 페이징 처리하며 가져오기
+    - ig_user_id: 다른 계정을 조회할 때 지정 (기본: env IG_USER_ID)
+    - 중간에 실패하면 graph_client.IncompletePagination (받은 만큼은 e.partial)
     """
-    base_url = f"https://graph.facebook.com/v23.0/{IG_USER_ID}/media"
+    base_url = graph_client.graph_url(f"{ig_user_id or config.env('IG_USER_ID')}/media")
     params = {
-        "fields": FIELD_PARAMS,
-        "access_token": ACCESS_TOKEN,
+        "fields": config.env("FIELD_PARAMS", DEFAULT_FIELD_PARAMS),
+        "access_token": config.env("ACCESS_TOKEN"),
         "limit": limit,
     }
 
@@ -65,26 +64,11 @@ def fetch_user_media_all(limit: int = 100) -> List[Dict[str, Any]]:
     next_url, next_params = base_url, params
 
     while next_url:
-        for attempt in range(3):
-            try:
-                if next_params:
-                    resp = requests.get(next_url, params=next_params, timeout=10)
-                else:
-                    resp = requests.get(next_url, timeout=10)
-
-                if resp.status_code == 429:
-                    logger.warning("⚠️ Rate limit 초과 → 60초 대기 후 재시도")
-                    time.sleep(60)
-                    continue
-
-                resp.raise_for_status()
-                break
-            except requests.RequestException as e:
-                logger.warning(f"요청 에러, 재시도 {attempt+1}/3: {e}")
-                time.sleep(2 ** attempt)
-        else:
-            logger.error("3번 재시도 후에도 실패 → 중단")
-            return all_posts
+        try:  # 429 / 5xx 재시도는 graph_client 공통 정책으로 처리
+            resp = graph_client.get(next_url, params=next_params)
+        except requests.RequestException as e:
+            logger.error(f"재시도 후에도 실패 → 중단: {graph_client.redact(str(e))}")
+            raise graph_client.IncompletePagination(all_posts, e) from e
 
         payload = resp.json()
         data = payload.get("data", [])
@@ -103,49 +87,449 @@ def fetch_insights(media_id: str, metrics: str) -> dict:
     """
     특정 미디어의 insights 데이터 가져오기
     """
-    url = f"https://graph.facebook.com/v23.0/{media_id}/insights"
-    params = {"metric": metrics, "access_token": ACCESS_TOKEN}
+    url = graph_client.graph_url(f"{media_id}/insights")
+    params = {"metric": metrics, "access_token": config.env("ACCESS_TOKEN")}
     try:
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
+        resp = graph_client.get(url, params=params)
         return resp.json()
     except requests.RequestException as e:
-        logger.error(f"❌ insights 요청 실패 (media_id={media_id}): {e}")
-        return {"error": str(e)}
+        # 오류 본문(code / subcode) 을 남겨야 dead-letter 가 호출 한도 오류를 재시도 대상으로 분류
+        error = graph_client.error_info(e)
+        logger.error(f"❌ insights 요청 실패 (media_id={media_id}): {error}")
+        return {"error": error}
 
 
-if __name__ == "__main__":
+class _InOrderSink:
+    """
+    완료 순서와 관계없이 posts 입력 순서대로 sink 에 전달 (앞쪽이 모두 끝난 만큼만)
+    pending 에 없는 미디어(캐시 재사용분)는 처음부터 완료로 처리
+    """
+
+    def __init__(
+        self,
+        posts: List[Dict[str, Any]],
+        sink: Optional[Callable[[Dict[str, Any]], None]],
+        pending: List[Dict[str, Any]],
+    ):
+        self._posts = posts
+        self._sink = sink
+        self._index = {id(post): i for i, post in enumerate(posts)}
+        self._done = [False] * len(posts)
+        self._next = 0
+        pending_ids = {id(post) for post in pending}
+        for post in posts:
+            if id(post) not in pending_ids:
+                self.done(post)
+
+    def done(self, post: Dict[str, Any]) -> None:
+        if self._sink is None:
+            return
+        self._done[self._index[id(post)]] = True
+        while self._next < len(self._posts) and self._done[self._next]:
+            self._sink(self._posts[self._next])
+            self._next += 1
+
+
+def apply_cached_insights(
+    posts: List[Dict[str, Any]],
+    cache: Optional[InsightsCache],
+) -> List[Dict[str, Any]]:
+    """
+    캐시가 아직 유효한 미디어는 저장된 insights 를 붙이고,
+    새로 조회해야 하는 미디어 목록만 반환
+    """
+    if cache is None:
+        return posts
+    pending = []
+    for post in posts:
+        cached = cache.get(post, get_metrics_for_post(post))
+        if cached is None:
+            pending.append(post)
+        else:
+            post["insights"] = cached
+    logger.info(f"🗃️ insights 캐시: {len(posts) - len(pending)}개 재사용, {len(pending)}개 조회 필요")
+    return pending
+
+
+def collect_insights(
+    posts: List[Dict[str, Any]],
+    workers: int = INSIGHT_WORKERS,
+    delay: float = INSIGHT_DELAY,
+    cache: Optional[InsightsCache] = None,
+    sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    여러 미디어의 insights를 스레드 풀로 동시에 수집
+    - workers: 동시에 보낼 최대 요청 수
+    - delay: 워커별 요청 후 추가 대기 시간(초), 기본 0 (속도는 rate limiter 가 조절)
+    - cache: 주어지면 재조회 간격이 지나지 않은 미디어는 요청 생략
+    - sink: 주어지면 완성된 미디어를 입력 순서대로 바로 전달 (스트리밍 저장용)
+    결과는 입력 posts 순서 그대로 반환
+    """
+    from tqdm import tqdm  # 진행바 (CLI 수집 때만 필요하므로 지연 import)
+
+    def attach(post: Dict[str, Any]) -> Dict[str, Any]:
+        metrics = get_metrics_for_post(post)
+        insights = fetch_insights(post["id"], metrics)
+        post["insights"] = insights.get("data", insights.get("error"))
+        if cache is not None:
+            cache.put(post, metrics, insights.get("data"))
+        if delay > 0:
+            time.sleep(delay)
+        return post
+
+    pending = apply_cached_insights(posts, cache)
+    ordered = _InOrderSink(posts, sink, pending)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, \
+            tqdm(total=len(pending), desc="📊 미디어 insights 수집", unit="media") as bar:
+        # 작업마다 현재 context 복사 → graph_client.account_scope 가 워커 스레드에도 적용
+        futures = [pool.submit(contextvars.copy_context().run, attach, post) for post in pending]
+        for future in as_completed(futures):
+            ordered.done(future.result())
+            bar.update(1)
+            elapsed = time.time() - start
+            bar.set_postfix(throughput=f"{bar.n / elapsed:.1f} media/s" if elapsed else "-")
+
+    elapsed = time.time() - start
+    if pending and elapsed > 0:
+        logger.info(
+            f"⚡ insights {len(pending)}개 수집: {elapsed:.1f}s, "
+            f"{len(pending) / elapsed:.2f} media/s (workers={workers})"
+        )
+    return posts
+
+
+def collect_insights_batch(
+    posts: List[Dict[str, Any]],
+    cache: Optional[InsightsCache] = None,
+    sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Graph API batch 요청으로 insights 수집 (요청 1회에 최대 BATCH_LIMIT 개 미디어)
+    실패한 미디어는 개별적으로 오류 정보(graph_client.error_info() 모양)가 insights 에 들어감
+    sink 가 주어지면 batch 응답이 올 때마다 입력 순서대로 전달
+    """
+    from tqdm import tqdm
+
+    pending = apply_cached_insights(posts, cache)
+    ordered = _InOrderSink(posts, sink, pending)
+    access_token = config.env("ACCESS_TOKEN")
+
+    start = time.time()
+    with tqdm(total=len(pending), desc="📊 미디어 insights 수집(batch)", unit="media") as bar:
+        for i in range(0, len(pending), BATCH_LIMIT):
+            chunk = pending[i:i + BATCH_LIMIT]
+            metrics_list = [get_metrics_for_post(post) for post in chunk]
+            urls = [
+                relative_url(f"{post['id']}/insights", {"metric": metrics})
+                for post, metrics in zip(chunk, metrics_list)
+            ]
+            for post, metrics, insights in zip(chunk, metrics_list, batch_get(urls, access_token)):
+                if "error" in insights:
+                    logger.error(f"❌ insights 요청 실패 (media_id={post['id']}): {insights['error']}")
+                post["insights"] = insights.get("data", insights.get("error"))
+                if cache is not None:
+                    cache.put(post, metrics, insights.get("data"))
+                ordered.done(post)
+            bar.update(len(chunk))
+            elapsed = time.time() - start
+            bar.set_postfix(throughput=f"{bar.n / elapsed:.1f} media/s" if elapsed else "-")
+
+    elapsed = time.time() - start
+    if pending and elapsed > 0:
+        logger.info(
+            f"⚡ insights {len(pending)}개 batch 수집: {elapsed:.1f}s, "
+            f"{len(pending) / elapsed:.2f} media/s"
+        )
+    return posts
+
+
+def collect_insights_expanded(
+    posts: List[Dict[str, Any]],
+    cache: Optional[InsightsCache] = None,
+    sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    metrics 세트(미디어 타입)별로 묶어 insights 를 필드 확장으로 수집 (요청 1회에 최대 IDS_LIMIT 개 미디어)
+    필드 확장이 실패한 미디어만 fetch_insights() 로 개별 조회
+    """
+    from tqdm import tqdm
+
+    pending = apply_cached_insights(posts, cache)
+    ordered = _InOrderSink(posts, sink, pending)
+
+    def done(post: Dict[str, Any], metrics: Optional[str], insights: Dict[str, Any]) -> None:
+        if "error" in insights:
+            logger.error(f"❌ insights 요청 실패 (media_id={post['id']}): {insights['error']}")
+        post["insights"] = insights.get("data", insights.get("error"))
+        if cache is not None:
+            cache.put(post, metrics, insights.get("data"))
+        ordered.done(post)
+        bar.update(1)
+
+    start = time.time()
+    with tqdm(total=len(pending), desc="📊 미디어 insights 수집(필드 확장)", unit="media") as bar:
+        stats = expand_insights(
+            pending,
+            get_metrics_for_post,
+            config.env("ACCESS_TOKEN"),
+            fallback=lambda post, metrics: fetch_insights(post["id"], metrics),
+            on_done=done,
+        )
+
+    elapsed = time.time() - start
+    if pending and elapsed > 0:
+        logger.info(
+            f"⚡ insights {len(pending)}개 필드 확장 수집: {elapsed:.1f}s, "
+            f"요청 {stats['requests']}회 + 개별 {stats['fallback']}회"
+        )
+    return posts
+
+
+def retry_dead_letters(
+    store: DeadLetterStore,
+    collect: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+    include_permanent: bool = False,
+    ignore_schedule: bool = False,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    dead-letter 에 기록된 미디어만 다시 수집 (미디어 목록 페이징 / 기본 정보 조회 없이 insights 요청만)
+    - 재시도 간격(지수 백오프)이 지난 항목만 대상, 영구 오류(4xx)는 include_permanent 일 때만
+    - 성공한 미디어는 기록에서 제거, 실패하면 시도 횟수 증가
+    반환: {"recovered": {media_id: insights}, "failed": [미디어]}
+    """
+    entries = store.due(include_permanent=include_permanent, ignore_schedule=ignore_schedule)
+    posts = [
+        {key: entry[key] for key in ("media_type", "media_product_type", "timestamp") if entry.get(key)}
+        | {"id": entry["media_id"]}
+        for entry in entries
+    ]
+    logger.info(f"♻️ dead-letter {len(store)}개 중 {len(posts)}개 재시도")
+    collect(posts)
+    record_results(store, posts, get_metrics_for_post)
+    return {
+        "recovered": {post["id"]: post["insights"] for post in posts if not is_failed(post)},
+        "failed": [post for post in posts if is_failed(post)],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(
         description="Fetch all Instagram business account media with insights"
     )
     parser.add_argument(
         "--output", "-o",
         default="all_user_media_with_insights.json",
-        help="저장할 JSON 파일명"
+        help="저장할 파일명 (.jsonl / .jsonl.gz 이면 insights 가 도착하는 대로 기록, .igarc 면 압축 아카이브)"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int, default=INSIGHT_WORKERS,
+        help=f"insights 동시 요청 수 (기본: {INSIGHT_WORKERS})"
+    )
+    parser.add_argument(
+        "--delay",
+        type=float, default=INSIGHT_DELAY,
+        help=f"워커별 요청 간격(초) (기본: {INSIGHT_DELAY})"
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help=f"Graph API batch 요청으로 insights 수집 (요청당 최대 {BATCH_LIMIT}개)"
+    )
+    parser.add_argument(
+        "--expand", action="store_true",
+        help="미디어 타입별로 묶어 insights 를 필드 확장으로 수집 (실패한 미디어만 개별 요청)"
+    )
+    parser.add_argument(
+        "--incremental", "-i", action="store_true",
+        help="지난 실행 이후 새 미디어만 페이징해서 기존 파일의 미디어 목록에 병합"
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--state",
+        help="증분 동기화 상태 파일명 (기본: <output>.sync.json)"
+    )
+    parser.add_argument(
+        "--cache",
+        default="insights_cache.json",
+        help="insights 캐시 파일명 (기본: insights_cache.json)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="insights 캐시를 사용하지 않고 모두 새로 조회"
+    )
+    parser.add_argument(
+        "--force-refresh", action="store_true",
+        help="캐시 유효 기간과 관계없이 모두 새로 조회해서 캐시 갱신"
+    )
+    parser.add_argument(
+        "--db",
+        default=DB_PATH,
+        help="SQLite DB 경로 (지정하면 수집 결과를 DB 에도 upsert, 기본: env DB_PATH)"
+    )
+    parser.add_argument(
+        "--dead-letter",
+        help="insights 수집 실패 기록 파일명 (기본: <output>.failed.json)"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true",
+        help="dead-letter 에 기록된 미디어만 재시도해서 성공분을 --output 파일에 병합"
+    )
+    parser.add_argument(
+        "--include-permanent", action="store_true",
+        help="--retry-failed 시 4xx(지원하지 않는 지표 등) 실패도 재시도"
+    )
+    parser.add_argument(
+        "--now", action="store_true",
+        help="--retry-failed 시 백오프 간격을 기다리지 않고 바로 재시도"
+    )
+    args = parser.parse_args(argv)
 
-    if not ACCESS_TOKEN or not IG_USER_ID:
+    access_token = config.env("ACCESS_TOKEN")
+    ig_user_id = config.env("IG_USER_ID")
+    if not access_token or not ig_user_id:
         parser.error("환경변수 ACCESS_TOKEN 및 IG_USER_ID를 설정해주세요.")
 
-    logger.info("▶️ 전체 미디어 수집 시작…")
-    posts = fetch_user_media_all()
-    logger.info(f"✅ 총 {len(posts)}개 미디어 수집 완료")
+    output_dir = config.output_dir()
+    config.setup_logging(logger, os.path.join(output_dir, "my_contents.log"))
+    start_metrics()  # METRICS_PORT / METRICS_SNAPSHOT 이 있으면 지표 노출
 
-    # 각 미디어 insights 붙이기 (진행바 출력)
-    results = []
-    for post in tqdm(posts, desc="📊 미디어 insights 수집", unit="media"):
-        metrics = get_metrics_for_post(post)
-        insights = fetch_insights(post["id"], metrics)
-        post["insights"] = insights.get("data", insights.get("error"))
-        results.append(post)
-        time.sleep(0.3)  # rate limit 방지
+    # 워커 수만큼 keep-alive 연결을 재사용할 수 있도록 풀 크기 조정
+    if args.workers > graph_client.HTTP_POOL_SIZE:
+        graph_client.configure(pool_size=args.workers)
+
+    output_path = os.path.join(output_dir, args.output)
+    dead_letter = DeadLetterStore(os.path.join(
+        output_dir, args.dead_letter or f"{os.path.splitext(args.output)[0]}.failed.json"
+    ))
 
-    # JSON 저장
-    output_path = os.path.join(OUTPUT_DIR, args.output)
+    def collect(posts: List[Dict[str, Any]], cache=None, sink=None) -> List[Dict[str, Any]]:
+        if args.expand:
+            return collect_insights_expanded(posts, cache=cache, sink=sink)
+        if args.batch:
+            return collect_insights_batch(posts, cache=cache, sink=sink)
+        return collect_insights(posts, workers=args.workers, delay=args.delay, cache=cache, sink=sink)
+
+    # 게시물 나이에 따라 재조회 간격을 두는 insights 캐시
+    cache = None
+    if not args.no_cache:
+        cache = InsightsCache(os.path.join(output_dir, args.cache), force_refresh=args.force_refresh)
+
+    if args.retry_failed:
+        storage = Storage(args.db) if args.db else None
+        try:
+            # 재시도 성공분도 캐시에 저장 → 다음 일반 실행에서 다시 요청하지 않음
+            retried = retry_dead_letters(
+                dead_letter,
+                lambda posts: collect(posts, cache=cache, sink=storage.add_insights if storage else None),
+                include_permanent=args.include_permanent,
+                ignore_schedule=args.now,
+            )
+        finally:
+            if storage:
+                storage.close()
+            if cache is not None:
+                cache.save()
+            dead_letter.save()
+        merged = merge_into_dataset(output_path, retried["recovered"])
+        logger.info(
+            f"♻️ 재시도 성공 {len(retried['recovered'])}개 ('{output_path}' 에 {merged}개 병합), "
+            f"실패 {len(retried['failed'])}개 → dead-letter {dead_letter.stats()}"
+        )
+        if merged:
+            tracker = ChangeTracker(output_path)
+            tracker.observe_many(iter_media(output_path))
+            logger.info(describe(tracker.finish()))
+        raise SystemExit(0)
+
+    complete = True  # 미디어 목록을 끝까지 받았는지 (아니면 삭제 판정 안 함)
+    if args.incremental:
+        state_path = os.path.join(
+            output_dir, args.state or f"{os.path.splitext(args.output)[0]}.sync.json"
+        )
+        new_posts = sync_user_media(
+            ig_user_id, config.env("FIELD_PARAMS", DEFAULT_FIELD_PARAMS), access_token, state_path
+        )
+        posts = merge_media(new_posts, load_existing(output_path))
+        logger.info(f"✅ 새 미디어 {len(new_posts)}개 병합, 총 {len(posts)}개")
+    else:
+        logger.info("▶️ 전체 미디어 수집 시작…")
+        try:
+            posts = fetch_user_media_all()
+        except graph_client.IncompletePagination as e:
+            posts, complete = e.partial, False
+        logger.info(f"✅ 총 {len(posts)}개 미디어 수집 완료")
+
+    # JSONL 출력 / DB 저장이면 완성된 미디어를 바로 기록
+    # JSONL 은 임시 파일에 쓰고 수집이 끝난 뒤 교체 (도중에 중단돼도 기존 데이터셋은 그대로)
+    tmp_path = staging_path(output_path)
+    writer = JsonlWriter(tmp_path) if is_jsonl_path(output_path) else None
+    storage = Storage(args.db) if args.db else None
+
+    def sink(post: Dict[str, Any]) -> None:
+        if writer:
+            writer.write(post)
+        if storage:
+            # 캐시 재사용분은 원래 조회 시각으로 스냅샷 기록 → 가짜 "새" 스냅샷이 쌓이지 않음
+            cached_at = cache.fetched_at(post, get_metrics_for_post(post)) if cache is not None else None
+            storage.add_media(post, ig_user_id, insights_fetched_at=(
+                time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(cached_at)) if cached_at else None
+            ))
+
+    # 각 미디어 insights 붙이기 (동시 수집 또는 batch 수집 + 진행바 출력)
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-        logger.info(f"💾 '{output_path}' 저장 완료")
-    except Exception as e:
-        logger.error(f"❌ JSON 저장 오류: {e}")
+        results = collect(posts, cache=cache, sink=sink)
+        # 실패한 미디어는 dead-letter 에 기록 → --retry-failed 로 그 미디어만 재시도
+        failed = record_results(dead_letter, results, get_metrics_for_post)
+        dead_letter.save()
+        if failed:
+            logger.warning(f"⚠️ insights 실패 {failed}개 → '{dead_letter.path}' (재시도: --retry-failed)")
+    except BaseException:
+        if writer:
+            writer.close()
+            os.remove(tmp_path)  # 중단된 수집분은 버리고 기존 파일 유지
+        raise
+    finally:
+        if writer:
+            writer.close()
+        if storage:
+            storage.close()
+            logger.info(f"🗄️ DB '{args.db}' upsert 완료")
+        if cache is not None:
+            cache.save()
+            logger.info(f"🗃️ insights 캐시 통계: {cache.stats()}")
+
+    # 미디어별 내용 해시 → 새 / 변경 / 삭제 델타 기록 (exporter 가 델타만 반영)
+    tracker = ChangeTracker(output_path)
+    tracker.observe_many(results)
+    if not complete and not writer:
+        # 일부만 받았으면 기존 파일을 덮어쓰지 않고 받은 만큼만 병합 (JSONL 은 replace_streamed 에서 병합)
+        results = merge_media(results, load_existing(output_path))
+    if writer:
+        replace_streamed(tmp_path, output_path, complete)
+        if complete:
+            logger.info(f"💾 '{output_path}' 에 {writer.count}개 스트리밍 저장 완료")
+        else:
+            logger.info(f"💾 받은 {writer.count}개만 '{output_path}' 에 병합")
+    elif tracker.unchanged(complete) and os.path.exists(output_path):
+        logger.info(f"💾 바뀐 미디어가 없어 '{output_path}' 를 다시 쓰지 않음")
+    elif output_path.endswith(".igarc"):
+        # 지표 정의는 한 번만, 값은 정수 배열로 저장하는 압축 아카이브 (insights_archive)
+        from .insights_archive import write_archive
+        write_archive(output_path, results, meta={"fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")})
+        logger.info(f"💾 '{output_path}' 아카이브 저장 완료 ({os.path.getsize(output_path):,} bytes)")
+    else:
+        # JSON 저장
+        try:
+            with open(output_path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            logger.info(f"💾 '{output_path}' 저장 완료")
+        except Exception as e:
+            logger.error(f"❌ JSON 저장 오류: {e}")
+            return  # 파일에 반영되지 않았으므로 해시 / 델타도 갱신하지 않음
+    logger.info(describe(tracker.finish(complete=complete)))
+
+
+if __name__ == "__main__":
+    main()
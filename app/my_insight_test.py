@@ -1,38 +1,23 @@
 import os
+import argparse
 import logging
 import json
-import time
 import requests
-from dotenv import load_dotenv
-from tqdm import tqdm
-
-# .env 파일 로드
-load_dotenv()
-
-ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
-FIELD_PARAMS = os.getenv("FIELD_PARAMS")
-
-# metrics
-INSIGHT_METRICS       = os.getenv("INSIGHT_METRICS")
-INSIGHT_METRICS_STORY = os.getenv("INSIGHT_METRICS_STORY")
-INSIGHT_METRICS_REELS = os.getenv("INSIGHT_METRICS_REELS")
-INSIGHT_METRICS_VIDEO = os.getenv("INSIGHT_METRICS_VIDEO")
-
-OUTPUT_DIR = os.getenv("OUTPUT_DIR")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+from typing import List, Optional
+from . import config, graph_client
+from .metrics import start_from_env as start_metrics
+from .graph_batch import BATCH_LIMIT, batch_get, relative_url
+from .field_expansion import IDS_LIMIT, expand_insights, fetch_nodes
+from .dead_letter import is_failed
+from .jsonl_writer import JsonlWriter, is_jsonl_path
+from .media_reader import iter_media
+from .storage import DB_PATH, Storage
 
 INPUT_FILE = "scripts/all_user_media_with_insights_copy.json"   # 📌 고정 경로
 OUTPUT_FILE = "retry_media_with_insights.json"                 # 결과 파일명 고정
 
-# 로거 설정
+# 로거 (파일 / 콘솔 핸들러는 CLI 실행 시 main() 에서 연결)
 logger = logging.getLogger("ig_contents")
-logger.setLevel(logging.INFO)
-fh = logging.FileHandler(os.path.join(OUTPUT_DIR, "retry_media.log"), encoding="utf-8")
-fh.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
-logger.addHandler(fh)
-ch = logging.StreamHandler()
-ch.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
-logger.addHandler(ch)
 
 
 def get_metrics_for_post(post: dict) -> str:
@@ -41,64 +26,212 @@ def get_metrics_for_post(post: dict) -> str:
     product = post.get("media_product_type")
 
     if product == "STORY":
-        return INSIGHT_METRICS_STORY
+        return config.env("INSIGHT_METRICS_STORY")
     elif product == "REELS":
-        return INSIGHT_METRICS_REELS
+        return config.env("INSIGHT_METRICS_REELS")
     elif mtype == "VIDEO":
-        return INSIGHT_METRICS_VIDEO
+        return config.env("INSIGHT_METRICS_VIDEO")
     else:
-        return INSIGHT_METRICS
+        return config.env("INSIGHT_METRICS")
 
 
 def fetch_post_info(media_id: str) -> dict:
     """특정 media_id 기본 정보 조회"""
-    url = f"https://graph.facebook.com/v23.0/{media_id}"
-    params = {"fields": FIELD_PARAMS, "access_token": ACCESS_TOKEN}
-    resp = requests.get(url, params=params)
-    resp.raise_for_status()
+    url = graph_client.graph_url(media_id)
+    params = {"fields": config.env("FIELD_PARAMS"), "access_token": config.env("ACCESS_TOKEN")}
+    resp = graph_client.get(url, params=params)
     return resp.json()
 
 
 def fetch_insights(media_id: str, metrics: str) -> dict:
     """특정 미디어 insights 조회"""
-    url = f"https://graph.facebook.com/v23.0/{media_id}/insights"
-    params = {"metric": metrics, "access_token": ACCESS_TOKEN}
+    url = graph_client.graph_url(f"{media_id}/insights")
+    params = {"metric": metrics, "access_token": config.env("ACCESS_TOKEN")}
     try:
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
+        resp = graph_client.get(url, params=params)
         return resp.json()
     except requests.RequestException as e:
-        logger.error(f"❌ insights 요청 실패 (media_id={media_id}): {e}")
-        return {"error": str(e)}
+        # 오류 본문(code / subcode) 을 남겨야 dead-letter 가 호출 한도 오류를 재시도 대상으로 분류
+        error = graph_client.error_info(e)
+        logger.error(f"❌ insights 요청 실패 (media_id={media_id}): {error}")
+        return {"error": error}
 
 
-if __name__ == "__main__":
-    if not ACCESS_TOKEN:
-        raise SystemExit("환경변수 ACCESS_TOKEN을 설정해주세요.")
+def retry_batch(media_ids: list, sink=None) -> list:
+    """
+    batch 요청으로 재시도: 기본 정보 batch 1회 + insights batch 1회 (BATCH_LIMIT 개 단위)
+    sink 가 주어지면 batch 응답이 올 때마다 결과를 바로 전달
+    """
+    from tqdm import tqdm  # 진행바 (CLI 수집 때만 필요하므로 지연 import)
 
-    # 📌 JSON에서 media_id 목록 불러오기
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    access_token, field_params = config.env("ACCESS_TOKEN"), config.env("FIELD_PARAMS")
+    results = []
+    with tqdm(total=len(media_ids), desc="📊 미디어 insights 재시도(batch)", unit="media") as bar:
+        for i in range(0, len(media_ids), BATCH_LIMIT):
+            chunk = media_ids[i:i + BATCH_LIMIT]
+            infos = batch_get([relative_url(mid, {"fields": field_params}) for mid in chunk], access_token)
+
+            # 기본 정보 조회에 성공한 미디어만 insights 요청
+            ok = [(mid, info) for mid, info in zip(chunk, infos) if "error" not in info]
+            urls = [relative_url(f"{mid}/insights", {"metric": get_metrics_for_post(info)}) for mid, info in ok]
+            insights_by_id = dict(zip([mid for mid, _ in ok], batch_get(urls, access_token)))
+
+            for mid, info in zip(chunk, infos):
+                if "error" in info:
+                    logger.error(f"❌ {mid} 처리 실패: {info['error']}")
+                    info = {"id": mid, "insights": {"error": info["error"]}}
+                    results.append(info)
+                    if sink:
+                        sink(info)
+                    continue
+                insights = insights_by_id[mid]
+                if "error" in insights:
+                    logger.error(f"❌ insights 요청 실패 (media_id={mid}): {insights['error']}")
+                info["insights"] = insights.get("data", insights.get("error"))
+                results.append(info)
+                if sink:
+                    sink(info)
+            bar.update(len(chunk))
+    return results
+
+
+def retry_expanded(media_ids: list, sink=None) -> list:
+    """
+    ?ids= 조회로 재시도: 기본 정보 1회 + insights 필드 확장(미디어 타입별) 1회 (IDS_LIMIT 개 단위)
+    필드 확장이 실패한 미디어만 개별 insights 요청
+    """
+    from tqdm import tqdm
+
+    access_token, field_params = config.env("ACCESS_TOKEN"), config.env("FIELD_PARAMS")
+    results = []
+    with tqdm(total=len(media_ids), desc="📊 미디어 insights 재시도(필드 확장)", unit="media") as bar:
+        for i in range(0, len(media_ids), IDS_LIMIT):
+            chunk = media_ids[i:i + IDS_LIMIT]
+            try:
+                nodes = fetch_nodes(chunk, field_params, access_token)
+            except requests.RequestException as e:
+                # 없는 id 가 섞이면 묶음 전체가 실패 → 이 묶음만 개별 조회
+                logger.warning(f"⚠️ 기본 정보 묶음 조회 실패, 개별 조회로 전환: {e}")
+                nodes = {}
+                for mid in chunk:
+                    try:
+                        nodes[mid] = fetch_post_info(mid)
+                    except requests.RequestException as err:
+                        logger.error(f"❌ {mid} 처리 실패: {err}")
+
+            infos, ok = [], []
+            for mid in chunk:
+                info = nodes.get(mid)
+                if info is None:
+                    info = {"id": mid, "insights": {"error": "기본 정보 조회 실패"}}
+                else:
+                    ok.append(info)
+                infos.append(info)
+
+            def done(info: dict, metrics, insights: dict) -> None:
+                info["insights"] = insights.get("data", insights.get("error"))
+
+            expand_insights(
+                ok, get_metrics_for_post, access_token,
+                fallback=lambda info, metrics: fetch_insights(info["id"], metrics),
+                on_done=done,
+            )
+            for info in infos:
+                results.append(info)
+                if sink:
+                    sink(info)
+            bar.update(len(chunk))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Retry fetching insights for failed media ids in INPUT_FILE")
+    parser.add_argument(
+        "--batch", action="store_true",
+        help=f"Graph API batch 요청으로 재시도 (요청당 최대 {BATCH_LIMIT}개)"
+    )
+    parser.add_argument(
+        "--expand", action="store_true",
+        help=f"?ids= 조회 + insights 필드 확장으로 재시도 (요청당 최대 {IDS_LIMIT}개)"
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="insights 수집에 실패한 미디어뿐 아니라 INPUT_FILE 의 모든 media_id 재조회"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        default=OUTPUT_FILE,
+        help="저장할 파일명 (.jsonl / .jsonl.gz 이면 결과가 나오는 대로 기록)"
+    )
+    parser.add_argument(
+        "--db",
+        default=DB_PATH,
+        help="SQLite DB 경로 (지정하면 재시도 결과를 DB 에 바로 upsert → 수동 병합 불필요, 기본: env DB_PATH)"
+    )
+    args = parser.parse_args(argv)
+
+    if not config.env("ACCESS_TOKEN"):
+        raise SystemExit("환경변수 ACCESS_TOKEN을 설정해주세요.")
 
-    media_ids = [item["id"] for item in data if "id" in item]
-    logger.info(f"📂 파일에서 {len(media_ids)}개 media_id 로드 완료")
+    from tqdm import tqdm
+
+    output_dir = config.output_dir()
+    config.setup_logging(logger, os.path.join(output_dir, "retry_media.log"))
+    start_metrics()  # METRICS_PORT / METRICS_SNAPSHOT 이 있으면 지표 노출
+
+    # 📌 JSON에서 insights 가 없거나 오류인 media_id 만 불러오기 (레코드를 한 건씩 읽음)
+    total, media_ids = 0, []
+    for item in iter_media(INPUT_FILE):
+        if "id" not in item:
+            continue
+        total += 1
+        if args.all or is_failed(item):
+            media_ids.append(item["id"])
+    logger.info(f"📂 파일의 media_id {total}개 중 {len(media_ids)}개 재조회 대상")
+
+    output_path = os.path.join(output_dir, args.output)
+    # JSONL 출력이면 결과를 바로 기록, 아니면 끝에 한 번에 저장
+    writer = JsonlWriter(output_path) if is_jsonl_path(output_path) else None
+    storage = Storage(args.db) if args.db else None
+
+    def sink(post_info: dict) -> None:
+        if writer:
+            writer.write(post_info)
+        if storage and "insights" in post_info and isinstance(post_info["insights"], list):
+            storage.add_media(post_info)
 
     results = []
-    for mid in tqdm(media_ids, desc="📊 미디어 insights 재시도", unit="media"):
-        try:
-            post_info = fetch_post_info(mid)
-            metrics = get_metrics_for_post(post_info)
-            insights = fetch_insights(mid, metrics)
-            post_info["insights"] = insights.get("data", insights.get("error"))
-            results.append(post_info)
-            time.sleep(0.3)  # rate limit 방지
-        except Exception as e:
-            logger.error(f"❌ {mid} 처리 실패: {e}")
-            results.append({"id": mid, "insights": {"error": str(e)}})
+    try:
+        if args.expand:
+            results = retry_expanded(media_ids, sink=sink)
+        elif args.batch:
+            results = retry_batch(media_ids, sink=sink)
+        else:
+            for mid in tqdm(media_ids, desc="📊 미디어 insights 재시도", unit="media"):
+                try:
+                    post_info = fetch_post_info(mid)
+                    metrics = get_metrics_for_post(post_info)
+                    insights = fetch_insights(mid, metrics)
+                    post_info["insights"] = insights.get("data", insights.get("error"))
+                except Exception as e:
+                    logger.error(f"❌ {mid} 처리 실패: {e}")
+                    post_info = {"id": mid, "insights": {"error": graph_client.redact(str(e))}}
+                results.append(post_info)  # 요청 속도는 graph_client rate limiter 가 조절
+                if sink:
+                    sink(post_info)
+    finally:
+        if writer:
+            writer.close()
+        if storage:
+            storage.close()
 
     # 📌 결과 저장
-    output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    if not writer:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
 
     logger.info(f"💾 '{output_path}' 저장 완료")
+
+
+if __name__ == "__main__":
+    main()
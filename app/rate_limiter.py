@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Iterable, Mapping, Optional
+
+# 초당 요청 수 범위 / 시작값
+RATE_LIMIT_MAX_RPS   = float(os.getenv("RATE_LIMIT_MAX_RPS", "20"))
+RATE_LIMIT_MIN_RPS   = float(os.getenv("RATE_LIMIT_MIN_RPS", "0.2"))
+RATE_LIMIT_START_RPS = float(os.getenv("RATE_LIMIT_START_RPS", "5"))
+# 사용률(%) 기준: LOW 미만이면 가속, LOW~CAP 사이는 감속, CAP 이상이면 일시 정지
+RATE_LIMIT_LOW_USAGE = float(os.getenv("RATE_LIMIT_LOW_USAGE", "50"))
+RATE_LIMIT_CAP_USAGE = float(os.getenv("RATE_LIMIT_CAP_USAGE", "90"))
+# 한도 초과 시 최소 정지 시간(초)
+RATE_LIMIT_COOLDOWN  = float(os.getenv("RATE_LIMIT_COOLDOWN", "60"))
+
+logger = logging.getLogger("rate_limiter")
+
+# 사용량 헤더 종류: app = X-App-Usage (앱 전체), business = X-Business-Use-Case-Usage (계정별)
+USAGE_SOURCES = ("app", "business")
+
+
+def parse_usage_headers(headers: Mapping[str, str], sources: Iterable[str] = USAGE_SOURCES) -> Optional[dict]:
+    """
+    Graph API 사용량 헤더에서 최대 사용률(%)과 접근 회복까지 남은 시간(초) 추출
+    - X-App-Usage: {"call_count": 28, "total_time": 25, "total_cputime": 25}
+    - X-Business-Use-Case-Usage: {"<id>": [{"type": ..., "call_count": ..., ...,
+                                           "estimated_time_to_regain_access": 분}]}
+    - sources: 볼 헤더 종류 (기본: 둘 다)
+    사용량 헤더가 없으면 None
+    """
+    usages = []
+    regain_seconds = 0.0
+
+    app_usage = headers.get("X-App-Usage") if "app" in sources else None
+    if app_usage:
+        try:
+            usages.append(json.loads(app_usage))
+        except ValueError:
+            logger.debug(f"X-App-Usage 파싱 실패: {app_usage}")
+
+    buc_usage = headers.get("X-Business-Use-Case-Usage") if "business" in sources else None
+    if buc_usage:
+        try:
+            for entries in json.loads(buc_usage).values():
+                for entry in entries:
+                    usages.append(entry)
+                    regain_seconds = max(
+                        regain_seconds,
+                        float(entry.get("estimated_time_to_regain_access") or 0) * 60,
+                    )
+        except (ValueError, AttributeError, TypeError):
+            logger.debug(f"X-Business-Use-Case-Usage 파싱 실패: {buc_usage}")
+
+    if not usages:
+        return None
+
+    usage = max(
+        float(u.get(key) or 0)
+        for u in usages
+        for key in ("call_count", "total_time", "total_cputime")
+    )
+    return {"usage": usage, "regain_seconds": regain_seconds}
+
+
+class AdaptiveRateLimiter:
+    """
+    사용량 헤더에 따라 속도를 조절하는 토큰 버킷
+    - acquire(): 토큰이 생길 때까지 대기 (모든 워커 스레드가 공유)
+    - update(headers): 응답의 사용률로 초당 요청 수 재계산 (sources 에 해당하는 헤더만 반영)
+    - penalize(): 429 / 호출 한도 오류 시 감속 + 일시 정지
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_START_RPS,
+        min_rate: float = RATE_LIMIT_MIN_RPS,
+        max_rate: float = RATE_LIMIT_MAX_RPS,
+        low_usage: float = RATE_LIMIT_LOW_USAGE,
+        cap_usage: float = RATE_LIMIT_CAP_USAGE,
+        cooldown: float = RATE_LIMIT_COOLDOWN,
+        sources: Iterable[str] = USAGE_SOURCES,
+    ):
+        self.sources = tuple(sources)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.low_usage = low_usage
+        self.cap_usage = cap_usage
+        self.cooldown = cooldown
+        self.usage: Optional[float] = None
+        # 버스트는 1초 분량까지만 허용
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.rate)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> None:
+        """요청 1건 분량의 토큰을 얻을 때까지 대기"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def _pause(self, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self._tokens = 0.0
+            logger.warning(f"⏸️ 호출 한도 근접/초과 → {seconds:.0f}s 대기")
+
+    def update(self, headers: Mapping[str, str], sources: Optional[Iterable[str]] = None) -> None:
+        """응답 헤더의 사용률로 속도 조정 (사용량 헤더가 없으면 그대로 유지)"""
+        parsed = parse_usage_headers(headers, self.sources if sources is None else sources)
+        if parsed is None:
+            return
+
+        usage = parsed["usage"]
+        with self._lock:
+            self.usage = usage
+            if usage >= self.cap_usage:
+                self.rate = self.min_rate
+                self._pause(max(parsed["regain_seconds"], self.cooldown))
+                return
+
+            if usage <= self.low_usage:
+                target = self.max_rate
+            else:
+                ratio = (self.cap_usage - usage) / (self.cap_usage - self.low_usage)
+                target = max(self.min_rate, self.max_rate * ratio)
+
+            # 감속은 즉시, 가속은 단계적으로
+            if target < self.rate:
+                self.rate = target
+            else:
+                self.rate = min(target, self.rate * 1.5)
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """429 / 호출 한도 오류 응답: 속도 절반 + 일시 정지"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._pause(retry_after if retry_after else self.cooldown)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rate": round(self.rate, 3), "usage": self.usage}
+
+
+_limiter: Optional[AdaptiveRateLimiter] = None
+_account_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiter_lock = threading.Lock()
+
+
+def get_limiter(account: Optional[str] = None) -> AdaptiveRateLimiter:
+    """
+    limiter 반환 (최초 호출 시 생성)
+    - account 없음: 프로세스 전체에서 공유하는 앱 단위 limiter
+    - account 지정: 계정별 limiter (X-Business-Use-Case-Usage 만 반영 → 계정마다 별도 예산)
+    """
+    global _limiter
+    if account is None:
+        if _limiter is None:
+            with _limiter_lock:
+                if _limiter is None:
+                    _limiter = AdaptiveRateLimiter()
+        return _limiter
+
+    limiter = _account_limiters.get(account)
+    if limiter is None:
+        with _limiter_lock:
+            limiter = _account_limiters.get(account)
+            if limiter is None:
+                limiter = _account_limiters[account] = AdaptiveRateLimiter(sources=("business",))
+    return limiter
+
+
+def reset_limiters(**kwargs) -> None:
+    """
+    limiter 전부 초기화 (벤치마크 등에서 실행마다 같은 조건으로 시작할 때)
+    kwargs 가 있으면 그 설정으로 앱 단위 limiter 를 새로 생성
+    """
+    global _limiter
+    with _limiter_lock:
+        _limiter = AdaptiveRateLimiter(**kwargs) if kwargs else None
+        _account_limiters.clear()
+
+
+def account_stats() -> Dict[str, dict]:
+    """계정별 limiter 상태 {account: {"rate", "usage"}}"""
+    with _limiter_lock:
+        limiters = dict(_account_limiters)
+    return {account: limiter.stats() for account, limiter in limiters.items()}
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from .caption_index import CaptionIndex
+
+logger = logging.getLogger("storage")
+
+# 기본 DB 경로 (CLI 의 --db 가 없을 때 사용, 비어 있으면 DB 저장 안 함)
+DB_PATH = os.getenv("DB_PATH")
+
+# 버퍼에 모았다가 한 번에 upsert 할 레코드 수
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id                 TEXT PRIMARY KEY,
+    ig_user_id         TEXT,
+    username           TEXT,
+    caption            TEXT,
+    media_type         TEXT,
+    media_product_type TEXT,
+    permalink          TEXT,
+    media_url          TEXT,
+    timestamp          TEXT,
+    like_count         INTEGER,
+    comments_count     INTEGER,
+    raw                TEXT NOT NULL,
+    updated_at         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_media_timestamp  ON media(timestamp);
+CREATE INDEX IF NOT EXISTS idx_media_media_type ON media(media_type, media_product_type);
+
+CREATE TABLE IF NOT EXISTS insight_snapshots (
+    media_id   TEXT NOT NULL,
+    metric     TEXT NOT NULL,
+    value      NUMERIC,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (media_id, metric, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS idx_insight_fetched_at ON insight_snapshots(fetched_at);
+
+CREATE TABLE IF NOT EXISTS hashtag_posts (
+    hashtag_id    TEXT NOT NULL,
+    media_id      TEXT NOT NULL,
+    username      TEXT,
+    caption       TEXT,
+    media_type    TEXT,
+    permalink     TEXT,
+    timestamp     TEXT,
+    raw           TEXT NOT NULL,
+    first_seen_at TEXT NOT NULL,
+    last_seen_at  TEXT NOT NULL,
+    PRIMARY KEY (hashtag_id, media_id)
+);
+CREATE INDEX IF NOT EXISTS idx_hashtag_posts_timestamp  ON hashtag_posts(timestamp);
+CREATE INDEX IF NOT EXISTS idx_hashtag_posts_media_type ON hashtag_posts(media_type);
+"""
+
+UPSERT_MEDIA = """
+INSERT INTO media (id, ig_user_id, username, caption, media_type, media_product_type,
+                   permalink, media_url, timestamp, like_count, comments_count, raw, updated_at)
+VALUES (:id, :ig_user_id, :username, :caption, :media_type, :media_product_type,
+        :permalink, :media_url, :timestamp, :like_count, :comments_count, :raw, :updated_at)
+ON CONFLICT(id) DO UPDATE SET
+    ig_user_id         = COALESCE(excluded.ig_user_id, media.ig_user_id),
+    username           = COALESCE(excluded.username, media.username),
+    caption            = COALESCE(excluded.caption, media.caption),
+    media_type         = COALESCE(excluded.media_type, media.media_type),
+    media_product_type = COALESCE(excluded.media_product_type, media.media_product_type),
+    permalink          = COALESCE(excluded.permalink, media.permalink),
+    media_url          = COALESCE(excluded.media_url, media.media_url),
+    timestamp          = COALESCE(excluded.timestamp, media.timestamp),
+    like_count         = COALESCE(excluded.like_count, media.like_count),
+    comments_count     = COALESCE(excluded.comments_count, media.comments_count),
+    raw                = excluded.raw,
+    updated_at         = excluded.updated_at
+"""
+
+UPSERT_SNAPSHOT = """
+INSERT INTO insight_snapshots (media_id, metric, value, fetched_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(media_id, metric, fetched_at) DO UPDATE SET value = excluded.value
+"""
+
+UPSERT_HASHTAG_POST = """
+INSERT INTO hashtag_posts (hashtag_id, media_id, username, caption, media_type, permalink,
+                           timestamp, raw, first_seen_at, last_seen_at)
+VALUES (:hashtag_id, :media_id, :username, :caption, :media_type, :permalink,
+        :timestamp, :raw, :seen_at, :seen_at)
+ON CONFLICT(hashtag_id, media_id) DO UPDATE SET
+    username     = excluded.username,
+    caption      = excluded.caption,
+    media_type   = excluded.media_type,
+    permalink    = excluded.permalink,
+    timestamp    = excluded.timestamp,
+    raw          = excluded.raw,
+    last_seen_at = excluded.last_seen_at
+"""
+
+
+def now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+
+def _username(post: Dict[str, Any]) -> Optional[str]:
+    owner = post.get("owner")
+    if post.get("username"):
+        return post["username"]
+    return owner.get("username") if isinstance(owner, dict) else None
+
+
+def _media_row(post: Dict[str, Any], ig_user_id: Optional[str], updated_at: str) -> Dict[str, Any]:
+    raw = {k: v for k, v in post.items() if k != "insights"}
+    return {
+        "id": post["id"],
+        "ig_user_id": ig_user_id,
+        "username": _username(post),
+        "caption": post.get("caption"),
+        "media_type": post.get("media_type"),
+        "media_product_type": post.get("media_product_type"),
+        "permalink": post.get("permalink"),
+        "media_url": post.get("media_url"),
+        "timestamp": post.get("timestamp"),
+        "like_count": post.get("like_count"),
+        "comments_count": post.get("comments_count"),
+        "raw": json.dumps(raw, ensure_ascii=False),
+        "updated_at": updated_at,
+    }
+
+
+def _insight_rows(post: Dict[str, Any], fetched_at: str) -> List[tuple]:
+    """insights 목록 → (media_id, metric, value, fetched_at) 행, 오류 응답이면 빈 목록"""
+    insights = post.get("insights")
+    if not isinstance(insights, list):
+        return []
+    rows = []
+    for insight in insights:
+        if not isinstance(insight, dict) or not insight.get("name"):
+            continue
+        values = insight.get("values")
+        value = values[0].get("value", 0) if values and isinstance(values, list) else 0
+        if not isinstance(value, (int, float)):
+            value = json.dumps(value, ensure_ascii=False)
+        rows.append((post["id"], insight["name"], value, fetched_at))
+    return rows
+
+
+class Storage:
+    """
+    SQLite(WAL 모드) 저장소: media / insight_snapshots / hashtag_posts
+    - add_media(): 버퍼에 모았다가 BATCH_SIZE 마다 executemany 로 한 번에 upsert
+    - insights 가 붙은 미디어는 지표별 스냅샷(fetched_at) 으로 누적 → 시계열 조회 가능
+    - flush 때 같은 트랜잭션에서 캡션 검색 색인(caption_index) 도 갱신
+    같은 연결을 여러 스레드에서 쓰지 않도록 호출은 한 스레드에서만 할 것
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.index = CaptionIndex(self.conn)
+        self._media: List[Dict[str, Any]] = []
+        self._snapshots: List[tuple] = []
+        self._hashtag_posts: List[Dict[str, Any]] = []
+
+    # ---- 버퍼 적재 ----
+    def add_media(self, post: Dict[str, Any], ig_user_id: Optional[str] = None,
+                  fetched_at: Optional[str] = None, insights_fetched_at: Optional[str] = None) -> None:
+        """
+        미디어 1건 (insights 가 있으면 스냅샷도 함께) 적재
+        insights_fetched_at: 캐시에서 재사용한 insights 의 실제 조회 시각 (없으면 fetched_at)
+        """
+        stamp = fetched_at or now_iso()
+        self._media.append(_media_row(post, ig_user_id, stamp))
+        self._snapshots.extend(_insight_rows(post, insights_fetched_at or stamp))
+        if len(self._media) >= self.batch_size:
+            self.flush()
+
+    def add_media_many(self, posts: Iterable[Dict[str, Any]], ig_user_id: Optional[str] = None) -> None:
+        stamp = now_iso()
+        for post in posts:
+            self.add_media(post, ig_user_id, stamp)
+
+    def add_insights(self, post: Dict[str, Any], fetched_at: Optional[str] = None) -> None:
+        """insights 스냅샷만 적재 (media 행은 그대로, dead-letter 재시도용)"""
+        self._snapshots.extend(_insight_rows(post, fetched_at or now_iso()))
+        if len(self._snapshots) >= self.batch_size:
+            self.flush()
+
+    def add_hashtag_posts(self, hashtag_id: str, posts: Iterable[Dict[str, Any]]) -> None:
+        stamp = now_iso()
+        for post in posts:
+            self._hashtag_posts.append({
+                "hashtag_id": hashtag_id,
+                "media_id": post["id"],
+                "username": _username(post),
+                "caption": post.get("caption"),
+                "media_type": post.get("media_type"),
+                "permalink": post.get("permalink"),
+                "timestamp": post.get("timestamp"),
+                "raw": json.dumps(post, ensure_ascii=False),
+                "seen_at": stamp,
+            })
+        if len(self._hashtag_posts) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """버퍼를 트랜잭션 하나로 기록"""
+        if not (self._media or self._snapshots or self._hashtag_posts):
+            return
+        with self.conn:
+            if self._media:
+                self.conn.executemany(UPSERT_MEDIA, self._media)
+            if self._snapshots:
+                self.conn.executemany(UPSERT_SNAPSHOT, self._snapshots)
+            if self._hashtag_posts:
+                self.conn.executemany(UPSERT_HASHTAG_POST, self._hashtag_posts)
+            self.index.add("media", (
+                {**row, "media_id": row["id"]} for row in self._media
+            ))
+            self.index.add("hashtag", self._hashtag_posts)
+        logger.debug(
+            f"DB 저장: media={len(self._media)}, snapshots={len(self._snapshots)}, "
+            f"hashtag_posts={len(self._hashtag_posts)}"
+        )
+        self._media.clear()
+        self._snapshots.clear()
+        self._hashtag_posts.clear()
+
+    # ---- 조회 ----
+    def latest_insights(self, media_id: str) -> Dict[str, Any]:
+        """미디어의 지표별 가장 최근 값"""
+        rows = self.conn.execute(
+            """
+            SELECT metric, value FROM insight_snapshots AS s
+            WHERE media_id = ? AND fetched_at = (
+                SELECT MAX(fetched_at) FROM insight_snapshots
+                WHERE media_id = s.media_id AND metric = s.metric
+            )
+            """,
+            (media_id,),
+        ).fetchall()
+        return dict(rows)
+
+    def insight_series(self, media_id: str, metric: str) -> List[tuple]:
+        """(fetched_at, value) 시계열"""
+        return self.conn.execute(
+            "SELECT fetched_at, value FROM insight_snapshots "
+            "WHERE media_id = ? AND metric = ? ORDER BY fetched_at",
+            (media_id, metric),
+        ).fetchall()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self) -> "Storage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,38 +1,70 @@
-import os
-import requests
 import json
-from dotenv import load_dotenv
+import argparse
+from . import config, graph_client
+from typing import Any, Dict, Iterator, List, Optional
 
-load_dotenv()
+# 페이지 목록과 연결된 Instagram 비즈니스 계정을 한 번에 받는 필드 확장
+ACCOUNT_FIELDS = "id,name,instagram_business_account{id,username}"
+
+
+def iter_linked_accounts(page_limit: int = 100) -> Iterator[Dict[str, Any]]:
+    """
+    /me/accounts 를 paging.next 따라 끝까지 조회하면서
+    Instagram 비즈니스 계정이 연결된 페이지만 yield
+    → {"page_id", "page_name", "ig_user_id", "username"}
+    """
+    url = graph_client.graph_url("me/accounts")
+    params = {"fields": ACCOUNT_FIELDS, "limit": page_limit, "access_token": config.env("ACCESS_TOKEN")}
+    while url:
+        payload = graph_client.get(url, params=params).json()
+        for page in payload.get("data", []):
+            ig_account = page.get("instagram_business_account") or {}
+            if not ig_account.get("id"):
+                continue
+            yield {
+                "page_id": page["id"],
+                "page_name": page.get("name"),
+                "ig_user_id": ig_account["id"],
+                "username": ig_account.get("username"),
+            }
+        url = payload.get("paging", {}).get("next")
+        params = None  # next URL 에 쿼리가 이미 포함됨
+
+
+def get_linked_accounts() -> List[Dict[str, Any]]:
+    """토큰으로 관리하는 모든 Instagram 비즈니스 계정 (같은 계정이 여러 페이지에 연결돼도 한 번만)"""
+    accounts = {}
+    for account in iter_linked_accounts():
+        accounts.setdefault(account["ig_user_id"], account)
+    return list(accounts.values())
 
-ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 
 def get_ig_user_id():
-    # 1. 내 페이지 리스트 가져오기
-    url = f"https://graph.facebook.com/v23.0/me/accounts"
-    resp = requests.get(url, params={"access_token": ACCESS_TOKEN})
-    resp.raise_for_status()
-    pages = resp.json().get("data", [])
-    if not pages:
-        raise RuntimeError("❌ 연결된 Facebook Page가 없습니다.")
-    
-    page_id = pages[0]["id"]  # 첫 번째 페이지 사용
-    print("✅ Facebook Page ID:", page_id)
-
-    # 2. Instagram 비즈니스 계정 ID 가져오기
-    url = f"https://graph.facebook.com/v23.0/{page_id}"
-    params = {
-        "fields": "instagram_business_account",
-        "access_token": ACCESS_TOKEN
-    }
-    resp = requests.get(url, params=params)
-    resp.raise_for_status()
-    ig_account = resp.json().get("instagram_business_account", {})
-    ig_user_id = ig_account.get("id")
-    if not ig_user_id:
-        raise RuntimeError("❌ 이 페이지에 연결된 Instagram 비즈니스 계정이 없습니다.")
-    return ig_user_id
+    """첫 번째로 연결된 Instagram 비즈니스 계정 ID (단일 계정용)"""
+    for account in iter_linked_accounts():
+        print("✅ Facebook Page ID:", account["page_id"])
+        return account["ig_user_id"]
+    raise RuntimeError("❌ Instagram 비즈니스 계정이 연결된 Facebook Page가 없습니다.")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Discover Instagram business accounts linked to the token")
+    parser.add_argument("--all", "-a", action="store_true", help="연결된 모든 계정 출력")
+    parser.add_argument("--output", "-o", help="계정 목록을 JSON 으로 저장할 경로 (--all 과 함께)")
+    args = parser.parse_args(argv)
+
+    if not args.all:
+        ig_user_id = get_ig_user_id()
+        print("✅ Instagram User ID:", ig_user_id)
+    else:
+        accounts = get_linked_accounts()
+        for account in accounts:
+            print(f"✅ {account['ig_user_id']}  @{account['username']}  (page: {account['page_name']})")
+        print(f"총 {len(accounts)}개 계정")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(accounts, f, ensure_ascii=False, indent=2)
+
 
 if __name__ == "__main__":
-    ig_user_id = get_ig_user_id()
-    print("✅ Instagram User ID:", ig_user_id)
+    main()
@@ -0,0 +1,28 @@
+import pytest
+
+from app import graph_client, rate_limiter
+from app.mock_graph import MockGraphAPI, load_fixtures
+
+FIXTURES = load_fixtures()[:120]
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """mock 서버 + graph_client 를 mock 으로 연결 (limiter 는 빠르게 고정, 한도 초과 정지 없음)"""
+    monkeypatch.setenv("ACCESS_TOKEN", "test-token")
+    monkeypatch.setenv("IG_USER_ID", "ig0")
+    monkeypatch.setenv("INSIGHT_METRICS", "reach,likes,comments")
+    monkeypatch.setattr(graph_client, "HTTP_MAX_RETRIES", 2)
+    rate_limiter.reset_limiters(rate=1000, min_rate=1000, max_rate=1000, cooldown=0)
+
+    def start(**kwargs) -> MockGraphAPI:
+        mock = MockGraphAPI(FIXTURES, **kwargs).start()
+        monkeypatch.setattr(graph_client, "GRAPH_API_BASE", mock.base_url)
+        servers.append(mock)
+        return mock
+
+    servers = []
+    yield start
+    for mock in servers:
+        mock.stop()
+    rate_limiter.reset_limiters()
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+import requests
+
+from app import graph_client
+from app.jobs import JobManager
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """API 앱 (import 시 만들어지는 crawler.log / 해시태그 ID 캐시가 저장소에 남지 않도록 임시 폴더에서)"""
+    monkeypatch.chdir(tmp_path)
+    from fastapi.testclient import TestClient
+    from app import main
+    return TestClient(main.app)
+
+
+def test_graph_error_detail_hides_access_token(mock_api, client, monkeypatch):
+    mock = mock_api()
+    monkeypatch.setenv("ACCESS_TOKEN", "SECRET123")
+    monkeypatch.setattr(graph_client, "GRAPH_API_BASE", f"{mock.base_url}/missing")  # 모든 요청 404
+    resp = client.get("/hashtags/tokenleak/id")
+
+    assert resp.status_code == 502
+    assert "access_token=***" in resp.json()["detail"]
+    assert "SECRET123" not in resp.text
+
+
+def test_failed_job_error_hides_access_token():
+    def fail(job):
+        raise requests.HTTPError("404 Client Error: Not Found for url: http://graph/v19.0/x?access_token=SECRET123")
+
+    async def run():
+        manager = JobManager(1)
+        job = manager.submit("test", {}, fail)
+        while not job.finished:
+            await asyncio.sleep(0.01)
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == "failed"
+    assert "SECRET123" not in job.error
+
+
+def test_hashtag_crawl_requires_at_least_one_tag(client):
+    resp = client.post("/jobs/hashtag-crawl", json={"hashtags": []})
+
+    assert resp.status_code == 422
@@ -0,0 +1,49 @@
+import copy
+import json
+
+from app import my_insight, my_insight_test
+from app.insights_archive import read_archive, write_archive
+from app.js_to_csv import flatten_insights
+
+from .conftest import FIXTURES
+
+
+def failed_dataset():
+    """앞 6개 중 1, 4 번째 미디어의 insights 가 오류(error_info dict) 인 데이터셋"""
+    error = my_insight.fetch_insights("does-not-exist", "reach")["error"]
+    posts = copy.deepcopy(FIXTURES[:6])
+    for post in (posts[1], posts[4]):
+        post["insights"] = error
+    return posts
+
+
+def test_dict_errors_are_read_as_failed_rows(mock_api, tmp_path):
+    mock_api()
+    posts = failed_dataset()
+    columns = flatten_insights(posts)
+
+    assert columns["id"] == [post["id"] for post in posts]
+    assert columns["reach"][1] == columns["reach"][4] == 0
+    assert columns["reach"][0] == FIXTURES[0]["insights"][0]["values"][0]["value"]
+
+    path = str(tmp_path / "media.igarc")
+    write_archive(path, posts)
+    assert list(read_archive(path)) == posts
+
+
+def test_retry_insights_refetches_only_failed_ids(mock_api, monkeypatch, tmp_path):
+    mock = mock_api()
+    posts = failed_dataset()
+    before = mock.stats()["insights"]
+    input_path = tmp_path / "media.json"
+    input_path.write_text(json.dumps(posts), encoding="utf-8")
+    monkeypatch.setattr(my_insight_test, "INPUT_FILE", str(input_path))
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setenv("FIELD_PARAMS", "id,media_type,media_product_type,timestamp")
+
+    my_insight_test.main(["-o", "retry.json", "--db", ""])
+    retried = json.loads((tmp_path / "retry.json").read_text(encoding="utf-8"))
+
+    assert [post["id"] for post in retried] == [posts[1]["id"], posts[4]["id"]]
+    assert all(isinstance(post["insights"], list) for post in retried)
+    assert mock.stats()["insights"] - before == 2
@@ -0,0 +1,92 @@
+import copy
+import json
+
+import pandas as pd
+
+from app import js_to_csv, my_insight
+from app.change_tracker import ChangeTracker, current_seq, load_export_state
+
+from .conftest import FIXTURES
+
+FORMATS = ["csv", "parquet"]
+
+
+def collected_posts():
+    posts = [{k: v for k, v in post.items() if k != "insights"} for post in FIXTURES]
+    return my_insight.collect_insights_batch(posts)
+
+
+def save_dataset(path, posts, complete=True):
+    """my_insight 처럼 데이터셋 저장 + 변경 추적"""
+    path.write_text(json.dumps(posts), encoding="utf-8")
+    tracker = ChangeTracker(str(path))
+    tracker.observe_many(posts)
+    return tracker.finish(complete=complete)
+
+
+def export(path, output, *args):
+    js_to_csv.main([str(path), "-o", str(output), "-f", *FORMATS, *args])
+    return pd.read_parquet(str(output) + ".parquet"), pd.read_csv(
+        str(output) + ".csv", dtype={"id": "string"}, encoding="utf-8-sig"
+    )
+
+
+def next_run(posts):
+    """새 미디어 3개 / 지표 변경 1개 / 삭제 1개"""
+    posts = copy.deepcopy(posts)
+    posts[10]["insights"][0]["values"][0]["value"] += 1000
+    return posts[:-1]
+
+
+def test_delta_export_matches_full_export(mock_api, tmp_path, capsys):
+    mock_api()
+    posts = collected_posts()
+    dataset = tmp_path / "media.json"
+
+    assert save_dataset(dataset, posts[3:])["seq"] == 1  # baseline
+    export(dataset, tmp_path / "out")
+    assert "델타 반영" not in capsys.readouterr().out
+
+    delta = save_dataset(dataset, next_run(posts))
+    assert (len(delta["new"]), len(delta["changed"]), len(delta["deleted"])) == (3, 1, 1)
+
+    delta_parquet, delta_csv = export(dataset, tmp_path / "out")
+    assert "델타 반영 (seq=2): 추가/변경 4개, 삭제 1개" in capsys.readouterr().out
+    full_parquet, full_csv = export(dataset, tmp_path / "full", "--full")
+
+    pd.testing.assert_frame_equal(delta_parquet, full_parquet)
+    pd.testing.assert_frame_equal(delta_csv, full_csv)
+    assert list(delta_parquet["id"]) == [post["id"] for post in next_run(posts)]
+    assert load_export_state(str(tmp_path / "out"))["seq"] == current_seq(str(dataset)) == 2
+
+
+def test_unchanged_dataset_exports_empty_delta(mock_api, tmp_path, capsys):
+    mock_api()
+    posts = collected_posts()
+    dataset = tmp_path / "media.json"
+    save_dataset(dataset, posts)
+    before, _ = export(dataset, tmp_path / "out")
+
+    assert save_dataset(dataset, posts)["seq"] == 1  # 변경 없음 → seq 그대로
+    after, _ = export(dataset, tmp_path / "out")
+
+    assert "추가/변경 0개, 삭제 0개" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(before, after)
+
+
+def test_delta_falls_back_to_full_export(mock_api, tmp_path, capsys):
+    mock_api()
+    posts = collected_posts()
+    dataset = tmp_path / "media.json"
+    save_dataset(dataset, posts[3:])
+    export(dataset, tmp_path / "out")
+
+    # 해시 파일을 지우고 다시 시작하면 이어 붙일 델타가 없음 → 전체 재생성
+    (tmp_path / "media.hashes.json").unlink()
+    save_dataset(dataset, next_run(posts))
+    capsys.readouterr()
+    result, _ = export(dataset, tmp_path / "out")
+
+    assert "델타 반영" not in capsys.readouterr().out
+    assert list(result["id"]) == [post["id"] for post in next_run(posts)]
+    assert load_export_state(str(tmp_path / "out"))["seq"] == current_seq(str(dataset)) == 2
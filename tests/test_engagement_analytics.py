@@ -0,0 +1,31 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app import engagement_analytics
+from app.mock_graph import load_fixtures
+
+
+def test_concurrent_load_report_computes_once(tmp_path):
+    dataset = tmp_path / "media.json"
+    dataset.write_text(json.dumps(load_fixtures()[:80]), encoding="utf-8")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        reports = list(pool.map(lambda _: engagement_analytics.load_report(str(dataset)), range(8)))
+
+    assert [report["cached"] for report in reports].count(False) == 1
+    assert len({report["key"] for report in reports}) == 1
+    assert sorted(os.listdir(tmp_path)) == ["media.analytics.json", "media.json"]
+
+
+def test_refresh_rewrites_without_leftover_temp_files(tmp_path):
+    dataset = tmp_path / "media.json"
+    dataset.write_text(json.dumps(load_fixtures()[:40]), encoding="utf-8")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        reports = list(pool.map(
+            lambda _: engagement_analytics.load_report(str(dataset), refresh=True), range(4)
+        ))
+
+    assert not any(report["cached"] for report in reports)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
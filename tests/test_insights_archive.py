@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app import insights_archive, my_insight
+from app.insights_archive import InsightsArchive, read_archive, write_archive
+from app.js_to_csv import flatten_insights
+from app.media_reader import iter_media
+
+from .conftest import FIXTURES
+
+
+def collected_posts():
+    """mock 에서 batch 로 수집한 미디어 (마지막 1건은 없는 id → insights 가 오류)"""
+    posts = [{k: v for k, v in post.items() if k != "insights"} for post in FIXTURES]
+    posts.append({"id": "does-not-exist", "media_type": "IMAGE"})
+    return my_insight.collect_insights_batch(posts)
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_archive_round_trip(mock_api, tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    mock_api()
+    posts = collected_posts()
+    path = str(tmp_path / "media.igarc")
+    write_archive(path, posts, compression=compression)
+
+    assert list(read_archive(path)) == posts
+    assert list(iter_media(path)) == posts
+    assert InsightsArchive.load(path).columns() == flatten_insights(posts)
+    assert InsightsArchive.load(path).stats()["raw_rows"] == 1
+
+
+def test_pack_verify_accepts_faithful_archive(mock_api, tmp_path, capsys):
+    mock_api()
+    source = tmp_path / "media.json"
+    source.write_text(json.dumps(collected_posts()), encoding="utf-8")
+
+    insights_archive.main(["pack", str(source), "--verify", "-c", "gzip"])
+
+    assert "원본과 동일하게 복원됨" in capsys.readouterr().out
+    assert (tmp_path / "media.igarc").exists()
+
+
+@pytest.mark.parametrize("damage", ["change", "drop"])
+def test_pack_verify_rejects_lossy_archive(mock_api, monkeypatch, tmp_path, damage):
+    mock_api()
+    source = tmp_path / "media.json"
+    source.write_text(json.dumps(collected_posts()), encoding="utf-8")
+    iter_posts = InsightsArchive.iter_posts
+
+    def lossy(self):
+        posts = list(iter_posts(self))
+        if damage == "change":
+            posts[3]["caption"] = "changed"
+            return iter(posts)
+        return iter(posts[:-1])
+
+    monkeypatch.setattr(InsightsArchive, "iter_posts", lossy)
+    with pytest.raises(SystemExit, match="복원 결과가 원본과 다릅니다"):
+        insights_archive.main(["pack", str(source), "--verify", "-c", "gzip"])
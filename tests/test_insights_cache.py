@@ -0,0 +1,69 @@
+import copy
+import types
+from datetime import datetime
+
+from app import insights_cache, my_insight
+from app.insights_cache import DAY, HOUR, InsightsCache
+
+from .conftest import FIXTURES
+
+POSTED = datetime.strptime(FIXTURES[0]["timestamp"], "%Y-%m-%dT%H:%M:%S%z").timestamp()
+
+
+def media_posts():
+    return [{k: v for k, v in post.items() if k != "insights"} for post in FIXTURES]
+
+
+def run(mock, cache):
+    """캐시를 거쳐 전체 미디어 insights 수집 → 이번 실행의 insights 요청 수"""
+    before = mock.stats().get("insights", 0)
+    posts = my_insight.collect_insights(media_posts(), workers=4, cache=cache)
+    assert all(isinstance(post["insights"], list) for post in posts)
+    return mock.stats().get("insights", 0) - before
+
+
+def younger_than(max_age, now):
+    return sum(1 for post in FIXTURES if insights_cache.post_age_seconds(post, now) < max_age)
+
+
+def test_cache_refreshes_by_post_age(mock_api, monkeypatch, tmp_path):
+    mock = mock_api()
+    clock = {"now": POSTED + 2 * HOUR}  # 가장 최근 게시물이 올라온 지 2시간
+    monkeypatch.setattr(insights_cache, "time", types.SimpleNamespace(time=lambda: clock["now"]))
+    cache = InsightsCache(str(tmp_path / "insights_cache.json"))
+
+    assert run(mock, cache) == len(FIXTURES)
+
+    clock["now"] += 2 * HOUR  # 1일 이내 게시물(1시간 간격)만 만료
+    assert run(mock, cache) == younger_than(DAY, clock["now"]) == 1
+
+    clock["now"] += 2 * DAY  # 30일 이내 게시물(하루 간격)까지 만료, 나머지는 주 단위
+    expected = younger_than(30 * DAY, clock["now"])
+    assert 1 < expected < len(FIXTURES)
+    assert run(mock, cache) == expected
+
+    clock["now"] += 8 * DAY
+    assert run(mock, cache) == len(FIXTURES)
+
+
+def test_cache_survives_reload_and_force_refresh(mock_api, tmp_path):
+    mock = mock_api()
+    path = str(tmp_path / "insights_cache.json")
+    cache = InsightsCache(path)
+    assert run(mock, cache) == len(FIXTURES)
+    cache.save()
+
+    assert run(mock, InsightsCache(path)) == 0
+    assert run(mock, InsightsCache(path, force_refresh=True)) == len(FIXTURES)
+
+
+def test_error_responses_are_not_cached(mock_api, tmp_path):
+    mock_api()
+    cache = InsightsCache(str(tmp_path / "insights_cache.json"))
+    post = copy.deepcopy(media_posts()[0])
+    post["id"] = "does-not-exist"
+    my_insight.collect_insights([post], cache=cache)
+
+    assert post["insights"]["code"] == 100
+    assert cache.get(post, my_insight.get_metrics_for_post(post)) is None
+    assert cache.stats()["entries"] == 0
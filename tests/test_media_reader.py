@@ -0,0 +1,26 @@
+import io
+import json
+
+import pytest
+
+from app.media_reader import _iter_json_array
+
+DOCS = [
+    '[15000000000.0]',
+    '[1.5e10, -2, true, null, "ab\\u00e9"]',
+    '[ -1.25E+3 , 7]',
+    '[{"id": "1", "value": 1.5}, 3.25e-2, [1, 2.0]]',
+    '[]',
+]
+
+
+@pytest.mark.parametrize("doc", DOCS)
+def test_json_array_is_split_safely_at_every_chunk_boundary(doc):
+    for chunk_size in range(1, len(doc) + 2):
+        assert list(_iter_json_array(io.StringIO(doc), chunk_size)) == json.loads(doc)
+
+
+@pytest.mark.parametrize("doc", ['[15000000000.', '[1, 2', '[{"id": "1"'])
+def test_truncated_json_array_is_rejected(doc):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.StringIO(doc), 4))
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+import requests
+
+from app import graph_client, media_sync
+
+from .conftest import FIXTURES
+
+
+def sync(tmp_path, limit=50):
+    return media_sync.sync_user_media("ig0", "id,timestamp", "test-token", str(tmp_path / "media.sync.json"), limit)
+
+
+def test_interrupted_sync_resumes_from_saved_cursor(mock_api, monkeypatch, tmp_path):
+    mock = mock_api()
+    real_get = graph_client.get
+    calls = {"media": 0}
+
+    def flaky_get(url, params=None, **kwargs):
+        calls["media"] += 1
+        if calls["media"] == 2:
+            raise requests.ConnectionError("connection reset")
+        return real_get(url, params=params, **kwargs)
+
+    monkeypatch.setattr(graph_client, "get", flaky_get)
+    with pytest.raises(RuntimeError):
+        sync(tmp_path)
+    state = json.loads((tmp_path / "media.sync.json").read_text(encoding="utf-8"))
+    assert state["cursor"] == "50"
+    assert len(state["pending"]) == 50
+
+    posts = sync(tmp_path)
+    assert [post["id"] for post in posts] == [post["id"] for post in FIXTURES]
+    assert mock.stats()["media"] == 1 + 2  # 첫 페이지는 다시 요청하지 않음
+
+    state = json.loads((tmp_path / "media.sync.json").read_text(encoding="utf-8"))
+    assert state["cursor"] is None and state["pending"] == []
+    assert state["newest_timestamp"] == FIXTURES[0]["timestamp"]
+
+
+def test_incremental_sync_stops_at_known_timestamp(mock_api, tmp_path):
+    mock = mock_api()
+    media_sync.save_state(str(tmp_path / "media.sync.json"), {"newest_timestamp": FIXTURES[3]["timestamp"]})
+
+    posts = sync(tmp_path)
+    assert [post["id"] for post in posts] == [post["id"] for post in FIXTURES[:3]]
+    assert mock.stats()["media"] == 1
+
+    assert sync(tmp_path) == []
+
+
+def test_merge_keeps_new_records_first_without_duplicates():
+    existing = [{"id": "2", "v": "old"}, {"id": "1", "v": "old"}]
+    merged = media_sync.merge_media([{"id": "3"}, {"id": "2", "v": "new"}], existing)
+
+    assert merged == [{"id": "3"}, {"id": "2", "v": "new"}, {"id": "1", "v": "old"}]
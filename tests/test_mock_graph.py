@@ -0,0 +1,145 @@
+import math
+import random
+
+import pytest
+import requests
+
+from app import graph_client, hashtag_crawler, my_insight, rate_limiter
+from app.dead_letter import classify_error
+from app.hashtag_ids import HashtagIdCache
+
+from .conftest import FIXTURES
+
+
+def media_posts():
+    return [{k: v for k, v in post.items() if k != "insights"} for post in FIXTURES]
+
+
+def test_media_paging_follows_next_until_exhausted(mock_api):
+    mock = mock_api()
+    posts = my_insight.fetch_user_media_all(limit=50)
+
+    assert [post["id"] for post in posts] == [post["id"] for post in FIXTURES]
+    assert mock.stats()["media"] == math.ceil(len(FIXTURES) / 50)
+
+
+def test_media_paging_failure_keeps_partial_pages(mock_api, monkeypatch):
+    mock_api()
+    real_get = graph_client.get
+    calls = {"media": 0}
+
+    def flaky_get(url, params=None, **kwargs):
+        calls["media"] += 1
+        if calls["media"] == 2:
+            raise requests.ConnectionError("connection reset")
+        return real_get(url, params=params, **kwargs)
+
+    monkeypatch.setattr(graph_client, "get", flaky_get)
+    with pytest.raises(graph_client.IncompletePagination) as excinfo:
+        my_insight.fetch_user_media_all(limit=50)
+    assert len(excinfo.value.partial) == 50
+
+
+def test_insights_returns_requested_metrics(mock_api):
+    mock_api()
+    post = FIXTURES[0]
+    result = my_insight.fetch_insights(post["id"], "reach,likes")
+
+    assert [item["name"] for item in result["data"]] == ["reach", "likes"]
+
+
+def test_insights_unknown_media_is_client_error(mock_api):
+    mock_api()
+    result = my_insight.fetch_insights("does-not-exist", "reach")
+
+    assert result["error"]["status"] == 400
+    assert result["error"]["code"] == 100
+    assert classify_error(result["error"]) == "client"
+
+
+def test_batch_insights_packs_requests(mock_api):
+    mock = mock_api()
+    results = my_insight.collect_insights_batch(media_posts())
+
+    assert all(isinstance(post["insights"], list) for post in results)
+    assert mock.stats()["batch"] == math.ceil(len(FIXTURES) / 50)
+    assert mock.stats()["insights"] == len(FIXTURES)  # batch 하위 요청도 insights 로 집계
+
+
+def test_throttled_response_is_graph_rate_limit(mock_api):
+    mock = mock_api(throttle_rate=1.0, throttle_retry_after=3)
+    resp = requests.get(f"{mock.base_url}/v19.0/{FIXTURES[0]['id']}/insights", params={"metric": "reach"})
+
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "3"
+    assert resp.json()["error"]["code"] == 4
+    assert graph_client.is_rate_limited(resp)
+    assert mock.stats()["throttled"] == 1
+
+
+def test_throttled_insights_exhausting_retries_is_rate_limit(mock_api):
+    mock = mock_api(throttle_rate=1.0, throttle_retry_after=0)
+    result = my_insight.fetch_insights(FIXTURES[0]["id"], "reach")
+
+    assert classify_error(result["error"]) == "rate_limit"
+    assert mock.stats()["throttled"] == graph_client.HTTP_MAX_RETRIES
+
+
+def test_throttled_request_is_retried(mock_api, monkeypatch):
+    mock = mock_api(throttle_rate=0.5, throttle_retry_after=0)
+    draws = iter([0.0, 0.9])  # 첫 요청만 429
+    monkeypatch.setattr(random, "random", lambda: next(draws))
+    result = my_insight.fetch_insights(FIXTURES[0]["id"], "reach")
+
+    assert [item["name"] for item in result["data"]] == ["reach"]
+    assert mock.stats()["throttled"] == 1
+    assert mock.stats()["insights"] == 1
+
+
+def test_usage_headers_follow_quota(mock_api):
+    mock = mock_api(usage_quota=4)
+    for _ in range(2):
+        resp = requests.get(f"{mock.base_url}/v19.0/{FIXTURES[0]['id']}", params={"fields": "id"})
+
+    usage = rate_limiter.parse_usage_headers(resp.headers)
+    assert usage is not None
+    assert usage["usage"] == 50
+
+
+def test_hashtag_edge_failure_keeps_fetched_pages(mock_api, monkeypatch, tmp_path):
+    mock_api()
+    ids = HashtagIdCache(str(tmp_path / "hashtag_ids.json"))
+    monkeypatch.setattr(hashtag_crawler, "get_hashtag_cache", lambda: ids)
+    real_get = graph_client.get
+    pages = {"count": 0}
+
+    def flaky_get(url, params=None, **kwargs):
+        if "recent_media" in url:
+            pages["count"] += 1
+            if pages["count"] == 3:
+                raise requests.ConnectionError("connection reset")
+        return real_get(url, params=params, **kwargs)
+
+    monkeypatch.setattr(graph_client, "get", flaky_get)
+    result = hashtag_crawler.crawl_hashtags(["청도"], edges=["recent_media"], limit=50)
+
+    assert result.fetched == 100
+    assert [(tag, edge) for tag, edge, _ in result.failed] == [("청도", "recent_media")]
+
+
+def test_hashtag_id_lookup_failure_skips_only_that_tag(mock_api, monkeypatch, tmp_path):
+    mock_api()
+    ids = HashtagIdCache(str(tmp_path / "hashtag_ids.json"))
+    monkeypatch.setattr(hashtag_crawler, "get_hashtag_cache", lambda: ids)
+    real_get = graph_client.get
+
+    def flaky_get(url, params=None, **kwargs):
+        if "ig_hashtag_search" in url and params["q"] == "broken":
+            raise requests.ConnectionError("connection reset")
+        return real_get(url, params=params, **kwargs)
+
+    monkeypatch.setattr(graph_client, "get", flaky_get)
+    result = hashtag_crawler.crawl_hashtags(["broken", "청도"], edges=["top_media"], limit=50)
+
+    assert result.by_tag == {"청도": 50}
+    assert [(tag, edge) for tag, edge, _ in result.failed] == [("broken", "id")]